@@ -0,0 +1,72 @@
+"""
+Бенчмарк сжатия хранилища: скорость записи/чтения и степень сжатия
+для каждого формата и кодека.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_compression.py [число_записей]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export.formats import JsonFormat, CsvFormat, TxtFormat  # noqa: E402
+
+CODECS = ("", ".gz", ".bz2", ".xz")
+
+
+def make_records(count):
+    """Синтетические записи в формате Animal.to_dict()."""
+    species = ("Домашняя корова", "Домашняя кошка", "Домашняя собака",
+               "Домашняя курица")
+    return [{
+        "name": f"Животное {i}",
+        "species": species[i % 4],
+        "genus": "Род",
+        "family": "Семейство",
+        "order": "Отряд",
+        "class": "Млекопитающие",
+        "phylum": "Хордовые",
+        "age": i % 20,
+        "weight": float(i % 500),
+        "description": "",
+        "id": i,
+    } for i in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+    print(f"Записей: {count}")
+    print(f"{'формат':<6} {'кодек':<5} {'размер, КБ':>11} {'сжатие':>7} "
+          f"{'запись, МБ/с':>13} {'чтение, МБ/с':>13}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in (JsonFormat(), CsvFormat(), TxtFormat()):
+            plain_size = None
+            for codec in CODECS:
+                path = os.path.join(tmp, "animals" + fmt.get_extension() + codec)
+
+                start = time.perf_counter()
+                fmt.export(records, path)
+                write_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                loaded = sum(1 for _ in fmt.iter_records(path))
+                read_time = time.perf_counter() - start
+                assert loaded == count
+
+                size = os.path.getsize(path)
+                if plain_size is None:
+                    plain_size = size
+                mb = plain_size / 1024 / 1024
+                print(f"{fmt.get_name():<6} {codec or '-':<5} {size // 1024:>11} "
+                      f"{plain_size / size:>6.1f}x {mb / write_time:>13.1f} "
+                      f"{mb / read_time:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
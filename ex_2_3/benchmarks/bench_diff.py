@@ -0,0 +1,71 @@
+"""
+Бенчмарк FarmDiff: две выгрузки по N животных, "вчера" и "сегодня".
+
+Сегодня: каждое 10-е животное поправилось, каждое 50-е - на год
+старше, каждое 100-е пропало, добавлено N/100 новых. Файлы пишутся
+потоком, так что N может быть и 10 миллионов (около 1.5 ГБ на диске).
+Печатает время сравнения, размер патча и пик памяти процесса.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_diff.py [число_животных]
+"""
+
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export.diff import FarmDiff  # noqa: E402
+from export.formats import JsonlFormat  # noqa: E402
+
+SPECIES = ("Домашняя корова", "Домашняя кошка", "Домашняя собака",
+           "Домашняя курица")
+
+
+def iter_records(count, today):
+    """Записи в формате Animal.to_dict(), без списка в памяти."""
+    for i in range(count):
+        if today and i % 100 == 0:
+            continue
+        yield {
+            "name": f"Животное {i}",
+            "species": SPECIES[i % 4],
+            "genus": "Род", "family": "Семейство", "order": "Отряд",
+            "class": "Млекопитающие", "phylum": "Хордовые",
+            "age": i % 20 + (1 if today and i % 50 == 0 else 0),
+            "weight": float(i % 500) + (2.5 if today and i % 10 == 0 else 0),
+            "description": "",
+            "id": i,
+        }
+    if today:
+        for i in range(count, count + count // 100):
+            yield {"name": f"Животное {i}", "species": SPECIES[i % 4],
+                   "age": 0, "weight": 1.0, "id": i}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    fmt = JsonlFormat()
+    with tempfile.TemporaryDirectory() as tmp:
+        old = os.path.join(tmp, "yesterday.jsonl")
+        new = os.path.join(tmp, "today.jsonl")
+        fmt.export(iter_records(count, False), old)
+        fmt.export(iter_records(count, True), new)
+        print(f"файлы: {os.path.getsize(old) / 2**20:.0f} МБ + "
+              f"{os.path.getsize(new) / 2**20:.0f} МБ")
+
+        patch = os.path.join(tmp, "changes.jsonl")
+        start = time.perf_counter()
+        result = FarmDiff().diff(old, new, patch)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(result)
+        print(f"сравнение {elapsed:.1f} с, патч {os.path.getsize(patch) / 2**20:.1f} МБ, "
+              f"пик памяти {peak:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
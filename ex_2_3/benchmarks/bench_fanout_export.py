@@ -0,0 +1,47 @@
+"""
+Бенчмарк экспорта во все форматы: по очереди против FanOutExporter.
+
+По очереди - как раньше: для каждого формата заново to_dict по всем
+животным и запись. FanOutExporter сериализует один раз и пишет
+форматы параллельно.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_fanout_export.py [число_животных]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import Farm, TaxonomyRegistry  # noqa: E402
+from export.fanout import FanOutExporter, default_formats  # noqa: E402
+from bench_compression import make_records  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    farm = Farm()
+    farm.add_animals(TaxonomyRegistry().records_to_animals(make_records(count)))
+    snapshot = farm.snapshot()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "animals")
+
+        start = time.perf_counter()
+        for fmt in default_formats():
+            fmt.export([animal.to_dict() for animal in snapshot],
+                       base + fmt.get_extension())
+        serial = time.perf_counter() - start
+        print(f"по очереди   {serial:7.2f} с")
+
+        start = time.perf_counter()
+        FanOutExporter().export(snapshot, base + "_fanout")
+        fanout = time.perf_counter() - start
+        print(f"fan-out      {fanout:7.2f} с  (быстрее в {serial / fanout:.1f} раз)")
+
+
+if __name__ == "__main__":
+    main()
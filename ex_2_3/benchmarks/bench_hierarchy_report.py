@@ -0,0 +1,53 @@
+"""
+Бенчмарк отчёта по иерархии: на каждое животное против HierarchyReport.
+
+На каждое животное - как в окне программы: полная линия от Типа
+до животного для каждого по отдельности. HierarchyReport выводит
+каждый таксон один раз и пишет файл потоком.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_hierarchy_report.py [число_животных]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import Farm, TaxonomyRegistry  # noqa: E402
+from data.taxonomy_tree import RANK_NAMES, get_lineage  # noqa: E402
+from export.hierarchy_report import HierarchyReport  # noqa: E402
+from bench_compression import make_records  # noqa: E402
+
+
+def per_animal(animals, filepath):
+    with open(filepath, "w", encoding="utf-8") as f:
+        for animal in animals:
+            for depth, (rank, name) in enumerate(zip(RANK_NAMES, get_lineage(animal))):
+                f.write(f"{'  ' * depth}{rank}: {name}\n")
+            f.write(f"{'  ' * len(RANK_NAMES)}{animal.name} — {animal.age} лет, "
+                    f"{animal.weight} кг\n")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    farm = Farm()
+    farm.add_animals(TaxonomyRegistry().records_to_animals(make_records(count)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        per_animal(farm, os.path.join(tmp, "naive.txt"))
+        naive = time.perf_counter() - start
+        print(f"на каждое животное  {naive:7.2f} с")
+
+        for fmt in ("text", "json", "html"):
+            start = time.perf_counter()
+            HierarchyReport(farm, fmt).write(os.path.join(tmp, "report." + fmt))
+            elapsed = time.perf_counter() - start
+            print(f"HierarchyReport {fmt:<4} {elapsed:6.2f} с")
+
+
+if __name__ == "__main__":
+    main()
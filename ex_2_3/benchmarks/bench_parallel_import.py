@@ -0,0 +1,44 @@
+"""
+Бенчмарк параллельного импорта: один большой файл, разбитый на части,
+при разном числе процессов.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_parallel_import.py [число_записей]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export.formats import TxtFormat  # noqa: E402
+from export.parallel import ParallelImporter  # noqa: E402
+from bench_compression import make_records  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    cpus = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "animals.txt")
+        TxtFormat().export(make_records(count), path)
+        print(f"Записей: {count}, ядер: {cpus}")
+
+        base = None
+        workers = 1
+        while workers <= cpus:
+            importer = ParallelImporter(workers=workers)
+            start = time.perf_counter()
+            animals = importer.load(path)
+            elapsed = time.perf_counter() - start
+            assert len(animals) == count
+            base = base or elapsed
+            print(f"процессов: {workers:>2}  {elapsed:6.2f} с  "
+                  f"ускорение {base / elapsed:4.1f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
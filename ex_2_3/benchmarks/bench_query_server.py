@@ -0,0 +1,134 @@
+"""
+Нагрузочный тест FarmQueryServer: задержки p50/p99 и запросов в секунду.
+
+Сервер запускается в отдельном процессе над синтетической фермой.
+Клиенты держат соединения открытыми (keep-alive) и шлют запросы пачками
+по --pipeline штук, не дожидаясь ответов. Задержка запроса - от отправки
+его пачки до получения его ответа. Большая часть запросов (--hot)
+приходится на небольшой набор "горячих" животных - на них работает кэш;
+--cache-size 0 показывает сервер без кэша.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_query_server.py [--animals N] [--connections C]
+        [--pipeline D] [--requests R] [--cache-size S]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import Farm, TaxonomyRegistry  # noqa: E402
+from server.query_server import FarmQueryServer, DEFAULT_HOST  # noqa: E402
+from bench_compression import make_records  # noqa: E402
+
+
+def _run_server(count, port, cache_size, ready):
+    farm = Farm()
+    farm.add_animals(TaxonomyRegistry().records_to_animals(make_records(count)))
+
+    async def serve():
+        server = await FarmQueryServer(farm, DEFAULT_HOST, port, cache_size).start()
+        ready.set()
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def make_targets(count, requests, hot_share, seed=1):
+    """Пути запросов: доля hot_share - по 100 горячим животным."""
+    rng = random.Random(seed)
+    hot = [rng.randrange(count) for _ in range(100)]
+    records = make_records(1)[0]
+    lineage = "/".join(quote(records[key]) for key in
+                       ("phylum", "class", "order", "family", "genus"))
+    targets = []
+    for _ in range(requests):
+        i = rng.choice(hot) if rng.random() < hot_share else rng.randrange(count)
+        kind = rng.random()
+        if kind < 0.4:
+            targets.append(f"/animals/{i}/hierarchy")
+        elif kind < 0.7:
+            targets.append(f"/animals?name={quote(f'Животное {i}')}")
+        elif kind < 0.9:
+            targets.append(f"/animals/{i}")
+        else:
+            targets.append(f"/stats/{lineage}")
+    return targets
+
+
+async def _client(port, targets, pipeline, latencies):
+    reader, writer = await asyncio.open_connection(DEFAULT_HOST, port)
+    try:
+        for start in range(0, len(targets), pipeline):
+            batch = targets[start:start + pipeline]
+            writer.write(b"".join(
+                f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+                for target in batch))
+            sent = time.perf_counter()
+            await writer.drain()
+            for _ in batch:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line[:15].lower() == b"content-length:":
+                        length = int(line[15:])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - sent)
+    finally:
+        writer.close()
+
+
+async def run_load(port, targets, connections, pipeline):
+    latencies = []
+    share = len(targets) // connections
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(port, targets[i * share:(i + 1) * share], pipeline, latencies)
+        for i in range(connections)))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--animals", type=int, default=200_000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--pipeline", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--hot", type=float, default=0.8)
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=_run_server,
+        args=(args.animals, args.port, args.cache_size, ready), daemon=True)
+    server.start()
+    try:
+        if not ready.wait(120):
+            sys.exit("Сервер не запустился")
+        targets = make_targets(args.animals, args.requests, args.hot)
+        # прогрев: индекс кличек строится при первом поиске
+        asyncio.run(run_load(args.port, targets[:100], 1, 1))
+        latencies, elapsed = asyncio.run(
+            run_load(args.port, targets, args.connections, args.pipeline))
+    finally:
+        server.terminate()
+
+    percentiles = statistics.quantiles(latencies, n=100)
+    print(f"{len(latencies)} запросов, {args.connections} соединений, "
+          f"пачки по {args.pipeline}, кэш {args.cache_size}")
+    print(f"{len(latencies) / elapsed:,.0f} запросов/с")
+    print(f"p50 {percentiles[49] * 1000:.2f} мс, p99 {percentiles[98] * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Бенчмарк запуска: загрузка фермы из двоичного снимка против JSON и CSV.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/bench_snapshot.py [число_животных]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import Farm, TaxonomyRegistry  # noqa: E402
+from export.formats import JsonFormat, CsvFormat  # noqa: E402
+from export.snapshot import save_snapshot, load_snapshot  # noqa: E402
+from bench_compression import make_records  # noqa: E402
+
+
+def timed(label, load):
+    start = time.perf_counter()
+    farm = Farm()
+    farm.add_animals(load())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {elapsed:7.2f} с  ({len(farm)} животных)")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    records = make_records(count)
+    animals = TaxonomyRegistry().records_to_animals(records)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, "animals" + ext)
+                 for name, ext in (("json", ".json"), ("csv", ".csv"),
+                                   ("snap", ".snap"))}
+        JsonFormat().export(records, paths["json"])
+        CsvFormat().export(records, paths["csv"])
+        save_snapshot(animals, paths["snap"])
+        del records, animals
+
+        for name, path in paths.items():
+            print(f"{name:<8} {os.path.getsize(path) // 1024:>9} КБ")
+
+        def from_text(fmt, path):
+            return lambda: TaxonomyRegistry().records_to_animals(
+                fmt.iter_records(path))
+
+        json_time = timed("JSON", from_text(JsonFormat(), paths["json"]))
+        csv_time = timed("CSV", from_text(CsvFormat(), paths["csv"]))
+        snap_time = timed("снимок", lambda: load_snapshot(paths["snap"]))
+        print(f"снимок быстрее JSON в {json_time / snap_time:.1f} раз, "
+              f"CSV - в {csv_time / snap_time:.1f} раз")
+
+
+if __name__ == "__main__":
+    main()
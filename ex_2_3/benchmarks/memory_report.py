@@ -0,0 +1,38 @@
+"""
+Отчёт о памяти модели после импорта.
+
+Импортирует синтетические записи дважды: через общий TaxonomyRegistry
+и "наивно" (свой реестр на каждый пакет), чтобы в отчёте были видны
+повторяющиеся таксоны.
+
+Запуск из каталога ex_2_3:
+    python benchmarks/memory_report.py [число_животных]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import Farm, TaxonomyRegistry, live_objects  # noqa: E402
+from bench_compression import make_records  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+
+    live_objects.enable(trace_allocations=True)
+    farm = Farm()
+    farm.add_animals(TaxonomyRegistry().records_to_animals(records))
+    # Пакеты по 1000 записей со своим реестром - таксоны дублируются
+    for start in range(0, min(count, 10_000), 1000):
+        batch = records[start:start + 1000]
+        farm.add_animals(TaxonomyRegistry().records_to_animals(batch))
+
+    print(live_objects.memory_report(top=8))
+    live_objects.disable()
+
+
+if __name__ == "__main__":
+    main()
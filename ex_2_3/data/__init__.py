@@ -1,5 +1,6 @@
 """Инициализация пакета data."""
 
+from data import live_objects
 from data.taxonomic_rank import TaxonomicRank
 from data.phylum import Phylum
 from data.class_animal import ClassAnimal
@@ -7,8 +8,16 @@ from data.order import Order
 from data.family import Family
 from data.genus import Genus
 from data.species import Species
-from data.animal import Animal
-from data.farm import Farm
+from data.animal import Animal, AnimalValidationError
+from data.farm import Farm, FarmSnapshot, MergeResult
+from data.taxonomy_tree import TaxonomyTree, TaxonNode
+from data.taxonomy_registry import TaxonomyRegistry
+from data.cluster import FarmCluster
+from data.events import (Observable, ChangeBatch, ChangeBatcher,
+                         Inserted, Removed, Updated, Cleared)
+from data.feeding_queue import FeedingQueue
+from data.weight_history import WeightHistory
+from data.navigation import NavigationHistory
 
 __all__ = [
     "TaxonomicRank",
@@ -19,5 +28,23 @@ __all__ = [
     "Genus",
     "Species",
     "Animal",
+    "AnimalValidationError",
     "Farm",
+    "FarmSnapshot",
+    "MergeResult",
+    "TaxonomyTree",
+    "TaxonNode",
+    "TaxonomyRegistry",
+    "FarmCluster",
+    "Observable",
+    "ChangeBatch",
+    "ChangeBatcher",
+    "Inserted",
+    "Removed",
+    "Updated",
+    "Cleared",
+    "FeedingQueue",
+    "WeightHistory",
+    "NavigationHistory",
+    "live_objects",
 ]
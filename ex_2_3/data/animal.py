@@ -4,16 +4,73 @@
 Демонстрирует Инкапсуляцию:
 - private атрибуты (__age, __weight) с валидацией
 - property для контролируемого доступа
+
+Для импорта больших файлов есть Animal.bulk_create: те же правила
+проверки применяются сразу ко всему столбцу, а объекты собираются
+без вызова сеттеров.
 """
 
+import math
+
 from data.taxonomic_rank import TaxonomicRank
 from data.species import Species
+from data.taxonomy_tree import get_lineage
+
+
+_NUMBER_TYPES = {int, float, bool}
+_ID_TYPES = {int, type(None)}
+
+
+class AnimalValidationError(ValueError):
+    """Ошибки проверки при массовом создании: {номер строки: сообщение}."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        rows = ", ".join(str(i) for i in sorted(errors)[:10])
+        more = "..." if len(errors) > 10 else ""
+        super().__init__(f"Некорректные строки ({len(errors)}): {rows}{more}")
+
+
+def _check_column(values, label, upper, errors):
+    """Проверка столбца чисел целиком; ошибки копятся в errors."""
+    if not values:
+        return
+    # Быстрый путь: все значения - конечные числа в допустимом диапазоне
+    # (inf и nan делают сумму не конечной)
+    if set(map(type, values)) <= _NUMBER_TYPES:
+        low, high = min(values), max(values)
+        total = sum(values)
+        if (total - total == 0 and low >= 0
+                and (upper is None or high <= upper)):
+            return
+    # Медленный путь - только чтобы назвать конкретные строки
+    for i, value in enumerate(values):
+        if not isinstance(value, (int, float)):
+            errors.setdefault(i, f"{label} должен быть числом")
+        elif isinstance(value, float) and not math.isfinite(value):
+            errors.setdefault(i, f"{label} должен быть конечным числом")
+        elif value < 0:
+            errors.setdefault(i, f"{label} не может быть отрицательным")
+        elif upper is not None and value > upper:
+            errors.setdefault(i, f"{label} слишком большой")
+
+
+def _check_ids(ids, errors):
+    """Столбец id: None (выдать новый) или целое число; ошибки - в errors."""
+    if set(map(type, ids)) <= _ID_TYPES:
+        return
+    for i, value in enumerate(ids):
+        if value is None or type(value) is int:
+            continue
+        if not (type(value) is float and value.is_integer()):
+            errors.setdefault(i, "id должен быть целым числом")
 
 
 class Animal(TaxonomicRank):
     """Животное - агрегирует Вид + личные характеристики."""
-    def __init__(self, name, species, age=0, weight=0.0, description=""):
-        super().__init__(name, description)
+    def __init__(self, name, species, age=0, weight=0.0, description="",
+                 rank_id=None):
+        super().__init__(name, description, rank_id)
         self._species = species
         self.__age = 0
         self.__weight = 0.0
@@ -53,6 +110,86 @@ class Animal(TaxonomicRank):
             raise ValueError("Вес не может быть отрицательным")
         self.__weight = float(value)
 
+    @classmethod
+    def bulk_create(cls, columns, errors=None, observe_ids=True):
+        """Создать животных из столбцов одинаковой длины.
+
+        columns: name, species (объекты Species), необязательно
+        age, weight, description, id. Если передан словарь errors,
+        некорректные строки пропускаются и записываются в него,
+        иначе выбрасывается AnimalValidationError со всеми строками сразу.
+        observe_ids=False - готовые id уже выданы этим генератором
+        (например, из зарезервированного блока) и учитывать их не нужно.
+        """
+        names = columns["name"]
+        species = columns["species"]
+        count = len(names)
+        ages = columns.get("age") or [0] * count
+        weights = columns.get("weight") or [0.0] * count
+        descriptions = columns.get("description") or [""] * count
+        ids = columns.get("id") or [None] * count
+
+        found = dict(columns.get("invalid") or {})
+        _check_column(ages, "Возраст", 100, found)
+        _check_column(weights, "Вес", None, found)
+        _check_ids(ids, found)
+        if found:
+            if errors is None:
+                raise AnimalValidationError(found)
+            errors.update(found)
+
+        if found:
+            ids = [None if i in found else rank_id for i, rank_id in enumerate(ids)]
+        allocator = TaxonomicRank.id_allocator()
+        if observe_ids:
+            allocator.resume_from(int(i) for i in ids if i is not None)
+        missing = ids.count(None) - len(found)
+        next_id, _ = allocator.reserve(missing)
+
+        new = cls._new_unchecked
+        result = []
+        append = result.append
+        for i in range(count):
+            if i in found:
+                continue
+            rank_id = ids[i]
+            if rank_id is None:
+                rank_id = next_id
+                next_id += 1
+            animal = new(names[i], descriptions[i] or "", int(rank_id))
+            animal._species = species[i]
+            animal.__age = int(ages[i])
+            animal.__weight = float(weights[i])
+            append(animal)
+        return result
+
+    def copy(self):
+        """Копия с тем же id и видом (для копирования при записи)."""
+        clone = type(self)._new_unchecked(self._name, self._description, self.id)
+        clone._species = self._species
+        clone.__age = self.__age
+        clone.__weight = self.__weight
+        return clone
+
+    def same_state(self, other):
+        """Совпадают ли изменяемые поля (кличка, вид, возраст, вес, описание)."""
+        return (self._name == other._name
+                and self.__age == other.__age
+                and self.__weight == other.__weight
+                and self._description == other._description
+                and (self._species is other._species
+                     or get_lineage(self) == get_lineage(other)))
+
+    def update_from(self, other):
+        """Перенести изменяемые поля другого животного; id остаётся своим."""
+        self._name = other._name
+        self._description = other._description
+        self.__age = other.__age
+        self.__weight = other.__weight
+        if (self._species is not other._species
+                and get_lineage(self) != get_lineage(other)):
+            self._species = other._species
+
     def get_parent(self):
         return self._species
 
@@ -71,7 +208,8 @@ class Animal(TaxonomicRank):
             "phylum": self._species.genus.family.order.class_animal.phylum.name if self._species else "",
             "age": self.__age,
             "weight": self.__weight,
-            "description": self._description
+            "description": self._description,
+            "id": self.id
         }
 
     def __str__(self):
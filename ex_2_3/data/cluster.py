@@ -0,0 +1,225 @@
+"""
+Кластер ферм - животные разнесены по нескольким процессам (шардам)
+
+Каждый шард - отдельный процесс со своей Farm. Животное попадает
+в шард по хэшу клички или вида. Наружу кластер похож на Farm
+(add_animal, get_by_name, count, итерация), а агрегатные запросы
+выполняются по схеме scatter-gather: всем шардам параллельно
+рассылается запрос, частичные результаты сливаются здесь.
+Между процессами передаются словари Animal.to_dict().
+"""
+
+import multiprocessing
+import zlib
+
+from data.farm import Farm
+from data.taxonomy_registry import TaxonomyRegistry
+
+
+SHARD_KEYS = ("name", "species")
+
+
+def _shard_stats(farm):
+    """Частичные агрегаты шарда: по видам - число, вес, сумма возрастов.
+
+    Берутся готовые агрегаты узлов-видов дерева таксонов - O(видов),
+    а не O(животных).
+    """
+    by_species = {}
+    nodes = list(farm.taxonomy.root.child_nodes)
+    while nodes:
+        node = nodes.pop()
+        if not node.count:
+            continue
+        if not node.is_species:
+            nodes.extend(node.child_nodes)
+            continue
+        entry = by_species.get(node.name)
+        if entry is None:
+            entry = by_species[node.name] = [0, 0.0, 0]
+        entry[0] += node.count
+        entry[1] += node.total_weight
+        entry[2] += node.total_age
+    return by_species
+
+
+def _shard_reply(farm, command, arg):
+    """Выполнить команду шарда, вернуть ответ."""
+    if command == "count":
+        return farm.count()
+    if command == "get_by_name":
+        animal = farm.get_by_name(arg)
+        return animal.to_dict() if animal else None
+    if command == "dump":
+        return [animal.to_dict() for animal in farm]
+    if command == "stats":
+        return _shard_stats(farm)
+    if command == "clear":
+        farm.clear()
+        return True
+    raise ValueError(f"Неизвестная команда шарда: {command!r}")
+
+
+def _send_error(conn, error):
+    """Ответ-ошибка; непиклуемое исключение уходит как RuntimeError."""
+    try:
+        conn.send(("error", error))
+    except Exception:
+        conn.send(("error", RuntimeError(f"{type(error).__name__}: {error}")))
+
+
+def _shard_main(conn):
+    """Цикл процесса-шарда: команды (имя, аргумент) -> ("ok"/"error", ответ).
+
+    Ошибка команды не роняет шард: она уходит родителю ответом и там
+    поднимается заново. У "add" ответа нет, поэтому его ошибка
+    запоминается и приходит ответом на следующий запрос.
+    """
+    farm = Farm()
+    registry = TaxonomyRegistry()
+    failed = None  # ошибка последнего "add", ещё не отданная родителю
+    while True:
+        command, arg = conn.recv()
+        if command == "add":
+            try:
+                farm.add_animals(registry.records_to_animals(arg, errors={}))
+            except Exception as e:
+                failed = failed or e
+            continue  # без ответа - добавление не ждёт шард
+        if command == "stop":
+            conn.send(("ok", True))
+            conn.close()
+            return
+        if failed is not None:
+            error, failed = failed, None
+            _send_error(conn, error)
+            continue
+        try:
+            reply = _shard_reply(farm, command, arg)
+        except Exception as e:
+            _send_error(conn, e)
+        else:
+            conn.send(("ok", reply))
+
+
+class FarmCluster:
+    """Горизонтально разделённая ферма на N процессах."""
+
+    def __init__(self, shards=2, key="name", name="Кластер"):
+        if key not in SHARD_KEYS:
+            raise ValueError(f"Ключ шардирования: один из {SHARD_KEYS}")
+        self._name = name
+        self._key = key
+        self._registry = TaxonomyRegistry()
+        self._conns = []
+        self._processes = []
+        for _ in range(shards):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_shard_main, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def shard_count(self):
+        return len(self._conns)
+
+    def _shard_for(self, value):
+        """Номер шарда по значению ключа (crc32 стабилен между процессами)."""
+        return zlib.crc32(value.encode("utf-8")) % len(self._conns)
+
+    def _scatter(self, command, arg=None, shards=None):
+        """Разослать запрос шардам и собрать ответы (в порядке шардов).
+
+        Ошибка в шарде поднимается здесь тем же исключением.
+        """
+        conns = self._conns if shards is None else [self._conns[i] for i in shards]
+        for conn in conns:
+            conn.send((command, arg))
+        replies = [conn.recv() for conn in conns]  # все, чтобы не сбить протокол
+        for status, value in replies:
+            if status == "error":
+                raise value
+        return [value for _, value in replies]
+
+    # --- интерфейс как у Farm ---
+
+    def add_animal(self, animal):
+        """Добавить животное в его шард."""
+        self.add_animals([animal])
+
+    def add_animals(self, animals):
+        """Добавить пакет: записи группируются по шардам и уходят разом."""
+        batches = [[] for _ in self._conns]
+        for animal in animals:
+            record = animal.to_dict()
+            batches[self._shard_for(record[self._key])].append(record)
+        for conn, batch in zip(self._conns, batches):
+            if batch:
+                conn.send(("add", batch))
+        return sum(len(batch) for batch in batches)
+
+    def get_by_name(self, name):
+        """Найти по кличке: один шард при key='name', иначе - все."""
+        shards = [self._shard_for(name)] if self._key == "name" else None
+        for record in self._scatter("get_by_name", name, shards):
+            if record is not None:
+                return self._registry.records_to_animals([record])[0]
+        return None
+
+    def count(self):
+        return sum(self._scatter("count"))
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        """Все животные кластера (шард за шардом)."""
+        for records in self._scatter("dump"):
+            yield from self._registry.records_to_animals(records, errors={})
+
+    def clear(self):
+        self._scatter("clear")
+
+    # --- агрегатные запросы ---
+
+    def species_stats(self):
+        """{вид: (число, суммарный вес, средний вес, средний возраст)}."""
+        merged = {}
+        for partial in self._scatter("stats"):
+            for species, (count, weight, ages) in partial.items():
+                entry = merged.setdefault(species, [0, 0.0, 0])
+                entry[0] += count
+                entry[1] += weight
+                entry[2] += ages
+        return {species: (count, weight, weight / count, ages / count)
+                for species, (count, weight, ages) in merged.items()}
+
+    def total_weight(self):
+        return sum(stats[1] for stats in self.species_stats().values())
+
+    # --- жизненный цикл ---
+
+    def close(self):
+        """Остановить процессы шардов."""
+        if not self._conns:
+            return
+        self._scatter("stop")
+        for process in self._processes:
+            process.join()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,139 @@
+"""
+События изменений (Наблюдатель) и их пакетирование
+
+Ферма и очередь кормления сообщают подписчикам, что именно изменилось:
+вставлен диапазон, удалены id, изменены id, всё очищено.
+ChangeBatcher копит события и отдаёт их одним пакетом за "тик"
+цикла событий - импорт 100 тысяч строк даёт одно обновление экрана.
+"""
+
+
+class Inserted:
+    """Вставлены элементы items на позиции [start, stop)."""
+
+    def __init__(self, start, stop, items=()):
+        self.start = start
+        self.stop = stop
+        self.items = items
+
+    def __repr__(self):
+        return f"Inserted({self.start}, {self.stop})"
+
+
+class Removed:
+    """Удалены элементы с указанными id."""
+
+    def __init__(self, ids):
+        self.ids = tuple(ids)
+
+    def __repr__(self):
+        return f"Removed({len(self.ids)})"
+
+
+class Updated:
+    """Изменены элементы с указанными id (items - сами элементы).
+
+    moved - id тех, чьи строки в дереве таксонов сдвинулись или сменили
+    объект: животное перешло в другой вид или заменено копией.
+    """
+
+    def __init__(self, ids, items=(), moved=()):
+        self.ids = tuple(ids)
+        self.items = items
+        self.moved = tuple(moved)
+
+    def __repr__(self):
+        return f"Updated({len(self.ids)})"
+
+
+class Cleared:
+    """Все элементы удалены."""
+
+    def __repr__(self):
+        return "Cleared()"
+
+
+class Observable:
+    """Источник событий: подписка и рассылка."""
+
+    def __init__(self):
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """callback(event) вызывается синхронно на каждое изменение."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event):
+        for callback in self._listeners:
+            callback(event)
+
+
+class ChangeBatch:
+    """Слитые изменения за один тик."""
+
+    def __init__(self):
+        self.cleared = False
+        self.inserted = []  # [Inserted] - соседние диапазоны склеены
+        self.removed = []  # id в порядке удаления
+        self.updated = set()
+        self.moved = set()  # id, сменившие вид
+
+    def add(self, event):
+        if isinstance(event, Cleared):
+            # Всё, что было до очистки, больше не важно
+            self.__init__()
+            self.cleared = True
+        elif isinstance(event, Inserted):
+            last = self.inserted[-1] if self.inserted else None
+            if last is not None and last.stop == event.start:
+                last.stop = event.stop
+                last.items.extend(event.items)
+            else:
+                # Собственная копия - её можно дополнять при склейке
+                self.inserted.append(
+                    Inserted(event.start, event.stop, list(event.items)))
+        elif isinstance(event, Removed):
+            self.removed.extend(event.ids)
+        elif isinstance(event, Updated):
+            self.updated.update(event.ids)
+            self.moved.update(event.moved)
+
+    def is_empty(self):
+        return not (self.cleared or self.inserted or self.removed or self.updated)
+
+    def __repr__(self):
+        return (f"ChangeBatch(cleared={self.cleared}, inserted={self.inserted}, "
+                f"removed={len(self.removed)}, updated={len(self.updated)})")
+
+
+class ChangeBatcher:
+    """Подписчик, который сливает события и отдаёт их пакетом.
+
+    schedule(fn) должен вызвать fn позже - например, в следующем тике
+    цикла событий Qt (QTimer.singleShot(0, fn)). Пока пакет не отдан,
+    повторно schedule не вызывается.
+    """
+
+    def __init__(self, callback, schedule):
+        self._callback = callback
+        self._schedule = schedule
+        self._batch = ChangeBatch()
+        self._pending = False
+
+    def __call__(self, event):
+        self._batch.add(event)
+        if not self._pending:
+            self._pending = True
+            self._schedule(self.flush)
+
+    def flush(self):
+        """Отдать накопленный пакет (можно вызвать и вручную)."""
+        batch, self._batch = self._batch, ChangeBatch()
+        self._pending = False
+        if not batch.is_empty():
+            self._callback(batch)
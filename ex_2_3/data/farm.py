@@ -1,45 +1,498 @@
-"""Ферма - контейнер для животных."""
+"""Ферма - контейнер для животных.
+
+Ферма - наблюдаемый объект: подписчики (интерфейс, журнал) получают
+события Inserted / Removed / Updated / Cleared из data.events.
+
+У фермы есть естественный ключ животного - по умолчанию (кличка, вид),
+можно "id" или своя функция. По ключу ведётся хэш-индекс, поэтому
+merge (слияние с повторным импортом) работает за линейное время:
+новые животные добавляются, изменившиеся обновляются на месте.
+
+Животные лежат в массиве слотов. Удаление за O(1) оставляет на месте
+животного "надгробие" (None) и кладёт номер слота в список свободных;
+одиночное добавление занимает свободный слот. Когда надгробий больше
+COMPACT_RATIO от всех слотов, массив уплотняется за один проход.
+
+Слоты разбиты на блоки по CHUNK_SIZE. snapshot() за O(1) отдаёт
+неизменяемую версию фермы (FarmSnapshot) для чтения из других потоков:
+пока снимок жив, ферма перед записью копирует затронутый блок
+(копирование при записи), а сам снимок свои блоки не меняет. Так же
+и с животными: пока снимок жив, изменение животного (merge,
+update_animal) идёт в его копию, которая встаёт в слот фермы, а снимок
+видит прежний объект целиком. Снимки отслеживаются через weakref
+и освобождаются, как только их никто не держит.
+"""
+
+import weakref
+from functools import partial
+from itertools import chain, count
+from operator import is_not
 
 from data.animal import Animal
+from data.events import Observable, Inserted, Removed, Updated, Cleared
+from data.taxonomy_tree import TaxonomyTree, get_lineage
+
+
+def _natural_key(animal):
+    return animal.name, animal.species.name
+
+
+def _id_key(animal):
+    return animal.id
+
+
+FARM_KEYS = {"natural": _natural_key, "id": _id_key}
+
+_is_animal = partial(is_not, None)
+
+# Слотов в одном блоке (копируется целиком при записи под снимком)
+CHUNK_SIZE = 1024
+_CHUNK_SHIFT = CHUNK_SIZE.bit_length() - 1
+
+# Доля надгробий, после которой слоты уплотняются
+COMPACT_RATIO = 0.25
+COMPACT_MIN_SLOTS = 1024
+
+
+class MergeResult:
+    """Итог слияния: сколько добавлено, обновлено и осталось как было."""
+
+    def __init__(self, inserted=0, updated=0, unchanged=0):
+        self.inserted = inserted
+        self.updated = updated
+        self.unchanged = unchanged
+
+    @property
+    def total(self):
+        return self.inserted + self.updated + self.unchanged
+
+    def __repr__(self):
+        return (f"MergeResult(inserted={self.inserted}, "
+                f"updated={self.updated}, unchanged={self.unchanged})")
+
 
+class FarmSnapshot:
+    """Неизменяемая версия фермы: состав и порядок животных на момент снимка.
 
-class Farm:
-    """Ферма - хранит список животных."""
+    Снимок не копирует животных, а держит блоки слотов фермы, которые
+    ферма больше не меняет. Животных ферма тоже не меняет, пока снимок
+    жив: merge и update_animal правят копию, так что в снимке и состав,
+    и поля животных - на момент снимка.
+    """
 
-    def __init__(self, name="Ферма"):
+    def __init__(self, name, version, chunks, count):
         self._name = name
-        self._animals = []
+        self._version = version
+        self._chunks = chunks
+        self._count = count
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def version(self):
+        return self._version
+
     @property
     def animals(self):
-        return self._animals.copy()
+        return list(self)
+
+    def get_by_name(self, name):
+        for animal in self:
+            if animal.name == name:
+                return animal
+        return None
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return filter(_is_animal, chain.from_iterable(self._chunks))
+
+    def __repr__(self):
+        return f"FarmSnapshot('{self._name}', version={self._version}, {self._count})"
+
+
+class Farm(Observable):
+    """Ферма - хранит животных в массиве слотов."""
+
+    def __init__(self, name="Ферма", key="natural"):
+        super().__init__()
+        self._name = name
+        self._key = FARM_KEYS[key] if isinstance(key, str) else key
+        self._key_name = key if isinstance(key, str) else None
+        self._index = {}  # ключ -> животное
+        self._by_id = {}  # id -> животное
+        self._chunks = []  # блоки слотов: животные и None на месте удалённых
+        self._size = 0  # занятых слотов (включая надгробия)
+        self._slot_of = {}  # id(животного) -> номер слота
+        self._free = []  # номера пустых слотов
+        self._taxonomy = TaxonomyTree()
+        self._journal = None
+        self._version = 0
+        self._snapshots = weakref.WeakSet()  # живые снимки
+        self._owned = set()  # блоки, скопированные после последнего снимка
+        self._dir_shared = False  # список блоков отдан снимку
+        self._fresh = set()  # id() животных, которых не видел ни один снимок
+
+    @property
+    def version(self):
+        """Номер версии: растёт с каждым изменением фермы."""
+        return self._version
+
+    def _emit(self, event):
+        self._version += 1
+        super()._emit(event)
+
+    # --- снимки и копирование при записи ---
+
+    def snapshot(self):
+        """Неизменяемая версия фермы за O(1) (вызывать в потоке-писателе)."""
+        snap = FarmSnapshot(self._name, self._version, self._chunks, len(self))
+        self._snapshots.add(snap)
+        self._dir_shared = True
+        self._owned = set()
+        self._fresh = set()
+        return snap
+
+    def live_versions(self):
+        """Версии снимков, которые ещё кто-то держит."""
+        return sorted(snap.version for snap in self._snapshots)
+
+    def _chunk_for_write(self, i):
+        """Блок i, который можно менять (копия, если он виден снимку)."""
+        if self._snapshots and i not in self._owned:
+            if self._dir_shared:
+                self._chunks = list(self._chunks)
+                self._dir_shared = False
+            self._chunks[i] = list(self._chunks[i])
+            self._owned.add(i)
+        return self._chunks[i]
+
+    def _writable(self, animal):
+        """Животное фермы, которое можно менять на месте.
+
+        Если его может видеть живой снимок, в слот, индексы и дерево
+        таксонов встаёт копия - её и надо менять.
+        """
+        if not self._snapshots or id(animal) in self._fresh:
+            return animal
+        copy = animal.copy()
+        slot = self._slot_of.pop(id(animal))
+        self._set_slot(slot, copy)
+        self._slot_of[id(copy)] = slot
+        key = self._key(animal)
+        if self._index.get(key) is animal:
+            self._index[key] = copy
+        if self._by_id.get(animal.id) is animal:
+            self._by_id[animal.id] = copy
+        self._taxonomy.replace(animal, copy)
+        self._fresh.add(id(copy))
+        return copy
+
+    def _set_slot(self, slot, value):
+        self._chunk_for_write(slot >> _CHUNK_SHIFT)[slot & (CHUNK_SIZE - 1)] = value
+
+    def _append_slots(self, animals):
+        """Дописать животных в конец; номер первого слота."""
+        start = self._size
+        pos = 0
+        if self._snapshots and self._dir_shared:
+            self._chunks = list(self._chunks)
+            self._dir_shared = False
+        if start & (CHUNK_SIZE - 1):
+            # Дозаполнить последний неполный блок
+            chunk = self._chunk_for_write(len(self._chunks) - 1)
+            pos = CHUNK_SIZE - len(chunk)
+            chunk.extend(animals[:pos])
+        for i in range(pos, len(animals), CHUNK_SIZE):
+            self._owned.add(len(self._chunks))
+            self._chunks.append(animals[i:i + CHUNK_SIZE])
+        self._size += len(animals)
+        return start
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def key_name(self):
+        """Имя ключа из FARM_KEYS или None, если ключ - своя функция."""
+        return self._key_name
+
+    @property
+    def animals(self):
+        """Копия списка; для чтения из других потоков - snapshot()."""
+        return list(self)
+
+    @property
+    def taxonomy(self):
+        """Сводное дерево таксонов с агрегатами (обновляется на лету)."""
+        return self._taxonomy
+
+    def attach_journal(self, journal):
+        """Подключить журнал изменений (None - отключить)."""
+        if self._journal is not None:
+            self.unsubscribe(self._journal.on_event)
+        self._journal = journal
+        if journal is not None:
+            self.subscribe(journal.on_event)
 
     def add_animal(self, animal):
-        """Добавить животное."""
-        if isinstance(animal, Animal):
-            self._animals.append(animal)
+        """Добавить животное; False - это не животное или оно уже на ферме.
+
+        Если id животного уже занят другим животным фермы (совпал
+        загруженный id), животное получает новый id.
+        """
+        if isinstance(animal, Animal) and id(animal) not in self._slot_of:
+            if self._free:
+                slot = self._free.pop()
+                self._set_slot(slot, animal)
+            else:
+                slot = self._append_slots([animal])
+            self._slot_of[id(animal)] = slot
+            if self._snapshots:
+                self._fresh.add(id(animal))
+            if animal.id in self._by_id:
+                animal._reassign_id()  # загруженный id уже занят
+            self._by_id[animal.id] = animal
+            self._index.setdefault(self._key(animal), animal)
+            self._taxonomy.add(animal)
+            self._emit(Inserted(slot, slot + 1, (animal,)))
+            return True
+        return False
+
+    def add_animals(self, animals):
+        """Добавить пакет животных (быстрее, чем по одному).
+
+        Пакет всегда дописывается в конец - свободные слоты не ищутся.
+        Объекты, уже стоящие на ферме (или повторённые в пакете), не
+        добавляются второй раз; занятый id заменяется новым, как в
+        add_animal. Возвращает число добавленных.
+        """
+        batch = [animal for animal in animals if isinstance(animal, Animal)]
+        # Будущие слоты пакета; заодно видно, есть ли повторы
+        slots = dict(zip(map(id, batch), count(self._size)))
+        if len(slots) < len(batch) or not slots.keys().isdisjoint(self._slot_of):
+            seen = set(self._slot_of)
+            unique = []
+            for animal in batch:
+                if id(animal) not in seen:
+                    seen.add(id(animal))
+                    unique.append(animal)
+            batch = unique
+            slots = dict(zip(map(id, batch), count(self._size)))
+        if batch:
+            start = self._append_slots(batch)
+            self._slot_of.update(slots)
+            if self._snapshots:
+                self._fresh.update(slots)
+            setdefault = self._index.setdefault
+            by_id = self._by_id
+            key = self._key
+            for animal in batch:
+                setdefault(key(animal), animal)
+                animal_id = animal.id
+                if animal_id in by_id:
+                    animal._reassign_id()  # загруженный id уже занят
+                    animal_id = animal.id
+                by_id[animal_id] = animal
+            self._taxonomy.add_many(batch)
+            self._emit(Inserted(start, self._size, batch))
+        return len(batch)
+
+    def upsert(self, animal):
+        """Добавить или обновить одно животное по ключу; MergeResult."""
+        return self.merge([animal])
+
+    def merge(self, animals):
+        """Слить пакет с фермой по ключу за один проход.
+
+        Животное с новым ключом добавляется, с известным - переносит
+        свои поля в уже существующее (id и ссылки на объект сохраняются).
+        Повторы ключа внутри пакета сливаются в одно животное.
+        """
+        result = MergeResult()
+        key = self._key
+        index = self._index
+        new = []
+        pending = {}  # ключ -> новое животное из этого пакета
+        changed = []
+        moved = []  # сменили вид - строки дерева таксонов сдвинулись
+        for animal in animals:
+            if not isinstance(animal, Animal):
+                continue
+            k = key(animal)
+            existing = pending.get(k)
+            if existing is not None:
+                # Ещё не в ферме - достаточно перенести поля
+                if existing.same_state(animal):
+                    result.unchanged += 1
+                else:
+                    existing.update_from(animal)
+                    result.updated += 1
+                continue
+            existing = index.get(k)
+            if existing is None:
+                pending[k] = animal
+                new.append(animal)
+            elif existing.same_state(animal):
+                result.unchanged += 1
+            else:
+                # Под живым снимком меняется копия: строка дерева
+                # указывает теперь на другой объект - тоже "сдвинулась"
+                target = self._writable(existing)
+                old_weight, old_age = target.weight, target.age
+                old_lineage = (None if target.species is animal.species
+                               else get_lineage(target))
+                target.update_from(animal)
+                if (self._taxonomy.update(target, old_weight, old_age, old_lineage)
+                        or target is not existing):
+                    moved.append(target.id)
+                changed.append(target)
+
+        result.updated += len(changed)
+        result.inserted = self.add_animals(new)
+        if changed:
+            self._emit(Updated([animal.id for animal in changed], changed, moved))
+        return result
+
+    def update_animal(self, animal, **fields):
+        """Изменить поля животного фермы (age, weight, description).
+
+        Изменения идут через сеттеры с валидацией; агрегаты таксонов
+        и подписчики узнают о них сразу. Прямая запись animal.weight = ...
+        мимо фермы кэш статистики не обновит. Если какое-то значение
+        не прошло проверку, животное остаётся как было. Животное не
+        с этой фермы - ValueError. Возвращает животное фермы: под живым
+        снимком это уже его изменённая копия.
+        """
+        if id(animal) not in self._slot_of:
+            raise ValueError("Животного нет на этой ферме")
+        unknown = set(fields) - {"age", "weight", "description"}
+        if unknown:
+            raise TypeError(f"Нельзя изменить поля: {', '.join(sorted(unknown))}")
+        # Проверка на пробной копии: до фермы доходят только верные значения
+        probe = animal.copy()
+        for field in ("age", "weight", "description"):
+            if field in fields:
+                setattr(probe, field, fields[field])
+        target = self._writable(animal)
+        old_weight, old_age = target.weight, target.age
+        target.age, target.weight = probe.age, probe.weight
+        target.description = probe.description
+        self._taxonomy.update(target, old_weight, old_age)
+        moved = () if target is animal else (target.id,)
+        self._emit(Updated([target.id], [target], moved))
+        return target
+
+    def taxon_stats(self, lineage=()):
+        """Статистика таксона за O(1): число, вес, средние, возрасты."""
+        return self._taxonomy.stats(lineage)
+
+    def verify_stats(self):
+        """Сверка кэша статистики с пересчётом; список расхождений."""
+        return self._taxonomy.verify(self)
+
+    def remove_animal(self, animal):
+        """Удалить животное за O(1); False - его нет на ферме."""
+        if not self._discard(animal):
+            return False
+        self._emit(Removed((animal.id,)))
+        self._maybe_compact()
+        return True
+
+    def remove_where(self, predicate):
+        """Удалить всех, для кого predicate(animal) истинно; их число."""
+        removed = [animal for animal in self if predicate(animal)]
+        for animal in removed:
+            self._discard(animal)
+        if removed:
+            self._emit(Removed(animal.id for animal in removed))
+            self._maybe_compact()
+        return len(removed)
+
+    def _discard(self, animal):
+        slot = self._slot_of.pop(id(animal), None)
+        if slot is None:
+            return False
+        self._fresh.discard(id(animal))
+        self._set_slot(slot, None)
+        self._free.append(slot)
+        key = self._key(animal)
+        if self._index.get(key) is animal:
+            del self._index[key]
+        if self._by_id.get(animal.id) is animal:
+            del self._by_id[animal.id]
+        self._taxonomy.remove(animal)
+        return True
+
+    @property
+    def tombstones(self):
+        """Число пустых слотов, ждущих уплотнения."""
+        return len(self._free)
+
+    def _maybe_compact(self):
+        slots = self._size
+        if slots >= COMPACT_MIN_SLOTS and len(self._free) > COMPACT_RATIO * slots:
+            self.compact()
+
+    def compact(self):
+        """Убрать надгробия: животные сдвигаются, порядок сохраняется.
+
+        Блоки собираются заново, поэтому снимки не затрагиваются.
+        """
+        if not self._free:
+            return
+        animals = list(self)
+        self._chunks = [animals[i:i + CHUNK_SIZE]
+                        for i in range(0, len(animals), CHUNK_SIZE)]
+        self._size = len(animals)
+        self._slot_of = {id(animal): i for i, animal in enumerate(animals)}
+        self._free = []
+        self._owned = set(range(len(self._chunks)))
+        self._dir_shared = False
+
+    def get_by_id(self, animal_id):
+        """Животное по id за O(1) или None (id на ферме уникальны)."""
+        return self._by_id.get(animal_id)
+
+    def get_by_key(self, key):
+        """Животное по ключу фермы (см. FARM_KEYS)."""
+        return self._index.get(key)
 
     def get_by_name(self, name):
         """Найти по кличке."""
-        for animal in self._animals:
+        for animal in self:
             if animal.name == name:
                 return animal
         return None
 
     def count(self):
         """Количество животных."""
-        return len(self._animals)
+        return len(self._slot_of)
 
     def clear(self):
         """Очистить ферму."""
-        self._animals.clear()
+        self._chunks = []
+        self._size = 0
+        self._slot_of = {}
+        self._free = []
+        self._owned = set()
+        self._dir_shared = False
+        self._fresh = set()
+        self._index.clear()
+        self._by_id.clear()
+        self._taxonomy.clear()
+        self._emit(Cleared())
 
     def __len__(self):
-        return len(self._animals)
+        return len(self._slot_of)
 
     def __iter__(self):
-        return iter(self._animals)
+        # Надгробия пропускаются на уровне C, без генератора
+        return filter(_is_animal, chain.from_iterable(self._chunks))
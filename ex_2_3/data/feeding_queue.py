@@ -0,0 +1,77 @@
+"""
+Очередь кормления - Deque с уведомлениями об изменениях
+
+Элемент очереди - запись (номер записи, id животного, подпись).
+Номер записи уникален, поэтому одно животное может стоять в очереди
+дважды, а событие Removed всё равно указывает точную запись.
+"""
+
+from itertools import count
+
+from structures import Deque
+from data.events import Observable, Inserted, Removed, Cleared
+
+
+class FeedingQueue(Observable):
+    """Очередь кормления: обычные - в конец, срочные - в начало."""
+
+    def __init__(self):
+        super().__init__()
+        self._deque = Deque()
+        self._entry_ids = count()
+
+    def push_back(self, animal_id, label):
+        """Обычное кормление - в конец."""
+        entry = (next(self._entry_ids), animal_id, label)
+        self._deque.push_back(entry)
+        size = self._deque.size()
+        self._emit(Inserted(size - 1, size, (entry,)))
+        return entry
+
+    def push_front(self, animal_id, label):
+        """Срочное кормление - в начало."""
+        entry = (next(self._entry_ids), animal_id, label)
+        self._deque.push_front(entry)
+        self._emit(Inserted(0, 1, (entry,)))
+        return entry
+
+    def pop_front(self):
+        """Следующий на кормление (или None)."""
+        entry = self._deque.pop_front()
+        if entry is not None:
+            self._emit(Removed((entry[0],)))
+        return entry
+
+    def clear(self):
+        self._deque.clear()
+        self._emit(Cleared())
+
+    def remove_animals(self, animal_ids):
+        """Убрать из очереди все записи указанных животных."""
+        animal_ids = set(animal_ids)
+        removed = self._deque.remove_if(lambda entry: entry[1] in animal_ids)
+        if removed:
+            self._emit(Removed(entry[0] for entry in removed))
+        return len(removed)
+
+    def track(self, farm):
+        """Следить за фермой: удалённые животные уходят из очереди."""
+        farm.subscribe(self._on_farm_event)
+
+    def _on_farm_event(self, event):
+        if isinstance(event, Removed):
+            self.remove_animals(event.ids)
+        elif isinstance(event, Cleared):
+            self.clear()
+
+    def is_empty(self):
+        return self._deque.is_empty()
+
+    def size(self):
+        return self._deque.size()
+
+    def to_list(self):
+        return self._deque.to_list()
+
+    def __len__(self):
+        return self._deque.size()
@@ -0,0 +1,73 @@
+"""
+Потокобезопасный генератор идентификаторов
+
+Каждый поток резервирует у общего счётчика блок ID и дальше раздаёт
+их без блокировки. Счётчик можно продвинуть за уже сохранённые ID,
+чтобы после загрузки файла новые объекты не получили занятые номера.
+"""
+
+import threading
+
+
+class IdAllocator:
+    """Выдача уникальных ID блоками на поток."""
+
+    def __init__(self, start=0, block_size=1024):
+        if block_size < 1:
+            raise ValueError("Размер блока должен быть положительным")
+        self.__lock = threading.Lock()
+        self.__next = start  # первый ещё не зарезервированный ID
+        self.__block_size = block_size
+        self.__generation = 0  # растёт, когда блоки потоков устаревают
+        self.__blocks = {}  # поток -> (start, end) его текущего блока
+        self.__local = threading.local()
+
+    def next_id(self):
+        """Следующий ID для текущего потока."""
+        local = self.__local
+        current = getattr(local, "current", 0)
+        if current >= getattr(local, "end", 0) or local.generation != self.__generation:
+            with self.__lock:
+                current = self.__next
+                self.__next += self.__block_size
+                local.end = self.__next
+                local.generation = self.__generation
+                self.__blocks[threading.get_ident()] = (current, local.end)
+        local.current = current + 1
+        return current
+
+    def reserve(self, count):
+        """Зарезервировать диапазон [start, end) из count ID."""
+        if count < 0:
+            raise ValueError("Количество ID не может быть отрицательным")
+        with self.__lock:
+            start = self.__next
+            self.__next += count
+            return start, self.__next
+
+    def observe(self, used_id):
+        """Учесть внешний (загруженный) ID: новые будут больше него.
+
+        Если ID попал в ещё не розданный блок какого-то потока, блоки
+        всех потоков сбрасываются. ID меньше уже выданных так не
+        перевыдаётся, но с выданным раньше объектом он может совпасть -
+        такой повтор ловит ферма и выдаёт пришедшему животному новый ID.
+        """
+        with self.__lock:
+            if used_id >= self.__next:
+                self.__next = used_id + 1
+            elif any(start <= used_id < end
+                     for start, end in self.__blocks.values()):
+                self.__generation += 1
+                self.__blocks.clear()
+
+    def resume_from(self, used_ids):
+        """Продолжить нумерацию после набора сохранённых ID."""
+        top = max(used_ids, default=None)
+        if top is not None:
+            self.observe(top)
+
+    def peek(self):
+        """Первый свободный ID (без резервирования)."""
+        with self.__lock:
+            return self.__next
@@ -0,0 +1,163 @@
+"""
+Реестр живых объектов модели и отчёт о памяти
+
+Счётчик ID знает, сколько объектов было создано, но не сколько их живо
+сейчас. После enable() каждый новый ранг (TaxonomicRank и наследники,
+включая Animal) и узел TaxonNode попадает в WeakSet своего класса -
+сборщик мусора сам убирает оттуда удалённые объекты, а сами объекты
+реестр не удерживает. По умолчанию реестр выключен и стоит один
+вызов пустой функции на объект.
+
+memory_report() собирает:
+- число объектов и байты по классам (sys.getsizeof объекта, его __dict__
+  и строк-атрибутов);
+- повторяющиеся имена таксонов - разные объекты одного таксона
+  (признак того, что импорт шёл мимо TaxonomyRegistry);
+- главные места выделения памяти, если включён tracemalloc.
+"""
+
+import sys
+import tracemalloc
+import weakref
+
+
+_live = None  # имя класса -> WeakSet, None - реестр выключен
+
+
+def _noop(obj):
+    pass
+
+
+def _track(obj):
+    name = type(obj).__name__
+    objects = _live.get(name)
+    if objects is None:
+        objects = _live[name] = weakref.WeakSet()
+    objects.add(obj)
+
+
+track = _noop  # подменяется в enable()/disable()
+
+
+def enable(trace_allocations=False):
+    """Начать учёт новых объектов (уже созданные не учитываются).
+
+    trace_allocations=True дополнительно запускает tracemalloc.
+    """
+    global _live, track
+    if _live is None:
+        _live = {}
+    track = _track
+    if trace_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Выключить учёт и забыть собранное."""
+    global _live, track
+    _live = None
+    track = _noop
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _live is not None
+
+
+def live_objects(class_name):
+    """Живые учтённые объекты класса (список)."""
+    if _live is None or class_name not in _live:
+        return []
+    return list(_live[class_name])
+
+
+def live_counts():
+    """{имя класса: число живых учтённых объектов}."""
+    if _live is None:
+        return {}
+    return {name: len(objects) for name, objects in _live.items() if len(objects)}
+
+
+def object_size(obj):
+    """Байты объекта: сам объект, __dict__ и строки-атрибуты."""
+    size = sys.getsizeof(obj)
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes)
+        for value in attributes.values():
+            if isinstance(value, str):
+                size += sys.getsizeof(value)
+    return size
+
+
+class MemoryReport:
+    """Снимок расхода памяти объектами модели."""
+
+    def __init__(self, by_class, duplicates, top_allocations):
+        self.by_class = by_class  # имя класса -> (число, байт)
+        self.duplicates = duplicates  # имя класса -> {имя таксона: копий}
+        self.top_allocations = top_allocations  # [(место, байт, блоков)]
+
+    @property
+    def total_bytes(self):
+        return sum(size for _, size in self.by_class.values())
+
+    def format(self):
+        """Текст отчёта."""
+        lines = ["Объекты модели:"]
+        for name, (count, size) in sorted(self.by_class.items(),
+                                          key=lambda item: -item[1][1]):
+            per_object = size / count if count else 0
+            lines.append(f"  {name:<14} {count:>9} шт. {size / 1024:>11.1f} КБ"
+                         f"  ({per_object:.0f} Б/шт.)")
+        lines.append(f"  {'Всего':<14} {'':>9}     {self.total_bytes / 1024:>11.1f} КБ")
+
+        if self.duplicates:
+            lines.append("Повторяющиеся таксоны (разные объекты с одним именем):")
+            for name, names in sorted(self.duplicates.items()):
+                extra = sum(copies - 1 for copies in names.values())
+                sample = ", ".join(f"{taxon} x{copies}" for taxon, copies
+                                   in sorted(names.items(), key=lambda i: -i[1])[:5])
+                lines.append(f"  {name}: лишних объектов {extra} ({sample})")
+
+        if self.top_allocations:
+            lines.append("Больше всего памяти выделено в:")
+            for where, size, blocks in self.top_allocations:
+                lines.append(f"  {size / 1024:>9.1f} КБ {blocks:>8} блоков  {where}")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.format()
+
+
+# Классы, где повтор имени означает лишнюю копию таксона
+TAXON_CLASSES = ("Phylum", "ClassAnimal", "Order", "Family", "Genus", "Species")
+
+
+def memory_report(top=10):
+    """Отчёт по учтённым объектам (нужен enable() до импорта)."""
+    by_class = {}
+    duplicates = {}
+    if _live is not None:
+        for name, objects in _live.items():
+            objects = list(objects)
+            if not objects:
+                continue
+            by_class[name] = (len(objects), sum(map(object_size, objects)))
+            if name in TAXON_CLASSES:
+                names = {}
+                for obj in objects:
+                    names[obj.name] = names.get(obj.name, 0) + 1
+                repeated = {taxon: copies for taxon, copies in names.items()
+                            if copies > 1}
+                if repeated:
+                    duplicates[name] = repeated
+
+    top_allocations = []
+    if tracemalloc.is_tracing():
+        for stat in tracemalloc.take_snapshot().statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            top_allocations.append(
+                (f"{frame.filename}:{frame.lineno}", stat.size, stat.count))
+    return MemoryReport(by_class, duplicates, top_allocations)
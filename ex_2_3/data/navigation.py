@@ -0,0 +1,91 @@
+"""
+История просмотра: назад и вперёд по id животных
+
+Два ограниченных стека поверх Deque: "назад" и "вперёд", между ними -
+текущее животное. Хранятся id, а не клички: одинаковые клички не
+путаются, а само животное находится через Farm.get_by_id за O(1).
+Старые записи вытесняются, когда стек "назад" длиннее max_size.
+Если следить за фермой (track), удалённые животные пропадают
+из истории сами, а очистка фермы очищает и историю.
+"""
+
+from structures import Deque
+from data.events import Removed, Cleared
+
+
+class NavigationHistory:
+    """Навигация назад/вперёд, как в браузере."""
+
+    def __init__(self, max_size=100):
+        self._max_size = max_size
+        self._back = Deque()  # старые слева, последний просмотренный справа
+        self._forward = Deque()  # ближайший "вперёд" справа
+        self._current = None
+
+    @property
+    def current(self):
+        """id текущего животного или None."""
+        return self._current
+
+    def visit(self, animal_id):
+        """Открыть животное: текущее уходит в "назад", "вперёд" сбрасывается."""
+        if animal_id == self._current:
+            return
+        if self._current is not None:
+            self._back.push_back(self._current)
+            if self._back.size() > self._max_size:
+                self._back.pop_front()
+        self._forward.clear()
+        self._current = animal_id
+
+    def back(self):
+        """Шаг назад; id нового текущего или None, если некуда."""
+        if self._back.is_empty():
+            return None
+        if self._current is not None:
+            self._forward.push_back(self._current)
+        self._current = self._back.pop_back()
+        return self._current
+
+    def forward(self):
+        """Шаг вперёд; id нового текущего или None, если некуда."""
+        if self._forward.is_empty():
+            return None
+        if self._current is not None:
+            self._back.push_back(self._current)
+        self._current = self._forward.pop_back()
+        return self._current
+
+    def can_go_back(self):
+        return not self._back.is_empty()
+
+    def can_go_forward(self):
+        return not self._forward.is_empty()
+
+    def purge(self, animal_ids):
+        """Убрать животных из истории (например, удалённых с фермы)."""
+        animal_ids = set(animal_ids)
+        self._back.remove_if(lambda animal_id: animal_id in animal_ids)
+        self._forward.remove_if(lambda animal_id: animal_id in animal_ids)
+        if self._current in animal_ids:
+            self._current = self._back.pop_back()
+
+    def clear(self):
+        self._back.clear()
+        self._forward.clear()
+        self._current = None
+
+    def track(self, farm):
+        """Следить за фермой: удалённые животные уходят из истории."""
+        farm.subscribe(self._on_farm_event)
+
+    def _on_farm_event(self, event):
+        if isinstance(event, Removed):
+            self.purge(event.ids)
+        elif isinstance(event, Cleared):
+            self.clear()
+
+    def __len__(self):
+        """Всего записей: назад + текущая + вперёд."""
+        current = 1 if self._current is not None else 0
+        return self._back.size() + current + self._forward.size()
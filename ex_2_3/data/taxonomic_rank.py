@@ -5,21 +5,48 @@
 - protected атрибуты (_name) для наследников
 - private атрибуты (__id) скрыты полностью
 - property для контролируемого доступа
+- private атрибут класса (__id_allocator) - общий потокобезопасный счётчик
 """
 
 from abc import ABC, abstractmethod
 
+from data import live_objects
+from data.id_allocator import IdAllocator
+
 
 class TaxonomicRank(ABC):
     """Абстрактный базовый класс таксономии."""
 
-    __id_counter = 0  # private атрибут класса
+    __id_allocator = IdAllocator()  # private атрибут класса
 
-    def __init__(self, name, description=""):
+    def __init__(self, name, description="", rank_id=None):
         self._name = name
         self._description = description
-        self.__id = TaxonomicRank.__id_counter
-        TaxonomicRank.__id_counter += 1
+        if rank_id is None:
+            self.__id = TaxonomicRank.__id_allocator.next_id()
+        else:
+            # ID из сохранённых данных - новые не должны с ним совпасть
+            self.__id = int(rank_id)
+            TaxonomicRank.__id_allocator.observe(self.__id)
+        live_objects.track(self)
+
+    @classmethod
+    def id_allocator(cls):
+        """Общий генератор ID всех рангов."""
+        return cls.__id_allocator
+
+    @classmethod
+    def _new_unchecked(cls, name, description, rank_id):
+        """Создать объект без __init__ (для доверенных массовых путей).
+
+        ID должен быть уже зарезервирован вызывающим кодом.
+        """
+        obj = cls.__new__(cls)
+        obj._name = name
+        obj._description = description
+        obj.__id = rank_id
+        live_objects.track(obj)
+        return obj
 
     @property
     def name(self):
@@ -44,6 +71,10 @@ class TaxonomicRank(ABC):
         """Только чтение - нет сеттера."""
         return self.__id
 
+    def _reassign_id(self):
+        """Выдать новый ID (загруженный совпал с уже занятым на ферме)."""
+        self.__id = TaxonomicRank.__id_allocator.next_id()
+
     @abstractmethod
     def get_parent(self):
         """Получить родительский ранг."""
@@ -0,0 +1,126 @@
+"""
+Реестр таксонов - интернирование цепочек рангов
+
+Одинаковые Тип/Класс/.../Вид из разных записей превращаются в один
+и тот же объект (агрегация: две кошки ссылаются на один Species).
+Записи из файлов сначала собираются в столбцы, а затем одним пакетом
+превращаются в животных через Animal.bulk_create.
+"""
+
+from data.phylum import Phylum
+from data.class_animal import ClassAnimal
+from data.order import Order
+from data.family import Family
+from data.genus import Genus
+from data.species import Species
+from data.animal import Animal
+
+
+UNKNOWN = "Неизвестно"
+
+LINEAGE_KEYS = ("phylum", "class", "order", "family", "genus", "species")
+
+# Конструкторы рангов по уровню: (имя, родитель) -> объект
+_RANK_FACTORIES = (
+    lambda name, parent: Phylum(name),
+    ClassAnimal,
+    Order,
+    Family,
+    Genus,
+    Species,
+)
+
+
+def to_number(value, kind, default=None):
+    """Строку из файла - в число; некорректное значение отсеет проверка."""
+    if isinstance(value, str):
+        try:
+            return kind(value) if value else default
+        except ValueError:
+            return value
+    return value
+
+
+def records_to_columns(records):
+    """Словари записей -> столбцы для TaxonomyRegistry.animals_from_columns.
+
+    Одинаковые линии (кортежи имён рангов) хранятся один раз, в столбце
+    'lineage' - только их номера. Так столбцы компактно передаются
+    между процессами. Записи, которые не разобрать (не словарь, линия
+    не из строк), остаются пустыми строками и попадают в 'invalid'
+    {номер строки: сообщение} - Animal.bulk_create отбросит их.
+    """
+    lineage_index = {}
+    columns = {
+        'name': [], 'lineage': [], 'age': [], 'weight': [],
+        'description': [], 'id': [], 'lineages': [], 'invalid': {},
+    }
+    name_col, lineage_col = columns['name'], columns['lineage']
+    age_col, weight_col = columns['age'], columns['weight']
+    description_col, id_col = columns['description'], columns['id']
+    invalid = columns['invalid']
+    for row, data in enumerate(records):
+        try:
+            lineage = tuple(data.get(key) or UNKNOWN for key in LINEAGE_KEYS)
+            number = lineage_index.get(lineage)
+        except (AttributeError, TypeError):  # не словарь или линия из списков
+            data = {}
+            lineage = (UNKNOWN,) * len(LINEAGE_KEYS)
+            number = lineage_index.get(lineage)
+            invalid[row] = "Запись должна быть словарём со строковой линией"
+        if number is None:
+            number = lineage_index[lineage] = len(lineage_index)
+        name_col.append(data.get('name', 'Безымянный'))
+        lineage_col.append(number)
+        age_col.append(to_number(data.get('age', 0), int, 0))
+        weight_col.append(to_number(data.get('weight', 0.0), float, 0.0))
+        description_col.append(data.get('description', ''))
+        id_col.append(to_number(data.get('id'), int))
+    columns['lineages'] = list(lineage_index)
+    return columns
+
+
+class TaxonomyRegistry:
+    """Общие объекты рангов, найденные по цепочке имён."""
+
+    def __init__(self):
+        self._by_prefix = {}  # кортеж имён от Типа -> объект ранга
+
+    def get_species(self, lineage):
+        """Species для кортежа (тип, класс, отряд, семейство, род, вид)."""
+        species = self._by_prefix.get(lineage)
+        if species is not None:
+            return species
+        parent = None
+        for level, factory in enumerate(_RANK_FACTORIES):
+            prefix = lineage[:level + 1]
+            node = self._by_prefix.get(prefix)
+            if node is None:
+                node = factory(prefix[-1], parent)
+                self._by_prefix[prefix] = node
+            parent = node
+        return parent
+
+    def species_for_record(self, data):
+        """Species по словарю записи."""
+        return self.get_species(
+            tuple(data.get(key) or UNKNOWN for key in LINEAGE_KEYS))
+
+    def animals_from_columns(self, columns, errors=None):
+        """Животные из столбцов records_to_columns (см. Animal.bulk_create)."""
+        species_by_number = [self.get_species(lineage)
+                             for lineage in columns['lineages']]
+        batch = dict(columns)
+        batch['species'] = [species_by_number[i] for i in columns['lineage']]
+        return Animal.bulk_create(batch, errors)
+
+    def records_to_animals(self, records, errors=None):
+        """Животные из словарей записей одним пакетом."""
+        return self.animals_from_columns(records_to_columns(records), errors)
+
+    def clear(self):
+        self._by_prefix.clear()
+
+    def __len__(self):
+        """Число различных видов."""
+        return sum(1 for key in self._by_prefix if len(key) == len(LINEAGE_KEYS))
@@ -0,0 +1,264 @@
+"""
+Дерево таксономии всей фермы
+
+Узлы Тип → Класс → Отряд → Семейство → Род → Вид создаются по мере
+добавления животных. Агрегаты каждого узла - количество, суммарный вес,
+сумма возрастов и гистограмма возрастов - обновляются инкрементально
+при добавлении, изменении и удалении животных, поэтому любая статистика
+читается за O(1). verify() сверяет их с полным пересчётом.
+"""
+
+import math
+from collections import Counter
+
+from data import live_objects
+
+RANK_NAMES = ("Тип", "Класс", "Отряд", "Семейство", "Род", "Вид")
+
+
+def get_lineage(animal):
+    """Имена рангов животного от Типа до Вида."""
+    species = animal.species
+    genus = species.genus
+    family = genus.family
+    order = family.order
+    class_animal = order.class_animal
+    phylum = class_animal.phylum
+    return (phylum.name, class_animal.name, order.name,
+            family.name, genus.name, species.name)
+
+
+class TaxonNode:
+    """Узел дерева: дочерние таксоны (или животные у вида) + агрегаты."""
+
+    def __init__(self, rank, name, parent=None, row=0):
+        self.rank = rank  # индекс в RANK_NAMES, -1 у корня
+        self.name = name
+        self.parent = parent
+        self.row = row  # позиция среди детей родителя
+        self.children = {}  # имя -> TaxonNode
+        self.child_nodes = []  # те же узлы в порядке появления
+        self.animals = []  # заполняется только у видов
+        self.count = 0
+        self.total_weight = 0.0
+        self.total_age = 0
+        self.ages = {}  # возраст -> число животных
+        live_objects.track(self)
+
+    @property
+    def rank_name(self):
+        return RANK_NAMES[self.rank] if self.rank >= 0 else "Ферма"
+
+    @property
+    def is_species(self):
+        return self.rank == len(RANK_NAMES) - 1
+
+    @property
+    def mean_weight(self):
+        return self.total_weight / self.count if self.count else 0.0
+
+    @property
+    def mean_age(self):
+        return self.total_age / self.count if self.count else 0.0
+
+    def stats(self):
+        """Сводка узла одним словарём."""
+        return {
+            "rank": self.rank_name,
+            "name": self.name,
+            "count": self.count,
+            "total_weight": self.total_weight,
+            "mean_weight": self.mean_weight,
+            "mean_age": self.mean_age,
+            "ages": dict(sorted(self.ages.items())),
+        }
+
+    def child_count(self):
+        """Число детей: таксонов или животных."""
+        if self.is_species:
+            return len(self.animals)
+        return len(self.child_nodes)
+
+    def _get_or_create(self, name):
+        child = self.children.get(name)
+        if child is None:
+            child = TaxonNode(self.rank + 1, name, self, len(self.child_nodes))
+            self.children[name] = child
+            self.child_nodes.append(child)
+        return child
+
+    def _account(self, count, weight, age_total, ages):
+        """Прибавить (или вычесть, если count < 0) группу животных."""
+        self.count += count
+        self.total_weight += weight
+        self.total_age += age_total
+        histogram = self.ages
+        for age, n in ages.items():
+            n += histogram.get(age, 0)
+            if n:
+                histogram[age] = n
+            else:
+                del histogram[age]
+
+    def __repr__(self):
+        return f"TaxonNode({self.rank_name}: '{self.name}', {self.count})"
+
+
+class TaxonomyTree:
+    """Сводное дерево таксонов фермы."""
+
+    def __init__(self):
+        self._root = TaxonNode(-1, "")
+        # id(животного) -> позиция в animals его вида: удаление за O(1)
+        self._positions = {}
+
+    @property
+    def root(self):
+        return self._root
+
+    def _path(self, lineage, create=True):
+        """Узлы от корня до вида по линии."""
+        node = self._root
+        path = [node]
+        for name in lineage:
+            node = node._get_or_create(name) if create else node.children[name]
+            path.append(node)
+        return path
+
+    def add(self, animal):
+        """Учесть животное во всех узлах его линии."""
+        weight, age = animal.weight, animal.age
+        path = self._path(get_lineage(animal))
+        for node in path:
+            node._account(1, weight, age, {age: 1})
+        species = path[-1]
+        self._positions[id(animal)] = len(species.animals)
+        species.animals.append(animal)
+
+    def add_many(self, animals):
+        """Учесть пакет животных: линия проходится один раз на вид."""
+        groups = {}
+        for animal in animals:
+            group = groups.get(animal.species)
+            if group is None:
+                group = groups[animal.species] = []
+            group.append(animal)
+        for species, group in groups.items():
+            ages = Counter(animal.age for animal in group)
+            weight = sum(animal.weight for animal in group)
+            age_total = sum(age * n for age, n in ages.items())
+            path = self._path(get_lineage(group[0]))
+            for node in path:
+                node._account(len(group), weight, age_total, ages)
+            species = path[-1]
+            start = len(species.animals)
+            self._positions.update(
+                (id(animal), start + i) for i, animal in enumerate(group))
+            species.animals.extend(group)
+
+    def remove(self, animal):
+        """Вычесть животное из узлов его линии за O(1).
+
+        Сами узлы остаются, порядок животных внутри вида может измениться.
+        """
+        self._discard(animal, animal.weight, animal.age, get_lineage(animal))
+
+    def update(self, animal, old_weight, old_age, old_lineage=None):
+        """Учесть изменение животного: вес, возраст и, возможно, вид.
+
+        old_lineage - линия до изменения (None - вид не менялся).
+        Возвращает True, если животное перешло в другой вид: тогда
+        порядок животных в старом виде изменился.
+        """
+        lineage = get_lineage(animal)
+        if old_lineage is not None and old_lineage != lineage:
+            self._discard(animal, old_weight, old_age, old_lineage)
+            self.add(animal)
+            return True
+        weight, age = animal.weight, animal.age
+        if weight == old_weight and age == old_age:
+            return False
+        ages = {} if age == old_age else {old_age: -1, age: 1}
+        for node in self._path(lineage, create=False):
+            node._account(0, weight - old_weight, age - old_age, ages)
+        return False
+
+    def replace(self, animal, other):
+        """Поставить other на место animal в его виде (вес, возраст и вид те же)."""
+        pos = self._positions.pop(id(animal))
+        self.find_species(animal).animals[pos] = other
+        self._positions[id(other)] = pos
+
+    def _discard(self, animal, weight, age, lineage):
+        path = self._path(lineage, create=False)
+        for node in path:
+            node._account(-1, -weight, -age, {age: -1})
+        # На место удалённого встаёт последнее животное вида
+        animals = path[-1].animals
+        pos = self._positions.pop(id(animal))
+        last = animals.pop()
+        if last is not animal:
+            animals[pos] = last
+            self._positions[id(last)] = pos
+
+    def find(self, lineage):
+        """Узел по префиксу линии (кортеж имён от Типа)."""
+        node = self._root
+        for name in lineage:
+            node = node.children.get(name)
+            if node is None:
+                return None
+        return node
+
+    def find_species(self, animal):
+        """Узел вида, к которому отнесено животное."""
+        return self.find(get_lineage(animal))
+
+    def stats(self, lineage=()):
+        """Сводка по таксону (пустая линия - вся ферма) или None."""
+        node = self.find(lineage)
+        return node.stats() if node is not None else None
+
+    def verify(self, animals):
+        """Сверить агрегаты с полным пересчётом по animals.
+
+        Возвращает список расхождений (пустой - всё сходится).
+        """
+        expected = TaxonomyTree()
+        expected.add_many(animals)
+        problems = []
+        self._compare(self._root, expected._root, (), problems)
+        return problems
+
+    @staticmethod
+    def _compare(node, other, lineage, problems):
+        where = " / ".join(lineage) or "Ферма"
+        if other is None:
+            if node.count or node.ages or node.animals:
+                problems.append(f"{where}: лишний узел с {node.count} животными")
+            return
+        if node is None:
+            problems.append(f"{where}: нет узла ({other.count} животных)")
+            return
+        if node.count != other.count:
+            problems.append(f"{where}: count {node.count} != {other.count}")
+        if not math.isclose(node.total_weight, other.total_weight,
+                            rel_tol=1e-9, abs_tol=1e-6):
+            problems.append(
+                f"{where}: вес {node.total_weight} != {other.total_weight}")
+        if node.total_age != other.total_age or node.ages != other.ages:
+            problems.append(f"{where}: возрасты не сходятся")
+        if node.is_species and (
+                sorted(map(id, node.animals)) != sorted(map(id, other.animals))):
+            problems.append(f"{where}: список животных не сходится")
+        for name in node.children.keys() | other.children.keys():
+            TaxonomyTree._compare(node.children.get(name), other.children.get(name),
+                                  lineage + (name,), problems)
+
+    def clear(self):
+        """Сбросить дерево (старые узлы остаются у держателей ссылок)."""
+        self._root = TaxonNode(-1, "")
+        self._positions = {}
+
+    def __len__(self):
+        return self._root.count
@@ -0,0 +1,419 @@
+"""
+История веса животных - компактные временные ряды
+
+Ферма взвешивает животных раз в день. Для каждого животного хранится
+ряд по дням: вес в целых единицах (по умолчанию 0.1 кг), а в массиве -
+только разница с предыдущим днём, по одному байту (array('b')).
+Редкие большие скачки уходят в отдельную таблицу "исключений".
+Каждые CHECKPOINT дней запоминается абсолютное значение, поэтому вес
+на любой день - это контрольная точка плюс сумма не более чем
+CHECKPOINT байт (sum по срезу массива, без цикла в Python).
+
+Год ежедневных взвешиваний 100 тысяч животных - около 80 МБ вместе
+с накладными расходами на объекты (float-массив занял бы ~150 МБ,
+список float - больше 1 ГБ). Из них сами разницы - 36 МБ.
+Пропущенные дни заполняются последним известным весом.
+
+Для привеса по видам у каждого вида есть сводка по дням (_SpeciesDays),
+которая обновляется при каждой записи. Запрос за период - несколько
+sum по срезам массивов на вид, без цикла по животным.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import date
+from itertools import accumulate, repeat
+from operator import add, sub
+
+from data.events import Inserted, Updated, Removed, Cleared
+
+
+CHECKPOINT = 64
+_ESCAPE = -128  # в массиве разниц: настоящая разница - в таблице исключений
+
+PERIODS = ("day", "week", "month")
+
+
+def _ordinal(day):
+    """date или порядковый номер дня -> порядковый номер."""
+    return day.toordinal() if isinstance(day, date) else int(day)
+
+
+class _Series:
+    """Ряд одного животного: первый день, разницы, контрольные точки."""
+
+    __slots__ = ("start", "deltas", "checkpoints", "escape_at", "escape_delta",
+                 "last", "species")
+
+    def __init__(self, start, species=None):
+        self.start = start
+        self.species = species  # название вида для сводки или None
+        self.deltas = array("b")
+        self.checkpoints = array("i")
+        self.escape_at = None  # массивы создаются при первом исключении
+        self.escape_delta = None
+        self.last = 0
+
+    def __len__(self):
+        return len(self.deltas)
+
+    @property
+    def end(self):
+        """Последний день ряда."""
+        return self.start + len(self.deltas) - 1
+
+    def append(self, value):
+        i = len(self.deltas)
+        delta = value - self.last if i else 0
+        if i % CHECKPOINT == 0:
+            self.checkpoints.append(value)
+        if -127 <= delta <= 127:
+            self.deltas.append(delta)
+        else:
+            self.deltas.append(_ESCAPE)
+            if self.escape_at is None:
+                self.escape_at = array("I")
+                self.escape_delta = array("i")
+            self.escape_at.append(i)
+            self.escape_delta.append(delta)
+        self.last = value
+
+    def pop(self):
+        i = len(self.deltas) - 1
+        if self.deltas.pop() == _ESCAPE and self.escape_at:
+            self.escape_at.pop()
+            self.escape_delta.pop()
+        if i % CHECKPOINT == 0:
+            self.checkpoints.pop()
+        if i:
+            self.last = self.value(i - 1)
+
+    def _escapes(self, lo, hi):
+        """Поправка за исключения на позициях [lo, hi)."""
+        j = bisect_left(self.escape_at, lo)
+        k = bisect_left(self.escape_at, hi, j)
+        return sum(self.escape_delta[j:k]) - _ESCAPE * (k - j)
+
+    def value(self, i):
+        """Значение в позиции i: контрольная точка + сумма разниц."""
+        c = i // CHECKPOINT
+        lo = c * CHECKPOINT + 1
+        value = self.checkpoints[c]
+        if i >= lo:
+            value += sum(self.deltas[lo:i + 1])
+            if self.escape_at:
+                value += self._escapes(lo, i + 1)
+        return value
+
+    def values(self, lo, hi):
+        """Значения позиций [lo, hi) одним проходом accumulate."""
+        if lo >= hi:
+            return []
+        deltas = self.deltas[lo + 1:hi]
+        if self.escape_at is None:
+            return list(accumulate(deltas, initial=self.value(lo)))
+        j = bisect_left(self.escape_at, lo + 1)
+        k = bisect_left(self.escape_at, hi, j)
+        if j < k:
+            deltas = deltas.tolist()
+            for pos, delta in zip(self.escape_at[j:k], self.escape_delta[j:k]):
+                deltas[pos - lo - 1] = delta
+        return list(accumulate(deltas, initial=self.value(lo)))
+
+    def diffs(self):
+        """Настоящие разницы позиций 1..len-1 (с исключениями)."""
+        deltas = self.deltas[1:]
+        if self.escape_at is None:
+            return deltas
+        deltas = deltas.tolist()
+        for pos, delta in zip(self.escape_at, self.escape_delta):
+            deltas[pos - 1] = delta
+        return deltas
+
+    def nbytes(self):
+        size = (sys.getsizeof(self) + sys.getsizeof(self.deltas)
+                + sys.getsizeof(self.checkpoints))
+        if self.escape_at is not None:
+            size += sys.getsizeof(self.escape_at) + sys.getsizeof(self.escape_delta)
+        return size
+
+
+class _SpeciesDays:
+    """Сводка вида по дням (индекс массивов - день минус start).
+
+    gain[d] - сумма привесов животных со дня d-1 на день d,
+    pairs[d] - сколько животных взвешены в оба дня,
+    starts[d] / ends[d] - сколько рядов (из двух и более дней)
+    начинаются / заканчиваются в день d, count - сколько их всего.
+    """
+
+    __slots__ = ("start", "gain", "pairs", "starts", "ends", "count")
+
+    def __init__(self, start):
+        self.start = start
+        self.gain = array("q")
+        self.pairs = array("q")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.count = 0
+
+    def index(self, day):
+        """Позиция дня; массивы при необходимости растут в нужную сторону."""
+        i = day - self.start
+        if i < 0:
+            pad = bytes(-i * self.gain.itemsize)
+            for column in (self.gain, self.pairs, self.starts, self.ends):
+                column[0:0] = array("q", pad)
+            self.start, i = day, 0
+        elif i >= len(self.gain):
+            pad = bytes((i - len(self.gain) + 1) * self.gain.itemsize)
+            for column in (self.gain, self.pairs, self.starts, self.ends):
+                column.frombytes(pad)
+        return i
+
+    def add_series(self, series, sign):
+        """Учесть ряд целиком (sign=1) или убрать его (sign=-1)."""
+        if len(series) < 2:
+            return
+        self.starts[self.index(series.start)] += sign
+        self.ends[self.index(series.end)] += sign
+        self.count += sign
+        lo = self.index(series.start + 1)
+        hi = lo + len(series) - 1
+        op = add if sign > 0 else sub
+        self.gain[lo:hi] = array("q", map(op, self.gain[lo:hi], series.diffs()))
+        self.pairs[lo:hi] = array("q", map(add, self.pairs[lo:hi], repeat(sign)))
+
+    def rate(self, start, end):
+        """(число животных, сумма привесов / число пар дней) за [start, end]."""
+        lo = max(start + 1 - self.start, 0)
+        hi = max(end + 1 - self.start, 0)
+        pairs = sum(self.pairs[lo:hi])
+        if not pairs:
+            return None
+        # Рядов, где в период попало два дня и больше: все, кроме
+        # начавшихся не раньше end и закончившихся не позже start
+        count = (self.count - sum(self.starts[max(end - self.start, 0):])
+                 - sum(self.ends[:max(start + 1 - self.start, 0)]))
+        return count, sum(self.gain[lo:hi]) / pairs
+
+
+class WeightHistory:
+    """Ежедневные веса животных по их id."""
+
+    def __init__(self, precision=0.1):
+        self._precision = precision
+        self._scale = 1 / precision
+        self._series = {}  # id животного -> _Series
+        self._species_days = {}  # название вида -> _SpeciesDays
+
+    @property
+    def precision(self):
+        """Шаг хранения веса, кг."""
+        return self._precision
+
+    # --- запись ---
+
+    def record(self, animal_id, day, weight, species=None):
+        """Записать вес за день.
+
+        Дни идут по порядку: повторная запись за последний день
+        заменяет значение, запись в прошлое - ошибка. species -
+        название вида для growth_rates (запоминается до смены).
+        """
+        day = _ordinal(day)
+        value = round(weight * self._scale)
+        series = self._series.get(animal_id)
+        if series is None:
+            series = self._series[animal_id] = _Series(day, species)
+        elif species is not None and species != series.species:
+            self.set_species(animal_id, species)
+        days = None
+        if series.species is not None:
+            days = self._species_days.get(series.species)
+            if days is None:
+                days = self._species_days[series.species] = _SpeciesDays(day)
+        n = len(series.deltas)
+        if n:
+            end = series.start + n - 1
+            if day < end:
+                raise ValueError("Вес можно записывать только в конец истории")
+            if day == end:
+                old = series.last
+                series.pop()
+                series.append(value)
+                if days is not None and n > 1:
+                    days.gain[day - days.start] += value - old
+                return
+            for _ in range(day - end - 1):
+                self._append(series, series.last, days)  # пропуск - прошлый вес
+        self._append(series, value, days)
+
+    @staticmethod
+    def _append(series, value, days):
+        """Дописать день в ряд и в сводку его вида."""
+        n = len(series.deltas)
+        if days is not None and n:
+            end = series.start + n - 1
+            j = end - days.start
+            if j < 0 or j + 1 >= len(days.gain):
+                j = days.index(end)
+                days.index(end + 1)  # после j массивы растут только в конец
+            i = j + 1
+            days.gain[i] += value - series.last
+            days.pairs[i] += 1
+            days.ends[i] += 1
+            if n == 1:  # ряд стал парой дней - теперь он в сводке
+                days.starts[j] += 1
+                days.count += 1
+            else:
+                days.ends[j] -= 1
+        series.append(value)
+
+    def record_day(self, day, weights):
+        """Взвешивание за день: пары (id животного, вес) или словарь."""
+        if isinstance(weights, dict):
+            weights = weights.items()
+        for animal_id, weight in weights:
+            self.record(animal_id, day, weight)
+
+    def set_species(self, animal_id, species):
+        """Перенести ряд животного в сводку другого вида (за O(длины ряда))."""
+        series = self._series.get(animal_id)
+        if series is None or series.species == species:
+            return
+        self._species_add(series, -1)
+        series.species = species
+        self._species_add(series, 1)
+
+    def _species_add(self, series, sign):
+        if series.species is None or not len(series):
+            return
+        days = self._species_days.get(series.species)
+        if days is None:
+            days = self._species_days[series.species] = _SpeciesDays(series.start)
+        days.add_series(series, sign)
+
+    def track(self, farm, clock=date.today):
+        """Записывать текущий вес при добавлении и изменении животных фермы.
+
+        Удалённые с фермы животные забываются вместе с историей.
+        """
+        def on_event(event):
+            if isinstance(event, (Inserted, Updated)):
+                today = clock()
+                for animal in event.items:
+                    species = animal.species.name if animal.species else None
+                    self.record(animal.id, today, animal.weight, species)
+            elif isinstance(event, Removed):
+                for animal_id in event.ids:
+                    self.forget(animal_id)
+            elif isinstance(event, Cleared):
+                self.clear()
+        farm.subscribe(on_event)
+        return on_event
+
+    # --- чтение ---
+
+    def _clip(self, series, start, end):
+        """Позиции ряда для дней [start, end] (включительно)."""
+        lo = 0 if start is None else max(_ordinal(start) - series.start, 0)
+        hi = len(series) if end is None else min(_ordinal(end) - series.start + 1,
+                                                 len(series))
+        return lo, hi
+
+    def value_at(self, animal_id, day):
+        """Вес на день или None, если день вне истории."""
+        series = self._series.get(animal_id)
+        if series is None:
+            return None
+        i = _ordinal(day) - series.start
+        if not 0 <= i < len(series):
+            return None
+        return series.value(i) * self._precision
+
+    def range(self, animal_id, start=None, end=None):
+        """[(date, вес)] за дни [start, end]."""
+        series = self._series.get(animal_id)
+        if series is None:
+            return []
+        lo, hi = self._clip(series, start, end)
+        precision = self._precision
+        return [(date.fromordinal(series.start + lo + i), value * precision)
+                for i, value in enumerate(series.values(lo, hi))]
+
+    def downsample(self, animal_id, start=None, end=None, period="week"):
+        """Средний вес по дням, неделям (с понедельника) или месяцам.
+
+        [(первый день периода, средний вес)].
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Период: один из {PERIODS}")
+        result = []
+        bucket_key = None
+        total = count = 0
+        for day, weight in self.range(animal_id, start, end):
+            if period == "day":
+                key = day
+            elif period == "week":
+                key = date.fromordinal(day.toordinal() - day.weekday())
+            else:
+                key = day.replace(day=1)
+            if key != bucket_key:
+                if count:
+                    result.append((bucket_key, total / count))
+                bucket_key, total, count = key, 0.0, 0
+            total += weight
+            count += 1
+        if count:
+            result.append((bucket_key, total / count))
+        return result
+
+    def growth_rates(self, start, end):
+        """Средний суточный привес по видам за [start, end].
+
+        Привесы всех животных вида за все пары соседних дней периода
+        делятся на число таких пар - для животных, взвешенных весь
+        период, это среднее их привесов. Считаются только ряды с
+        известным видом (record(..., species) или track).
+        Работа - O(видов x дней периода) в C, без цикла по животным.
+        Возвращает {вид: (число животных, кг в сутки)}.
+        """
+        start, end = _ordinal(start), _ordinal(end)
+        precision = self._precision
+        result = {}
+        for species, days in self._species_days.items():
+            rate = days.rate(start, end)
+            if rate is not None and rate[0]:
+                result[species] = (rate[0], rate[1] * precision)
+        return result
+
+    def span(self, animal_id):
+        """(первый день, последний день) истории животного или None."""
+        series = self._series.get(animal_id)
+        if series is None or not len(series):
+            return None
+        return date.fromordinal(series.start), date.fromordinal(series.end)
+
+    def nbytes(self):
+        """Примерный объём памяти истории (ряды + словарь)."""
+        return (sys.getsizeof(self._series)
+                + sum(series.nbytes() for series in self._series.values())
+                + sum(sys.getsizeof(days.gain) * 4
+                      for days in self._species_days.values()))
+
+    def forget(self, animal_id):
+        series = self._series.pop(animal_id, None)
+        if series is not None:
+            self._species_add(series, -1)
+
+    def clear(self):
+        self._series.clear()
+        self._species_days.clear()
+
+    def __contains__(self, animal_id):
+        return animal_id in self._series
+
+    def __len__(self):
+        return len(self._series)
@@ -2,14 +2,52 @@
 
 from .formats import (
     ExportFormat,
+    LineFormat,
     JsonFormat,
+    JsonlFormat,
     CsvFormat,
     TxtFormat
 )
+from .compression import open_storage, detect_codec
+from .journal import FarmJournal
+from .snapshot import save_snapshot, load_snapshot
+from .offset_index import OffsetIndex
+from .lazy_records import LazyAnimal, LazyAnimalStore
+from .fanout import FanOutExporter
+from .hierarchy_report import (
+    HierarchyReport,
+    ReportFormat,
+    TextReport,
+    JsonReport,
+    HtmlReport
+)
+from .watch_folder import FolderWatcher
+from .diff import FarmDiff, FarmPatch, DiffResult, apply_patch
 
 __all__ = [
     'ExportFormat',
+    'LineFormat',
     'JsonFormat',
+    'JsonlFormat',
     'CsvFormat',
     'TxtFormat',
+    'open_storage',
+    'detect_codec',
+    'FarmJournal',
+    'save_snapshot',
+    'load_snapshot',
+    'OffsetIndex',
+    'LazyAnimal',
+    'LazyAnimalStore',
+    'FanOutExporter',
+    'HierarchyReport',
+    'ReportFormat',
+    'TextReport',
+    'JsonReport',
+    'HtmlReport',
+    'FolderWatcher',
+    'FarmDiff',
+    'FarmPatch',
+    'DiffResult',
+    'apply_patch',
 ]
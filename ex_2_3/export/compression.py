@@ -0,0 +1,92 @@
+"""
+Прозрачное сжатие файлов хранилища
+
+Любой формат (JSON, CSV, TXT) может читать и писать варианты
+.gz, .bz2 и .xz. Кодек определяется по расширению, а при чтении -
+ещё и по сигнатуре файла. Данные идут потоком через кодеки stdlib,
+файл целиком в память не распаковывается.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+# Расширение -> функция открытия двоичного потока
+CODECS = {
+    ".gz": lambda path, mode, level: gzip.open(
+        path, mode, compresslevel=9 if level is None else level),
+    ".bz2": lambda path, mode, level: bz2.open(
+        path, mode, compresslevel=9 if level is None else level),
+    ".xz": lambda path, mode, level: lzma.open(
+        path, mode, preset=level),
+}
+
+# Сигнатуры в начале файла
+MAGIC_BYTES = (
+    (b"\x1f\x8b", ".gz"),
+    (b"BZh", ".bz2"),
+    (b"\xfd7zXZ\x00", ".xz"),
+)
+
+
+def get_codec_suffix(filepath):
+    """Суффикс сжатия по имени файла ('.gz', ...) или None."""
+    lower = str(filepath).lower()
+    for suffix in CODECS:
+        if lower.endswith(suffix):
+            return suffix
+    return None
+
+
+def strip_codec_suffix(filepath):
+    """Имя файла без суффикса сжатия: animals.csv.gz -> animals.csv."""
+    suffix = get_codec_suffix(filepath)
+    return str(filepath)[:-len(suffix)] if suffix else str(filepath)
+
+
+def detect_codec(filepath):
+    """Кодек существующего файла: по расширению, иначе по сигнатуре."""
+    suffix = get_codec_suffix(filepath)
+    if suffix:
+        return suffix
+    try:
+        with open(filepath, "rb") as f:
+            head = f.read(6)
+    except OSError:
+        return None
+    for magic, codec in MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+def open_storage(filepath, mode="r", buffer_size=DEFAULT_BUFFER_SIZE,
+                 newline=None, compresslevel=None):
+    """Открыть текстовый файл хранилища, при необходимости через кодек.
+
+    mode: 'r', 'w' или 'a'. Возвращает текстовый поток в UTF-8.
+    """
+    if mode == "r":
+        codec = detect_codec(filepath)
+    else:
+        codec = get_codec_suffix(filepath)
+
+    if codec is None:
+        return open(filepath, mode, encoding="utf-8", newline=newline,
+                    buffering=buffer_size)
+
+    raw = CODECS[codec](filepath, mode + "b", compresslevel)
+    if mode == "r":
+        buffered = io.BufferedReader(raw, buffer_size)
+    else:
+        buffered = io.BufferedWriter(raw, buffer_size)
+    return io.TextIOWrapper(buffered, encoding="utf-8", newline=newline)
+
+
+def file_patterns(extension):
+    """Шаблоны для диалога выбора файла: *.csv *.csv.gz ..."""
+    return " ".join([f"*{extension}"] + [f"*{extension}{s}" for s in CODECS])
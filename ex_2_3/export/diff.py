@@ -0,0 +1,348 @@
+"""
+Разница между двумя выгрузками фермы и патч из неё
+
+Вчерашний и сегодняшний файл (любой формат моста, в том числе сжатый)
+сравниваются по ключу фермы: (кличка, вид) или id. Оба файла не обязаны
+помещаться в память - записи раскладываются по корзинам хешем ключа
+(временные файлы), и сравнивается одна пара корзин за раз: одинаковые
+ключи всегда попадают в корзины с одним номером.
+
+Результат - компактный патч в JSON Lines (первая строка - заголовок):
+    {"op": "add", "record": {...}}            новое животное целиком
+    {"op": "remove", "key": ...}              животное пропало
+    {"op": "update", "key": ..., "set": {...}} только изменившиеся поля
+Патч применяется к ферме с тем же ключом: FarmPatch(path).apply(farm).
+Операции в патче идут по корзинам, а не в порядке исходных файлов.
+"""
+
+import json
+import math
+import os
+import pickle
+import shutil
+import tempfile
+
+from data.animal import Animal
+from data.taxonomy_registry import TaxonomyRegistry, UNKNOWN, to_number
+from .compression import open_storage, detect_codec
+from .parallel import get_format_for
+
+
+# Сравниваемые поля записи (id - только как ключ)
+RECORD_FIELDS = ("name", "species", "genus", "family", "order", "class",
+                 "phylum", "age", "weight", "description")
+DIFF_KEYS = ("natural", "id")
+
+PATCH_FORMAT = "farm-patch"
+
+# Примерный объём текста исходника на одну корзину
+BUCKET_BYTES = 16 * 1024 * 1024
+# Сжатый файл в среднем во столько раз меньше текста
+_CODEC_RATIO = 5
+# Байт на запись, когда источник - не файл
+_RECORD_BYTES = 150
+# Строк во всех буферах корзин вместе; буфер корзины сбрасывается
+# на диск, когда набирает свою долю
+_BUFFER_ROWS = 64 * 1024
+
+
+def _iter_source(source, errors=None):
+    """Записи-словари: путь к файлу, ферма, снимок или набор записей.
+
+    Некорректные строки файла пропускаются и пишутся в errors (список).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fmt = get_format_for(source)
+        if fmt is None:
+            raise ValueError(f"Неизвестный формат: {source}")
+        yield from fmt.iter_records(source, errors)
+        return
+    for item in source:
+        yield item.to_dict() if isinstance(item, Animal) else item
+
+
+def _source_bytes(source):
+    """Оценка объёма источника в байтах текста."""
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        return size * _CODEC_RATIO if detect_codec(source) else size
+    try:
+        return len(source) * _RECORD_BYTES
+    except TypeError:
+        return 0
+
+
+def _normalize(record):
+    """Словарь записи -> кортеж RECORD_FIELDS и id (как у TaxonomyRegistry)."""
+    get = record.get
+    age = get("age", 0)
+    weight = get("weight", 0.0)
+    record_id = get("id")
+    values = (get("name", "Безымянный"), get("species") or UNKNOWN,
+              get("genus") or UNKNOWN, get("family") or UNKNOWN,
+              get("order") or UNKNOWN, get("class") or UNKNOWN,
+              get("phylum") or UNKNOWN,
+              to_number(age, int, 0) if age.__class__ is str else age,
+              to_number(weight, float, 0.0) if weight.__class__ is str else weight,
+              get("description") or "")
+    if record_id.__class__ is str:
+        record_id = to_number(record_id, int)
+    elif record_id.__class__ is float and record_id.is_integer():
+        record_id = int(record_id)
+    return values, record_id
+
+
+class DiffResult:
+    """Итог сравнения: сколько добавлено, удалено, изменено и как было."""
+
+    def __init__(self, patch=None):
+        self.patch = patch  # FarmPatch с записанными изменениями
+        self.added = 0
+        self.removed = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.skipped = 0  # некорректные записи и записи без ключа (для ключа id)
+
+    @property
+    def total_changes(self):
+        return self.added + self.removed + self.changed
+
+    def __repr__(self):
+        return (f"DiffResult(added={self.added}, removed={self.removed}, "
+                f"changed={self.changed}, unchanged={self.unchanged})")
+
+
+class FarmDiff:
+    """Сравнение двух источников по ключу фермы.
+
+    buckets - число корзин; по умолчанию столько, чтобы на корзину
+    приходилось около BUCKET_BYTES текста большего из источников.
+    Одна корзина - сравнение целиком в памяти, без временных файлов.
+    """
+
+    def __init__(self, key="natural", buckets=None, workdir=None):
+        if key not in DIFF_KEYS:
+            raise ValueError(f"Ключ: один из {DIFF_KEYS}")
+        self._key = key
+        self._buckets = buckets
+        self._workdir = workdir
+
+    def _rows(self, source, result):
+        """(ключ, значения, id) записей источника.
+
+        При ключе (кличка, вид) id выгрузки в патч не переносится:
+        у фермы, к которой его применят, свои id. Некорректные записи
+        пропускаются и считаются в result.skipped.
+        """
+        by_id = self._key == "id"
+        errors = []
+        for record in _iter_source(source, errors):
+            if record.__class__ is not dict:
+                result.skipped += 1
+                continue
+            values, record_id = _normalize(record)
+            if not by_id:
+                yield (values[0], values[1]), values, None
+            elif record_id is None or record_id.__class__ is not int:
+                result.skipped += 1
+            else:
+                yield record_id, values, record_id
+        result.skipped += len(errors)
+
+    def _bucket_count(self, old, new):
+        if self._buckets:
+            return self._buckets
+        size = max(_source_bytes(old), _source_bytes(new))
+        return max(1, math.ceil(size / BUCKET_BYTES))
+
+    def _partition(self, rows, count, directory, prefix):
+        """Разложить строки по файлам корзин пачками pickle."""
+        paths = [os.path.join(directory, f"{prefix}{i}.bucket")
+                 for i in range(count)]
+        files = [open(path, "wb") for path in paths]
+        buffers = [[] for _ in range(count)]
+        flush_rows = max(256, _BUFFER_ROWS // count)
+        try:
+            for row in rows:
+                i = hash(row[0]) % count
+                buffer = buffers[i]
+                buffer.append(row)
+                if len(buffer) >= flush_rows:
+                    pickle.dump(buffer, files[i], pickle.HIGHEST_PROTOCOL)
+                    buffer.clear()
+            for i, buffer in enumerate(buffers):
+                if buffer:
+                    pickle.dump(buffer, files[i], pickle.HIGHEST_PROTOCOL)
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    @staticmethod
+    def _load_bucket(path):
+        """Корзина -> {ключ: (значения, id)}; при повторе ключа - последняя."""
+        rows = {}
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return rows
+                for key, values, record_id in batch:
+                    rows[key] = (values, record_id)
+
+    @staticmethod
+    def _to_dict(rows):
+        return {key: (values, record_id) for key, values, record_id in rows}
+
+    def diff(self, old, new, patch_path):
+        """Сравнить old и new, записать патч в patch_path; DiffResult."""
+        result = DiffResult(FarmPatch(patch_path))
+        count = self._bucket_count(old, new)
+        with open_storage(patch_path, "w") as out:
+            writer = _PatchWriter(out, self._key)
+            if count == 1:
+                self._compare(self._to_dict(self._rows(old, result)),
+                              self._to_dict(self._rows(new, result)),
+                              writer, result)
+                return result
+            directory = tempfile.mkdtemp(prefix="farm-diff-", dir=self._workdir)
+            try:
+                old_paths = self._partition(self._rows(old, result), count,
+                                            directory, "old")
+                new_paths = self._partition(self._rows(new, result), count,
+                                            directory, "new")
+                for old_path, new_path in zip(old_paths, new_paths):
+                    self._compare(self._load_bucket(old_path),
+                                  self._load_bucket(new_path), writer, result)
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        return result
+
+    def _compare(self, old_rows, new_rows, writer, result):
+        """Сравнить пару корзин и дописать операции в патч."""
+        pop_old = old_rows.pop
+        for key, (values, record_id) in new_rows.items():
+            old = pop_old(key, None)
+            if old is None:
+                writer.add(values, record_id)
+                result.added += 1
+            elif old[0] == values:
+                result.unchanged += 1
+            else:
+                writer.update(key, old[0], values)
+                result.changed += 1
+        for key in old_rows:
+            writer.remove(key)
+            result.removed += 1
+
+
+class _PatchWriter:
+    """Строки патча в открытый файл."""
+
+    def __init__(self, out, key):
+        self._out = out
+        self._dumps = json.JSONEncoder(ensure_ascii=False,
+                                       separators=(",", ":")).encode
+        self._write({"format": PATCH_FORMAT, "key": key})
+
+    def _write(self, obj):
+        self._out.write(self._dumps(obj) + "\n")
+
+    def add(self, values, record_id):
+        record = dict(zip(RECORD_FIELDS, values))
+        if record_id is not None:
+            record["id"] = record_id
+        self._write({"op": "add", "record": record})
+
+    def remove(self, key):
+        self._write({"op": "remove", "key": key})
+
+    def update(self, key, old_values, new_values):
+        changed = {field: new for field, old, new
+                   in zip(RECORD_FIELDS, old_values, new_values) if old != new}
+        self._write({"op": "update", "key": key, "set": changed})
+
+
+class FarmPatch:
+    """Патч, записанный FarmDiff: чтение и применение к ферме."""
+
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    def header(self):
+        with open_storage(self._path, "r") as f:
+            header = json.loads(f.readline() or "{}")
+        if header.get("format") != PATCH_FORMAT:
+            raise ValueError(f"{self._path}: не патч фермы")
+        return header
+
+    def __iter__(self):
+        """Операции патча (словари) по порядку."""
+        with open_storage(self._path, "r") as f:
+            f.readline()
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def apply(self, farm, registry=None, batch_size=10000):
+        """Применить патч к ферме с тем же ключом; DiffResult.
+
+        Добавления и изменения сливаются с фермой пачками (Farm.merge),
+        удаления - одним проходом в конце. Ключи, которых на ферме нет,
+        считаются в skipped.
+        """
+        key = self.header()["key"]
+        if farm.key_name != key:
+            raise ValueError(f"Патч по ключу {key!r}, а ферма - {farm.key_name!r}")
+        registry = registry if registry is not None else TaxonomyRegistry()
+        result = DiffResult(self)
+        pending = []
+        removed_ids = set()
+
+        def flush():
+            errors = {}
+            farm.merge(registry.records_to_animals(pending, errors))
+            result.skipped += len(errors)
+            pending.clear()
+
+        for op in self:
+            kind = op["op"]
+            if kind == "add":
+                pending.append(op["record"])
+                result.added += 1
+                if len(pending) >= batch_size:
+                    flush()
+                continue
+            animal = farm.get_by_key(_key_from_json(op["key"]))
+            if animal is None:
+                result.skipped += 1
+            elif kind == "remove":
+                removed_ids.add(animal.id)
+                result.removed += 1
+            else:
+                record = animal.to_dict()
+                record.update(op["set"])
+                pending.append(record)
+                result.changed += 1
+                if len(pending) >= batch_size:
+                    flush()
+        if pending:
+            flush()
+        if removed_ids:
+            farm.remove_where(lambda animal: animal.id in removed_ids)
+        return result
+
+
+def _key_from_json(key):
+    """Ключ из JSON: список (кличка, вид) -> кортеж, id - как есть."""
+    return tuple(key) if isinstance(key, list) else key
+
+
+def apply_patch(farm, patch_path, registry=None):
+    """Применить патч из файла к ферме; DiffResult."""
+    return FarmPatch(patch_path).apply(farm, registry)
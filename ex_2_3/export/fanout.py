@@ -0,0 +1,71 @@
+"""
+Экспорт одного набора животных сразу в несколько форматов
+
+Животные превращаются в словари (Animal.to_dict) один раз, после чего
+один и тот же список записей раздаётся всем форматам моста, которые
+пишут свои файлы параллельно в пуле потоков. Источник - обычно снимок
+фермы (Farm.snapshot()), так что экспорт можно запускать в фоне.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .parallel import FORMATS_BY_EXTENSION
+
+
+# Сколько животных сериализуется между сообщениями о прогрессе
+PROGRESS_STEP = 5000
+
+
+def default_formats():
+    """По одному экземпляру каждого известного формата."""
+    return [fmt_class() for fmt_class in FORMATS_BY_EXTENSION.values()]
+
+
+class FanOutExporter:
+    """Сериализация один раз - запись во все форматы разом."""
+
+    def __init__(self, formats=None, workers=None):
+        self._formats = list(formats) if formats is not None else default_formats()
+        self._workers = workers or len(self._formats) or 1
+
+    @property
+    def formats(self):
+        return list(self._formats)
+
+    def serialize(self, animals, progress=None, total=None):
+        """Список записей (словарей) - общий для всех форматов."""
+        records = []
+        append = records.append
+        for animal in animals:
+            append(animal.to_dict())
+            if progress is not None and len(records) % PROGRESS_STEP == 0:
+                progress(len(records), total, "Сериализация")
+        return records
+
+    def export(self, animals, base_path, progress=None):
+        """Записать animals в base_path + расширение каждого формата.
+
+        progress(сделано, всего, этап) вызывается из этого потока.
+        Возвращает {имя формата: (путь, успех)}.
+        """
+        total = len(animals) if hasattr(animals, "__len__") else None
+        records = self.serialize(animals, progress, total)
+        if progress is not None:
+            progress(len(records), len(records), "Сериализация")
+
+        results = {}
+        paths = {fmt.get_name(): base_path + fmt.get_extension()
+                 for fmt in self._formats}
+        directory = os.path.dirname(base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            futures = {pool.submit(fmt.export, records, paths[fmt.get_name()]): fmt
+                       for fmt in self._formats}
+            for done, future in enumerate(as_completed(futures), 1):
+                name = futures[future].get_name()
+                results[name] = (paths[name], bool(future.result()))
+                if progress is not None:
+                    progress(done, len(futures), f"Записан {name}")
+        return results
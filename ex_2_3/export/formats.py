@@ -13,19 +13,67 @@ import json
 import csv
 from abc import ABC, abstractmethod
 
+from .compression import DEFAULT_BUFFER_SIZE, open_storage, detect_codec
+from .ranges import split_byte_ranges, iter_lines_in_range
+
 
 # Реализация - интерфейс формата
 class ExportFormat(ABC):
-    """Абстрактный формат экспорта - Implementation в паттерне Мост."""
+    """Абстрактный формат экспорта - Implementation в паттерне Мост.
+
+    Файлы с расширением .gz/.bz2/.xz читаются и пишутся прозрачно
+    (см. export.compression); buffer_size - размер буфера потока.
+
+    Строчные форматы (LineFormat, line_based) умеют делить несжатый файл
+    на байтовые диапазоны и читать их независимо - для параллельного импорта.
+    """
+
+    line_based = False
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, compresslevel=None):
+        self._buffer_size = buffer_size
+        self._compresslevel = compresslevel
+
+    def _open(self, filepath, mode, newline=None):
+        return open_storage(filepath, mode, self._buffer_size,
+                            newline, self._compresslevel)
 
     @abstractmethod
     def export(self, data, filepath):
         pass
 
     @abstractmethod
-    def import_data(self, filepath):
+    def iter_records(self, filepath, errors=None):
+        """Потоковое чтение записей (словарей) из файла.
+
+        errors - список для некорректных строк (см. parse_lines).
+        """
         pass
 
+    def import_data(self, filepath):
+        try:
+            return list(self.iter_records(filepath))
+        except Exception:
+            return []
+
+    def split(self, filepath, parts):
+        """Диапазоны [start, end) для parts обработчиков.
+
+        Если формат не строчный или файл сжат - один диапазон (0, None).
+        """
+        if self.line_based and not detect_codec(filepath):
+            return split_byte_ranges(filepath, parts)
+        return [(0, None)]
+
+    def iter_range(self, filepath, start, end, errors=None):
+        """Записи, строки которых начинаются внутри [start, end).
+
+        Нестрочный формат читается только целиком - диапазон (0, None).
+        """
+        if start != 0 or end is not None:
+            raise ValueError(f"Формат {self.get_name()} не делится на диапазоны")
+        yield from self.iter_records(filepath, errors)
+
     @abstractmethod
     def get_extension(self):
         pass
@@ -35,24 +83,106 @@ class ExportFormat(ABC):
         pass
 
 
+class LineFormat(ExportFormat):
+    """Строчный формат: одна запись на строку (JSONL, CSV, TXT).
+
+    Такой файл можно делить на байтовые диапазоны, дописывать и читать
+    с произвольной строки; наследник разбирает одну строку в _parse_line.
+    """
+
+    line_based = True
+
+    def iter_range(self, filepath, start, end, errors=None):
+        if start == 0 and end is None:
+            yield from self.iter_records(filepath, errors)
+            return
+        lines = (line.decode('utf-8')
+                 for _, line in iter_lines_in_range(filepath, start, end))
+        yield from self.parse_lines(lines, errors=errors)
+
+    @abstractmethod
+    def _parse_line(self, line, header=None):
+        """Строка -> словарь или None, если строка пустая или некорректна.
+
+        header - имена колонок для форматов с заголовком (CSV).
+        """
+        pass
+
+    def parse_lines(self, lines, header=None, errors=None):
+        """Записи из готовых строк (str).
+
+        header нужен форматам с заголовком (CSV) - список имён колонок.
+        errors - список: некорректная строка не прерывает разбор, а её
+        описание добавляется туда. Без списка - исключение ValueError.
+        """
+        for line in lines:
+            try:
+                item = self._parse_line(line, header)
+            except ValueError as e:  # в том числе json.JSONDecodeError
+                if errors is None:
+                    raise
+                errors.append(str(e))
+                continue
+            if item:
+                yield item
+            elif errors is not None and line.strip():
+                errors.append(f"Некорректная строка: {line.strip()[:80]}")
+
+
+def _iter_json_array(f, chunk_size):
+    """Объекты JSON-массива по одному, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+    while True:
+        # Пропуск пробелов и запятых, при нехватке данных - дочитываем
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+        if pos >= len(buf):
+            raise ValueError("Неожиданный конец JSON")
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Ожидался JSON-массив")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+        yield obj
+        pos = end
+
+
 # Конкретные реализации форматов
 class JsonFormat(ExportFormat):
     """JSON - универсальный текстовый формат."""
 
     def export(self, data, filepath):
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
+            with self._open(filepath, 'w') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             return True
         except Exception:
             return False
 
-    def import_data(self, filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return []
+    def iter_records(self, filepath, errors=None):
+        # Испорченный массив дальше не разобрать - тут errors не помогает
+        with self._open(filepath, 'r') as f:
+            yield from _iter_json_array(f, self._buffer_size)
 
     def get_extension(self):
         return ".json"
@@ -61,14 +191,62 @@ class JsonFormat(ExportFormat):
         return "JSON"
 
 
-class CsvFormat(ExportFormat):
-    """CSV - табличный формат, совместим с Excel."""
+class JsonlFormat(LineFormat):
+    """JSON Lines - одна компактная запись на строку.
+
+    В отличие от JSON-массива файл можно дописывать, читать построчно
+    и делить на байтовые диапазоны для параллельного разбора.
+    """
+
+    def export(self, data, filepath):
+        return self._write(data, filepath, 'w')
+
+    def append(self, data, filepath):
+        """Дописать записи в конец файла (файл создаётся при отсутствии)."""
+        return self._write(data, filepath, 'a')
+
+    def _write(self, data, filepath, mode):
+        try:
+            dumps = json.JSONEncoder(ensure_ascii=False,
+                                     separators=(',', ':')).encode
+            with self._open(filepath, mode) as f:
+                for item in data:
+                    f.write(dumps(item) + "\n")
+            return True
+        except Exception:
+            return False
+
+    def iter_records(self, filepath, errors=None):
+        with self._open(filepath, 'r') as f:
+            yield from self.parse_lines(f, errors=errors)
+
+    def _parse_line(self, line, header=None):
+        if not line.strip():
+            return None
+        item = json.loads(line)
+        if not isinstance(item, dict):
+            raise ValueError(f"Ожидался объект JSON: {line.strip()[:80]}")
+        return item
+
+    def get_extension(self):
+        return ".jsonl"
+
+    def get_name(self):
+        return "JSONL"
+
+
+class CsvFormat(LineFormat):
+    """CSV - табличный формат, совместим с Excel.
+
+    Диапазоны разбираются построчно, поэтому поля с переводом строки
+    внутри кавычек при параллельном чтении не поддерживаются.
+    """
 
     def export(self, data, filepath):
         try:
             if not data:
                 return False
-            with open(filepath, 'w', encoding='utf-8', newline='') as f:
+            with self._open(filepath, 'w', newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=data[0].keys())
                 writer.writeheader()
                 writer.writerows(data)
@@ -76,42 +254,105 @@ class CsvFormat(ExportFormat):
         except Exception:
             return False
 
-    def import_data(self, filepath):
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                result = []
-                for row in reader:
-                    # Стандартизация ключей: название полей может быть разным
-                    normalized = {}
-                    for key, value in row.items():
-                        key_lower = key.strip().lower()
-                        if key_lower in ('name', 'имя'):
-                            normalized['name'] = value
-                        elif key_lower in ('species', 'вид'):
-                            normalized['species'] = value
-                        elif key_lower in ('genus', 'род'):
-                            normalized['genus'] = value
-                        elif key_lower in ('family', 'семейство'):
-                            normalized['family'] = value
-                        elif key_lower in ('order', 'отряд'):
-                            normalized['order'] = value
-                        elif key_lower in ('class', 'класс'):
-                            normalized['class'] = value
-                        elif key_lower in ('phylum', 'тип'):
-                            normalized['phylum'] = value
-                        elif key_lower in ('age', 'возраст'):
-                            normalized['age'] = int(value) if value else 0
-                        elif key_lower in ('weight', 'вес'):
-                            normalized['weight'] = float(
-                                value) if value else 0.0
-                        elif key_lower in ('description', 'описание'):
-                            normalized['description'] = value
-                    if normalized.get('name') and normalized.get('species'):
-                        result.append(normalized)
-                return result
-        except Exception:
-            return []
+    def iter_records(self, filepath, errors=None):
+        with self._open(filepath, 'r', newline='') as f:
+            yield from self._parse_rows(csv.DictReader(f), errors)
+
+    def iter_range(self, filepath, start, end, errors=None):
+        if start == 0 and end is None:
+            yield from self.iter_records(filepath, errors)
+            return
+        with self._open(filepath, 'r', newline='') as f:
+            header = next(csv.reader(f), None)
+        if not header:
+            return
+        lines = (line.decode('utf-8')
+                 for pos, line in iter_lines_in_range(filepath, start, end)
+                 if pos > 0)  # строка заголовка - только в начале файла
+        yield from self.parse_lines(lines, header, errors)
+
+    def parse_header(self, line):
+        """Строка заголовка -> список имён колонок."""
+        return next(csv.reader([line]), [])
+
+    def _parse_line(self, line, header=None):
+        if not header:
+            raise ValueError("Строку CSV не разобрать без заголовка")
+        fields = next(csv.reader([line]), None)
+        if not fields:
+            return None
+        row = self._normalize_row(dict(zip(header, fields)))
+        return row if row.get('name') and row.get('species') else None
+
+    def parse_lines(self, lines, header=None, errors=None):
+        # Свой разбор: csv.reader потоком склеивает поля с переводом строки
+        if not header:
+            return
+        rows = (dict(zip(header, row))
+                for row in self._read_rows(lines, errors) if row)
+        yield from self._parse_rows(rows, errors)
+
+    @staticmethod
+    def _read_rows(lines, errors):
+        """csv.reader, который при errors пропускает неразборчивые строки
+        (например, поле длиннее csv.field_size_limit())."""
+        reader = csv.reader(lines)
+        while True:
+            try:
+                yield next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                if errors is None:
+                    raise
+                errors.append(str(e))
+
+    def _parse_rows(self, rows, errors):
+        """Словари строк -> записи; errors - как в parse_lines."""
+        for row in rows:
+            try:
+                normalized = self._normalize_row(row)
+            except ValueError as e:
+                if errors is None:
+                    raise
+                errors.append(str(e))
+                continue
+            if normalized.get('name') and normalized.get('species'):
+                yield normalized
+            elif errors is not None:
+                errors.append("Нет клички или вида")
+
+    def _normalize_row(self, row):
+        """Стандартизация ключей: название полей может быть разным."""
+        normalized = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            key_lower = key.strip().lower()
+            if key_lower in ('name', 'имя'):
+                normalized['name'] = value
+            elif key_lower in ('species', 'вид'):
+                normalized['species'] = value
+            elif key_lower in ('genus', 'род'):
+                normalized['genus'] = value
+            elif key_lower in ('family', 'семейство'):
+                normalized['family'] = value
+            elif key_lower in ('order', 'отряд'):
+                normalized['order'] = value
+            elif key_lower in ('class', 'класс'):
+                normalized['class'] = value
+            elif key_lower in ('phylum', 'тип'):
+                normalized['phylum'] = value
+            elif key_lower in ('age', 'возраст'):
+                normalized['age'] = int(value) if value else 0
+            elif key_lower in ('weight', 'вес'):
+                normalized['weight'] = float(value) if value else 0.0
+            elif key_lower in ('description', 'описание'):
+                normalized['description'] = value
+            elif key_lower == 'id':
+                if value:
+                    normalized['id'] = int(value)
+        return normalized
 
     def get_extension(self):
         return ".csv"
@@ -120,12 +361,12 @@ class CsvFormat(ExportFormat):
         return "CSV"
 
 
-class TxtFormat(ExportFormat):
+class TxtFormat(LineFormat):
     """TXT - простой текстовый формат."""
 
     def export(self, data, filepath):
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
+            with self._open(filepath, 'w') as f:
                 for item in data:
                     line = ";".join(str(v) for v in item.values())
                     f.write(line + "\n")
@@ -133,38 +374,39 @@ class TxtFormat(ExportFormat):
         except Exception:
             return False
 
-    def import_data(self, filepath):
+    def iter_records(self, filepath, errors=None):
+        with self._open(filepath, 'r') as f:
+            yield from self.parse_lines(f, errors=errors)
+
+    def _parse_line(self, line, header=None):
+        line = line.strip()
+        if not line:
+            return None
+
+        # Обработка формата: name;species;genus;family;order;class;phylum;age;weight;description;id
+        parts = line.split(';')
+        if len(parts) < 7:
+            return None
         try:
-            result = []
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    # Обработка формата: name;species;genus;family;order;class;phylum;age;weight
-                    parts = line.split(';')
-                    if len(parts) >= 7:
-                        try:
-                            item = {
-                                'name': parts[0].strip(),
-                                'species': parts[1].strip(),
-                                'genus': parts[2].strip(),
-                                'family': parts[3].strip(),
-                                'order': parts[4].strip(),
-                                'class': parts[5].strip(),
-                                'phylum': parts[6].strip(),
-                                'age': int(parts[7]) if len(parts) > 7 and parts[7].strip() else 0,
-                                'weight': float(parts[8]) if len(parts) > 8 and parts[8].strip() else 0.0,
-                                'description': parts[9].strip() if len(parts) > 9 else ''
-                            }
-                            if item['name'] and item['species']:
-                                result.append(item)
-                        except (ValueError, IndexError):
-                            continue
-            return result
-        except Exception:
-            return []
+            item = {
+                'name': parts[0].strip(),
+                'species': parts[1].strip(),
+                'genus': parts[2].strip(),
+                'family': parts[3].strip(),
+                'order': parts[4].strip(),
+                'class': parts[5].strip(),
+                'phylum': parts[6].strip(),
+                'age': int(parts[7]) if len(parts) > 7 and parts[7].strip() else 0,
+                'weight': float(parts[8]) if len(parts) > 8 and parts[8].strip() else 0.0,
+                'description': parts[9].strip() if len(parts) > 9 else ''
+            }
+            if len(parts) > 10 and parts[10].strip():
+                item['id'] = int(parts[10])
+        except (ValueError, IndexError):
+            return None
+        if item['name'] and item['species']:
+            return item
+        return None
 
     def get_extension(self):
         return ".txt"
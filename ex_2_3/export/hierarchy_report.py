@@ -0,0 +1,254 @@
+"""
+Отчёт "иерархия каждого животного" для всей фермы
+
+То, что окно рисует для одного животного (Тип → ... → Вид → животное),
+здесь строится для всех сразу. Животные группируются по общей линии
+через TaxonomyTree, поэтому заголовок каждого таксона формируется один
+раз, а не на каждое животное. Отчёт отдаётся кусками (генератор),
+файл пишется потоком; животные большого вида тоже идут кусками по
+ANIMALS_PER_PIECE. Куски с животными можно собирать в пуле потоков -
+порядок вывода сохраняется.
+
+Форматы - тот же приём, что и в паттерне Мост: ReportFormat
+с реализациями для текста, JSON и HTML.
+"""
+
+import html
+import json
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from json.encoder import encode_basestring
+
+from data.taxonomy_tree import TaxonomyTree
+from .compression import open_storage
+
+
+RANK_ICONS = ("🔬", "🦴", "📂", "👪", "🧬", "🐾")
+
+# Животных в одном куске отчёта
+ANIMALS_PER_PIECE = 1024
+# Сколько кусков может ждать своей очереди при работе в пуле
+_WINDOW_PER_WORKER = 8
+
+
+class ReportFormat(ABC):
+    """Оформление отчёта: заголовки таксонов и блоки животных."""
+
+    @abstractmethod
+    def begin(self, title):
+        pass
+
+    @abstractmethod
+    def open_node(self, node, depth, first):
+        """Начало таксона; first - первый среди показанных соседей."""
+        pass
+
+    @abstractmethod
+    def animals(self, animals, depth, icon, first=True):
+        """Кусок животных одного вида (строка); first - первый кусок вида."""
+        pass
+
+    @abstractmethod
+    def close_node(self, node, depth):
+        pass
+
+    @abstractmethod
+    def end(self):
+        pass
+
+    @abstractmethod
+    def get_extension(self):
+        pass
+
+
+class TextReport(ReportFormat):
+    """Дерево с отступами, как в окне программы."""
+
+    def begin(self, title):
+        return f"Ферма «{title}»\n" if title else ""
+
+    def open_node(self, node, depth, first):
+        indent = "  " * depth
+        return (f"{indent}{RANK_ICONS[node.rank]} {node.rank_name}: {node.name}"
+                f" ({node.count})\n")
+
+    def animals(self, animals, depth, icon, first=True):
+        indent = "  " * depth
+        return "".join(
+            f"{indent}{icon} {animal.name} — {animal.age} лет, {animal.weight} кг\n"
+            for animal in animals)
+
+    def close_node(self, node, depth):
+        return ""
+
+    def end(self):
+        return ""
+
+    def get_extension(self):
+        return ".txt"
+
+
+class JsonReport(ReportFormat):
+    """Вложенный JSON: таксоны с children, у видов - animals.
+
+    Бесконечный вес и NaN в JSON не записать - это ValueError.
+    """
+
+    def begin(self, title):
+        return '{"farm":' + json.dumps(title, ensure_ascii=False) + ',"taxa":['
+
+    def open_node(self, node, depth, first):
+        head = json.dumps({"rank": node.rank_name, "name": node.name,
+                           "count": node.count,
+                           "total_weight": node.total_weight},
+                          ensure_ascii=False, allow_nan=False)
+        key = "animals" if node.is_species else "children"
+        return ("" if first else ",") + head[:-1] + f',"{key}":['
+
+    def animals(self, animals, depth, icon, first=True):
+        # Строки через кодировщик json, числа как есть - без dumps на каждый dict
+        quote = encode_basestring
+        rows = ",".join(
+            f'{{"id":{animal.id},"name":{quote(animal.name)},"age":{animal.age},'
+            f'"weight":{_json_weight(animal)},'
+            f'"description":{quote(animal.description)}}}'
+            for animal in animals)
+        return rows if first else "," + rows
+
+    def close_node(self, node, depth):
+        return "]}"
+
+    def end(self):
+        return "]}\n"
+
+    def get_extension(self):
+        return ".json"
+
+
+class HtmlReport(ReportFormat):
+    """Раскрывающиеся блоки <details> для каждого таксона."""
+
+    def begin(self, title):
+        title = html.escape(title or "")
+        return ("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+                f"<title>{title}</title></head><body>\n<h1>Ферма «{title}»</h1>\n")
+
+    def open_node(self, node, depth, first):
+        return (f"<details{' open' if depth < 2 else ''}><summary>"
+                f"{RANK_ICONS[node.rank]} {node.rank_name}: {html.escape(node.name)}"
+                f" ({node.count})</summary>\n"
+                + ("<ul>\n" if node.is_species else ""))
+
+    def animals(self, animals, depth, icon, first=True):
+        escape = html.escape
+        return "".join(
+            f"<li>{icon} {escape(animal.name)} — {animal.age} лет, "
+            f"{animal.weight} кг</li>\n" for animal in animals)
+
+    def close_node(self, node, depth):
+        return ("</ul>\n" if node.is_species else "") + "</details>\n"
+
+    def end(self):
+        return "</body></html>\n"
+
+    def get_extension(self):
+        return ".html"
+
+
+REPORT_FORMATS = {"text": TextReport, "json": JsonReport, "html": HtmlReport}
+
+
+class HierarchyReport:
+    """Отчёт по ферме, снимку или любому набору животных.
+
+    У Farm берётся её готовое дерево таксонов, для остальных источников
+    дерево строится один раз (add_many проходит линию раз на вид).
+    icon_func(species) -> иконка животных вида, вызывается раз на вид.
+    workers > 1 - блоки животных собираются в пуле потоков.
+    """
+
+    def __init__(self, source, fmt="text", icon_func=None, workers=None):
+        self._fmt = REPORT_FORMATS[fmt]() if isinstance(fmt, str) else fmt
+        self._title = getattr(source, "name", "")
+        tree = getattr(source, "taxonomy", None)
+        if not isinstance(tree, TaxonomyTree):
+            tree = TaxonomyTree()
+            tree.add_many(source)
+        self._root = tree.root
+        self._icon_func = icon_func
+        self._workers = workers
+
+    @property
+    def format(self):
+        return self._fmt
+
+    def _pieces(self, node, depth, first):
+        """Куски отчёта по порядку: строки или функции, их строящие."""
+        fmt = self._fmt
+        yield fmt.open_node(node, depth, first)
+        if node.is_species:
+            animals = node.animals
+            if animals:
+                icon = self._icon_func(animals[0].species) if self._icon_func else "🐾"
+                for start in range(0, len(animals), ANIMALS_PER_PIECE):
+                    part = animals[start:start + ANIMALS_PER_PIECE]
+                    yield (lambda part=part, first=start == 0:
+                           fmt.animals(part, depth + 1, icon, first))
+        else:
+            shown = 0
+            for child in node.child_nodes:
+                if child.count:
+                    yield from self._pieces(child, depth + 1, shown == 0)
+                    shown += 1
+        yield fmt.close_node(node, depth)
+
+    def _top_pieces(self):
+        shown = 0
+        for child in self._root.child_nodes:
+            if child.count:
+                yield from self._pieces(child, 0, shown == 0)
+                shown += 1
+
+    def __iter__(self):
+        """Отчёт кусками строк."""
+        fmt = self._fmt
+        yield fmt.begin(self._title)
+        if not self._workers or self._workers < 2:
+            for piece in self._top_pieces():
+                yield piece() if callable(piece) else piece
+        else:
+            window = self._workers * _WINDOW_PER_WORKER
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=self._workers) as pool:
+                for piece in self._top_pieces():
+                    pending.append(pool.submit(piece) if callable(piece) else piece)
+                    while len(pending) > window:
+                        yield _result(pending.popleft())
+                while pending:
+                    yield _result(pending.popleft())
+        yield fmt.end()
+
+    def write(self, filepath):
+        """Записать отчёт в файл потоком (.gz/.bz2/.xz - со сжатием)."""
+        with open_storage(filepath, "w") as f:
+            for piece in self:
+                f.write(piece)
+        return filepath
+
+    def render(self):
+        """Отчёт одной строкой (для небольших ферм)."""
+        return "".join(self)
+
+
+def _result(piece):
+    return piece if isinstance(piece, str) else piece.result()
+
+
+def _json_weight(animal):
+    """Вес числом JSON; inf и nan в JSON не бывает."""
+    weight = float(animal.weight)
+    if not math.isfinite(weight):
+        raise ValueError(f"Вес животного {animal.id} ({weight}) нельзя записать в JSON")
+    return repr(weight)
@@ -0,0 +1,217 @@
+"""
+Журнал изменений фермы (append-only) + периодическое уплотнение
+
+Вместо повторного экспорта всей фермы каждое изменение дописывается
+одной строкой JSON в файл журнала - сохранение стоит O(изменения).
+Состояние восстанавливается как "последний снимок + журнал".
+Уплотнение в фоне сворачивает журнал в новый снимок.
+
+Файлы (base - путь без расширения):
+    base.snapshot.jsonl - первая строка метаданные, далее записи животных
+    base.log.jsonl      - первая строка {"generation": N}, далее операции
+
+Метаданные снимка хранят поколение и смещение журнала, до которого он
+уже учтён, поэтому сбой между заменой снимка и журнала не приводит
+к повторному применению операций.
+"""
+
+import json
+import os
+import threading
+
+from data.events import Inserted, Removed, Updated, Cleared
+
+
+class FarmJournal:
+    """Журнал операций фермы: add, update, remove, clear."""
+
+    def __init__(self, base_path, compact_after=10000):
+        self._snapshot_path = base_path + ".snapshot.jsonl"
+        self._log_path = base_path + ".log.jsonl"
+        self._compact_after = compact_after
+        self._lock = threading.Lock()
+        self._log = None
+        self._generation = 0
+        self._ops = 0  # операций в журнале с последнего уплотнения
+        self._compacting = None  # фоновый поток уплотнения
+        self._dumps = json.JSONEncoder(ensure_ascii=False,
+                                       separators=(',', ':')).encode
+
+    # --- открытие и восстановление ---
+
+    def open(self, farm, registry):
+        """Восстановить ферму из снимка и журнала и начать запись изменений."""
+        records, end, self._generation = self._read_state()
+        animals = registry.records_to_animals(records, errors={})
+        farm.attach_journal(None)
+        farm.clear()
+        farm.add_animals(animals)
+        self._truncate_log(end)
+        self._open_log()
+        farm.attach_journal(self)
+        return len(animals)
+
+    def _truncate_log(self, end):
+        """Отрезать недописанную после сбоя строку, иначе новые операции
+        допишутся за ней и журнал больше не прочитается."""
+        if end and os.path.exists(self._log_path) \
+                and os.path.getsize(self._log_path) > end:
+            with open(self._log_path, 'r+b') as f:
+                f.truncate(end)
+
+    def _open_log(self):
+        if not os.path.exists(self._log_path):
+            with open(self._log_path, 'w', encoding='utf-8') as f:
+                f.write(self._dumps({"generation": self._generation}) + "\n")
+        self._log = open(self._log_path, 'a', encoding='utf-8')
+        self._ops = 0
+
+    def _read_meta(self):
+        """Метаданные снимка (или пустые, если снимка ещё нет)."""
+        if not os.path.exists(self._snapshot_path):
+            return {"generation": 0, "base_generation": None, "base_offset": 0}
+        with open(self._snapshot_path, 'r', encoding='utf-8') as f:
+            return json.loads(f.readline())
+
+    def _read_state(self, log_limit=None):
+        """Записи фермы = снимок + операции журнала (до log_limit байт).
+
+        Возвращает (записи, конец прочитанного журнала, поколение журнала).
+        Записи собираются в словарь по id (порядок добавления сохраняется),
+        так что каждая операция стоит O(1).
+        """
+        meta = self._read_meta()
+        state = {}
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, 'r', encoding='utf-8') as f:
+                f.readline()
+                for line in f:
+                    if line.strip():
+                        self._apply(state, {"op": "add", "animal": json.loads(line)})
+        generation = meta["generation"]
+
+        if not os.path.exists(self._log_path):
+            return list(state.values()), 0, generation
+        with open(self._log_path, 'rb') as f:
+            header = json.loads(f.readline())
+            if header["generation"] == meta["base_generation"]:
+                # Снимок заменён, а журнал ещё старый - часть уже учтена
+                f.seek(max(f.tell(), meta["base_offset"]))
+                generation = header["generation"]
+            elif header["generation"] != meta["generation"]:
+                raise ValueError("Журнал не соответствует снимку")
+            end = f.tell()
+            while log_limit is None or end < log_limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # недописанная строка после сбоя
+                self._apply(state, json.loads(line))
+                end = f.tell()
+            return list(state.values()), end, generation
+
+    @staticmethod
+    def _apply(state, op):
+        """Применить операцию журнала к записям {id: запись}."""
+        kind = op["op"]
+        if kind == "add":
+            record = op["animal"]
+            key = record.get("id")
+            if key is None:
+                key = ("без id", len(state))  # такую запись не удалить по id
+                while key in state:
+                    key = ("без id", key[1] + 1)
+            state[key] = record
+        elif kind == "clear":
+            state.clear()
+        elif kind == "remove":
+            for record_id in op["ids"]:
+                state.pop(record_id, None)
+        elif kind == "update":
+            record = state.get(op["animal"].get("id"))
+            if record is not None:
+                record.update(op["animal"])
+
+    # --- запись изменений (подписчик событий Farm) ---
+
+    def on_event(self, event):
+        """Перевести событие фермы в операции журнала."""
+        if isinstance(event, Inserted):
+            self._write([{"op": "add", "animal": animal.to_dict()}
+                         for animal in event.items])
+        elif isinstance(event, Updated):
+            self._write([{"op": "update", "animal": animal.to_dict()}
+                         for animal in event.items])
+        elif isinstance(event, Removed):
+            self._write([{"op": "remove", "ids": list(event.ids)}])
+        elif isinstance(event, Cleared):
+            self._write([{"op": "clear"}])
+
+    def _write(self, ops):
+        dumps = self._dumps
+        with self._lock:
+            if self._log is None:
+                return
+            self._log.write("".join(dumps(op) + "\n" for op in ops))
+            self._log.flush()
+            self._ops += len(ops)
+            need_compact = self._ops >= self._compact_after
+        if need_compact:
+            self.compact_async()
+
+    # --- уплотнение ---
+
+    def compact(self):
+        """Свернуть журнал в новый снимок (ферма не блокируется)."""
+        with self._lock:
+            if self._log is None:
+                return
+            self._log.flush()
+            offset = os.path.getsize(self._log_path)
+            base_generation = self._generation
+            self._ops = 0
+
+        # Тяжёлая часть - только чтение файлов, без обращения к ферме
+        records, _, _ = self._read_state(log_limit=offset)
+        meta = {"generation": base_generation + 1,
+                "base_generation": base_generation,
+                "base_offset": offset}
+        tmp_snapshot = self._snapshot_path + ".tmp"
+        with open(tmp_snapshot, 'w', encoding='utf-8') as f:
+            f.write(self._dumps(meta) + "\n")
+            for record in records:
+                f.write(self._dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock:
+            self._log.flush()
+            tmp_log = self._log_path + ".tmp"
+            with open(self._log_path, 'rb') as old, open(tmp_log, 'wb') as new:
+                new.write((self._dumps({"generation": base_generation + 1})
+                           + "\n").encode('utf-8'))
+                old.seek(offset)
+                new.write(old.read())  # хвост, дописанный во время уплотнения
+            os.replace(tmp_snapshot, self._snapshot_path)
+            os.replace(tmp_log, self._log_path)
+            self._log.close()
+            self._log = open(self._log_path, 'a', encoding='utf-8')
+            self._generation = base_generation + 1
+
+    def compact_async(self):
+        """Запустить уплотнение в фоновом потоке (если ещё не идёт)."""
+        with self._lock:
+            if self._compacting is not None and self._compacting.is_alive():
+                return self._compacting
+            self._compacting = threading.Thread(target=self.compact, daemon=True)
+            self._compacting.start()
+            return self._compacting
+
+    def close(self):
+        """Дождаться уплотнения и закрыть журнал."""
+        thread = self._compacting
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
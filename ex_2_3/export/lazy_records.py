@@ -0,0 +1,239 @@
+"""
+Ленивые записи животных поверх буфера строк (Приспособленец)
+
+Для ферм "только для чтения" не нужно держать объект Animal на каждую
+строку. LazyAnimalStore хранит сырой буфер (bytes или mmap файла)
+и массив смещений строк - 8 байт на животное. LazyAnimal - лёгкая
+ссылка (хранилище + номер строки), которая разбирает поля только при
+обращении. Полноценные Animal собираются по требованию и держатся
+в небольшом LRU-кэше.
+"""
+
+import csv
+import mmap
+from array import array
+from collections import OrderedDict
+
+from data import Animal, TaxonomicRank, TaxonomyRegistry
+from data.taxonomy_registry import records_to_columns
+from .formats import CsvFormat, TxtFormat
+
+
+class LazyAnimal:
+    """Животное, поля которого читаются из буфера при обращении."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def name(self):
+        return self._store._name(self._row)
+
+    @property
+    def id(self):
+        return self._store._record(self._row)["id"]
+
+    @property
+    def age(self):
+        return self._store._record(self._row).get("age", 0)
+
+    @property
+    def weight(self):
+        return self._store._record(self._row).get("weight", 0.0)
+
+    @property
+    def description(self):
+        return self._store._record(self._row).get("description", "")
+
+    @property
+    def species(self):
+        return self.materialize().species
+
+    def materialize(self):
+        """Полноценный Animal (из LRU-кэша хранилища)."""
+        return self._store._materialize(self._row)
+
+    def get_parent(self):
+        return self.species
+
+    def get_rank_name(self):
+        return "Животное"
+
+    def get_full_hierarchy(self):
+        return self.materialize().get_full_hierarchy()
+
+    def to_dict(self):
+        """Словарь как у Animal.to_dict, без сборки объектов."""
+        record = self._store._record(self._row)
+        return {
+            "name": record.get("name", ""),
+            "species": record.get("species", ""),
+            "genus": record.get("genus", ""),
+            "family": record.get("family", ""),
+            "order": record.get("order", ""),
+            "class": record.get("class", ""),
+            "phylum": record.get("phylum", ""),
+            "age": record.get("age", 0),
+            "weight": record.get("weight", 0.0),
+            "description": record.get("description", ""),
+            "id": record["id"],
+        }
+
+    def __eq__(self, other):
+        return (isinstance(other, LazyAnimal) and self._store is other._store
+                and self._row == other._row)
+
+    def __hash__(self):
+        return hash((id(self._store), self._row))
+
+    def __str__(self):
+        return str(self.materialize())
+
+    def __repr__(self):
+        return f"LazyAnimal('{self.name}')"
+
+
+class LazyAnimalStore:
+    """Последовательность LazyAnimal над буфером строк TXT/CSV/JSONL.
+
+    Память: сам буфер + 8 байт смещения на строку + cache_size Animal.
+    Строкам без поля id выдаются номера из заранее зарезервированного
+    блока, так что id стабилен, пока открыто хранилище.
+    """
+
+    def __init__(self, buffer, fmt, registry=None, cache_size=1024):
+        if not fmt.line_based:
+            raise ValueError(f"Формат {fmt.get_name()} не строчный")
+        self._buffer = buffer
+        self._fmt = fmt
+        self._registry = registry if registry is not None else TaxonomyRegistry()
+        self._cache_size = cache_size
+        self._cache = OrderedDict()  # номер строки -> Animal
+        self._file = None
+        self._header = None
+
+        self._starts = array("Q")
+        self._build_offsets()
+        self._base_id, _ = TaxonomicRank.id_allocator().reserve(len(self._starts))
+
+    @classmethod
+    def open(cls, filepath, fmt, registry=None, cache_size=1024):
+        """Хранилище поверх файла, отображённого в память (mmap)."""
+        f = open(filepath, "rb")
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл нельзя отобразить
+            buffer = b""
+        store = cls(buffer, fmt, registry, cache_size)
+        store._file = f
+        return store
+
+    def _build_offsets(self):
+        buffer = self._buffer
+        starts = self._starts
+        find = buffer.find
+        pos = 0
+        size = len(buffer)
+        if isinstance(self._fmt, CsvFormat) and size:
+            end = find(b"\n")
+            end = size if end < 0 else end + 1
+            self._header = next(csv.reader([buffer[:end].decode("utf-8")]), [])
+            pos = end
+        while pos < size:
+            end = find(b"\n", pos)
+            end = size if end < 0 else end + 1
+            if buffer[pos:end].strip():
+                starts.append(pos)
+            pos = end
+
+    # --- доступ к строкам ---
+
+    def _line(self, row):
+        start = self._starts[row]
+        end = self._buffer.find(b"\n", start)
+        return self._buffer[start:end if end >= 0 else len(self._buffer)]
+
+    def _record(self, row):
+        """Разобранная строка (словарь) с гарантированным полем id."""
+        record = self._parse_row(row)
+        if record.get("id") is None:
+            record["id"] = self._base_id + row
+        return record
+
+    def _parse_row(self, row):
+        text = self._line(row).decode("utf-8")
+        if self._header is not None:
+            fields = next(csv.reader([text]), [])
+            record = self._fmt._normalize_row(dict(zip(self._header, fields)))
+        else:
+            record = self._fmt._parse_line(text) or {}
+        return record
+
+    def _name(self, row):
+        if isinstance(self._fmt, TxtFormat):
+            # Кличка - первое поле, остальную строку не разбираем
+            line = self._line(row)
+            cut = line.find(b";")
+            return line[:cut if cut >= 0 else len(line)].decode("utf-8").strip()
+        return self._record(row).get("name", "")
+
+    def _materialize(self, row):
+        animal = self._cache.get(row)
+        if animal is not None:
+            self._cache.move_to_end(row)
+            return animal
+        record = self._parse_row(row)
+        own_id = record.get("id") is None
+        if own_id:
+            record["id"] = self._base_id + row
+        columns = records_to_columns([record])
+        columns["species"] = [self._registry.get_species(columns["lineages"][0])]
+        # id из собственного блока генератор уже учёл
+        animal = Animal.bulk_create(columns, observe_ids=not own_id)[0]
+        self._cache[row] = animal
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return animal
+
+    # --- интерфейс как у Farm ---
+
+    def __len__(self):
+        return len(self._starts)
+
+    def count(self):
+        return len(self._starts)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self._starts)
+        if not 0 <= row < len(self._starts):
+            raise IndexError("Номер строки вне диапазона")
+        return LazyAnimal(self, row)
+
+    def __iter__(self):
+        for row in range(len(self._starts)):
+            yield LazyAnimal(self, row)
+
+    def get_by_name(self, name):
+        """Найти по кличке (линейный просмотр, без сборки объектов)."""
+        for row in range(len(self._starts)):
+            if self._name(row) == name:
+                return LazyAnimal(self, row)
+        return None
+
+    def close(self):
+        self._cache.clear()
+        if self._file is not None:
+            if isinstance(self._buffer, mmap.mmap):
+                self._buffer.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
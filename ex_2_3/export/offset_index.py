@@ -0,0 +1,196 @@
+"""
+Индекс смещений для точечного поиска в больших текстовых файлах
+
+Рядом с файлом данных (TXT, CSV, JSONL) хранится файл .idx:
+отсортированные 64-битные хэши кличек и байтовые смещения строк.
+Индекс строится за один потоковый проход, читается через mmap,
+а поиск - бинарный по хэшам плюс разбор одной строки данных.
+При изменении размера или времени изменения файла данных индекс
+считается устаревшим и перестраивается.
+"""
+
+import csv
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from .compression import detect_codec
+from .formats import CsvFormat
+from .ranges import iter_lines_in_range
+
+
+MAGIC = b"FARMIDX1"
+
+# MAGIC, размер файла данных, mtime_ns, число записей
+_HEADER = struct.Struct("<8sQQQ")
+
+
+def name_hash(name):
+    """Стабильный 64-битный хэш клички (hash() зависит от запуска)."""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class OffsetIndex:
+    """Индекс "кличка -> смещение строки" для строчного формата."""
+
+    def __init__(self, data_path, fmt, index_path=None):
+        if not fmt.line_based:
+            raise ValueError(f"Формат {fmt.get_name()} не строчный")
+        if detect_codec(data_path):
+            raise ValueError("Индекс для сжатых файлов не поддерживается")
+        self._data_path = data_path
+        self._fmt = fmt
+        self._index_path = index_path or data_path + ".idx"
+        self._mmap = None
+        self._hashes = None
+        self._offsets = None
+        self._header = None  # заголовок CSV
+
+    # --- построение ---
+
+    def _data_stamp(self):
+        stat = os.stat(self._data_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def build(self):
+        """Один проход по файлу данных и запись .idx."""
+        self.close()
+        size, mtime = self._data_stamp()
+        hashes = array("Q")
+        offsets = array("Q")
+        for offset, name in self._iter_names(size):
+            hashes.append(name_hash(name))
+            offsets.append(offset)
+
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        sorted_hashes = array("Q", (hashes[i] for i in order))
+        sorted_offsets = array("Q", (offsets[i] for i in order))
+
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, size, mtime, len(order)))
+            f.write(sorted_hashes.tobytes())
+            f.write(sorted_offsets.tobytes())
+        os.replace(tmp_path, self._index_path)
+
+    def _iter_names(self, size):
+        """(смещение, кличка) для каждой строки с записью."""
+        if isinstance(self._fmt, CsvFormat):
+            yield from self._iter_csv_names(size)
+            return
+        for offset, line in iter_lines_in_range(self._data_path, 0, size):
+            record = self._parse(offset, line)
+            if record:
+                yield offset, record["name"]
+
+    def _iter_csv_names(self, size):
+        """Один csv.reader на весь файл; смещение - у первой строки записи."""
+        consumed = []
+        lines = (consumed.append(offset) or line.decode("utf-8")
+                 for offset, line in iter_lines_in_range(self._data_path, 0, size))
+        reader = csv.reader(lines)
+        self._header = next(reader, None)
+        if not self._header:
+            return
+        keys = [self._fmt._normalize_row({key: ""}) for key in self._header]
+        name_column = next((i for i, key in enumerate(keys) if "name" in key), None)
+        if name_column is None:
+            return
+        while True:
+            consumed.clear()
+            row = next(reader, None)
+            if row is None:
+                return
+            if len(row) > name_column and row[name_column]:
+                yield consumed[0], row[name_column]
+
+    def _parse(self, offset, line):
+        """Разбор одной строки файла данных в запись."""
+        text = line.decode("utf-8")
+        if not isinstance(self._fmt, CsvFormat):
+            return self._fmt._parse_line(text)
+        if offset == 0:
+            self._header = next(csv.reader([text]))
+            return None
+        if self._header is None:
+            with open(self._data_path, "r", encoding="utf-8", newline="") as f:
+                self._header = next(csv.reader(f))
+        row = next(csv.reader([text]), None)
+        if not row:
+            return None
+        record = self._fmt._normalize_row(dict(zip(self._header, row)))
+        return record if record.get("name") else None
+
+    # --- чтение ---
+
+    def is_stale(self):
+        """Индекс отсутствует или не соответствует файлу данных."""
+        try:
+            with open(self._index_path, "rb") as f:
+                header = f.read(_HEADER.size)
+        except OSError:
+            return True
+        if len(header) != _HEADER.size:
+            return True
+        magic, size, mtime, _ = _HEADER.unpack(header)
+        return magic != MAGIC or (size, mtime) != self._data_stamp()
+
+    def open(self):
+        """Подключить индекс через mmap, перестроив при необходимости."""
+        if self.is_stale():
+            self.build()
+        self.close()
+        with open(self._index_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, self._size, self._mtime, count = _HEADER.unpack_from(self._mmap)
+        view = memoryview(self._mmap)
+        start = _HEADER.size
+        self._hashes = view[start:start + 8 * count].cast("Q")
+        self._offsets = view[start + 8 * count:start + 16 * count].cast("Q")
+        return self
+
+    def lookup(self, name):
+        """Все записи с кличкой name (обычно одна)."""
+        if self._mmap is None or (self._size, self._mtime) != self._data_stamp():
+            self.open()
+        target = name_hash(name)
+        hashes = self._hashes
+        i = bisect_left(hashes, target)
+        result = []
+        with open(self._data_path, "rb") as f:
+            while i < len(hashes) and hashes[i] == target:
+                offset = self._offsets[i]
+                f.seek(offset)
+                record = self._parse(offset, f.readline())
+                if record and record["name"] == name:  # защита от коллизий
+                    result.append(record)
+                i += 1
+        return result
+
+    def get(self, name):
+        """Первая запись с кличкой name или None."""
+        found = self.lookup(name)
+        return found[0] if found else None
+
+    def __len__(self):
+        if self._mmap is None:
+            self.open()
+        return len(self._hashes)
+
+    def close(self):
+        if self._mmap is not None:
+            self._hashes.release()
+            self._offsets.release()
+            self._hashes = self._offsets = None
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
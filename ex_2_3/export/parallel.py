@@ -0,0 +1,116 @@
+"""
+Параллельный импорт: много файлов или один большой файл по частям
+
+Задачи (файл + байтовый диапазон) разбираются в пуле процессов теми же
+классами ExportFormat. Процессы возвращают компактные столбцы
+(см. records_to_columns), а главный процесс собирает из них животных
+с общими, интернированными объектами таксонов.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from data.taxonomy_registry import TaxonomyRegistry, records_to_columns
+from .compression import strip_codec_suffix
+from .formats import JsonFormat, JsonlFormat, CsvFormat, TxtFormat
+
+
+FORMATS_BY_EXTENSION = {
+    ".json": JsonFormat,
+    ".jsonl": JsonlFormat,
+    ".csv": CsvFormat,
+    ".txt": TxtFormat,
+}
+
+
+def get_format_for(filepath):
+    """Формат по расширению (с учётом .gz/.bz2/.xz) или None."""
+    _, ext = os.path.splitext(strip_codec_suffix(filepath))
+    fmt_class = FORMATS_BY_EXTENSION.get(ext.lower())
+    return fmt_class() if fmt_class else None
+
+
+def _parse_chunk(task):
+    """Работа процесса: разобрать диапазон файла в столбцы.
+
+    Некорректные строки пропускаются. Возвращает (столбцы, число
+    пропущенных строк, ошибка чтения диапазона или None).
+    """
+    fmt, filepath, start, end = task
+    errors = []
+    try:
+        columns = records_to_columns(fmt.iter_range(filepath, start, end, errors))
+    except Exception as e:  # файл не прочитать или JSON-массив испорчен
+        return records_to_columns([]), len(errors), f"{filepath}: {e}"
+    return columns, len(errors), None
+
+
+class ParallelImporter:
+    """Импорт набора файлов/папки в ферму через пул процессов."""
+
+    def __init__(self, registry=None, workers=None, chunks_per_worker=4):
+        self._registry = registry if registry is not None else TaxonomyRegistry()
+        self._workers = workers or os.cpu_count() or 1
+        self._chunks_per_worker = chunks_per_worker
+        self.skipped = 0
+        self.failed = []  # "файл: ошибка" для диапазонов, не прочитанных вовсе
+
+    @property
+    def registry(self):
+        return self._registry
+
+    def collect_files(self, sources):
+        """Папка или список путей -> файлы известных форматов."""
+        if isinstance(sources, (str, os.PathLike)):
+            sources = [sources]
+        files = []
+        for source in sources:
+            if os.path.isdir(source):
+                for name in sorted(os.listdir(source)):
+                    path = os.path.join(source, name)
+                    if os.path.isfile(path) and get_format_for(path):
+                        files.append(path)
+            elif get_format_for(source):
+                files.append(source)
+        return files
+
+    def make_tasks(self, files):
+        """Разбиение файлов на задачи; большие строчные файлы - на части."""
+        total = sum(os.path.getsize(path) for path in files) or 1
+        parts_total = self._workers * self._chunks_per_worker
+        tasks = []
+        for path in files:
+            fmt = get_format_for(path)
+            share = os.path.getsize(path) / total
+            parts = max(1, round(parts_total * share))
+            for start, end in fmt.split(path, parts):
+                tasks.append((fmt, path, start, end))
+        return tasks
+
+    def load(self, sources):
+        """Прочитать источники и вернуть список животных (в порядке файлов).
+
+        Число отброшенных некорректных строк - в self.skipped, файлы,
+        которые не удалось прочитать, - в self.failed.
+        """
+        tasks = self.make_tasks(self.collect_files(sources))
+        self.skipped = 0
+        self.failed = []
+        if len(tasks) <= 1 or self._workers == 1:
+            return self._merge(map(_parse_chunk, tasks))
+        with ProcessPoolExecutor(max_workers=self._workers) as pool:
+            return self._merge(pool.map(_parse_chunk, tasks))
+
+    def _merge(self, results):
+        animals = []
+        for columns, bad_lines, failure in results:
+            errors = {}
+            animals.extend(self._registry.animals_from_columns(columns, errors))
+            self.skipped += bad_lines + len(errors)
+            if failure is not None:
+                self.failed.append(failure)
+        return animals
+
+    def import_into(self, farm, sources):
+        """Слить источники с фермой по её ключу; возвращает MergeResult."""
+        return farm.merge(self.load(sources))
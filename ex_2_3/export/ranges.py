@@ -0,0 +1,40 @@
+"""
+Разбиение строчных файлов на байтовые диапазоны
+
+Строка относится к диапазону [start, end), если её первый байт лежит
+внутри него. Так несколько обработчиков читают один файл параллельно,
+и каждая строка попадает ровно к одному из них.
+Работает только с несжатыми файлами (в сжатом потоке нельзя seek).
+"""
+
+import os
+
+from .compression import detect_codec
+
+
+def split_byte_ranges(filepath, parts, start=0):
+    """Разбить файл на parts примерно равных диапазонов [start, end)."""
+    if detect_codec(filepath):
+        raise ValueError("Сжатый файл нельзя разбить на диапазоны")
+    size = os.path.getsize(filepath)
+    parts = max(1, min(parts, size - start or 1))
+    step = (size - start) / parts
+    bounds = [start + round(step * i) for i in range(parts)] + [size]
+    return [(bounds[i], bounds[i + 1]) for i in range(parts)
+            if bounds[i] < bounds[i + 1]]
+
+
+def iter_lines_in_range(filepath, start, end):
+    """Строки (bytes), начинающиеся внутри [start, end), с их смещениями."""
+    with open(filepath, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()  # хвост строки принадлежит предыдущему диапазону
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            yield pos, line
+            pos += len(line)
@@ -0,0 +1,162 @@
+"""
+Двоичный снимок фермы для быстрого запуска
+
+Граф объектов сохраняется целиком: каждый таксон (Тип ... Вид) - один
+раз, животные ссылаются на вид по номеру. Все поля лежат столбцами
+(модуль array), поэтому чтение - это несколько frombytes, без разбора
+текста и без повторного создания одинаковых таксонов.
+
+Структура файла:
+    заголовок   MAGIC, версия, порядок байт, размеры разделов
+    строки      UTF-8, разделитель \\0
+    таксоны     ранг, имя, описание, родитель, id - по столбцу
+    животные    имя, вид, возраст, вес, описание, id - по столбцу
+"""
+
+import struct
+import sys
+from array import array
+
+from data import (Phylum, ClassAnimal, Order, Family, Genus, Species,
+                  Animal, TaxonomicRank)
+
+
+MAGIC = b"FARMSNAP"
+VERSION = 1
+
+# MAGIC, версия, порядок байт (0 - little, 1 - big), строк, таксонов, животных,
+# длина блока строк в байтах
+_HEADER = struct.Struct("<8sHBxIIQQ")
+
+# Классы рангов по уровню и имя атрибута-родителя у каждого
+_RANKS = (
+    (Phylum, None),
+    (ClassAnimal, "_phylum"),
+    (Order, "_class_animal"),
+    (Family, "_order"),
+    (Genus, "_family"),
+    (Species, "_genus"),
+)
+
+# Порядок и типы столбцов
+_TAXON_COLUMNS = (("rank", "B"), ("name", "I"), ("description", "I"),
+                  ("parent", "i"), ("id", "q"))
+_ANIMAL_COLUMNS = (("name", "I"), ("species", "I"), ("age", "B"),
+                   ("weight", "d"), ("description", "I"), ("id", "q"))
+
+
+class _StringTable:
+    """Интернирование строк в номера."""
+
+    def __init__(self):
+        self.index = {}
+
+    def add(self, text):
+        text = text or ""
+        number = self.index.get(text)
+        if number is None:
+            if "\0" in text:
+                raise ValueError("Строка содержит символ \\0")
+            number = self.index[text] = len(self.index)
+        return number
+
+    def to_bytes(self):
+        return "\0".join(self.index).encode("utf-8")
+
+
+def save_snapshot(animals, filepath):
+    """Сохранить животных (ферму или список) со всеми таксонами."""
+    strings = _StringTable()
+    taxa = {_name: array(code) for _name, code in _TAXON_COLUMNS}
+    cols = {_name: array(code) for _name, code in _ANIMAL_COLUMNS}
+    taxon_index = {}  # id(объекта таксона) -> номер
+
+    def add_taxon(node, rank):
+        number = taxon_index.get(id(node))
+        if number is not None:
+            return number
+        parent_attr = _RANKS[rank][1]
+        parent = add_taxon(getattr(node, parent_attr), rank - 1) if parent_attr else -1
+        number = taxon_index[id(node)] = len(taxon_index)
+        taxa["rank"].append(rank)
+        taxa["name"].append(strings.add(node.name))
+        taxa["description"].append(strings.add(node.description))
+        taxa["parent"].append(parent)
+        taxa["id"].append(node.id)
+        return number
+
+    species_rank = len(_RANKS) - 1
+    count = 0
+    for animal in animals:
+        cols["name"].append(strings.add(animal.name))
+        cols["species"].append(add_taxon(animal.species, species_rank))
+        cols["age"].append(animal.age)
+        cols["weight"].append(animal.weight)
+        cols["description"].append(strings.add(animal.description))
+        cols["id"].append(animal.id)
+        count += 1
+
+    blob = strings.to_bytes()
+    with open(filepath, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, sys.byteorder == "big",
+                             len(strings.index), len(taxon_index), count,
+                             len(blob)))
+        f.write(blob)
+        for name, _ in _TAXON_COLUMNS:
+            f.write(taxa[name].tobytes())
+        for name, _ in _ANIMAL_COLUMNS:
+            f.write(cols[name].tobytes())
+    return count
+
+
+def _read_column(f, code, count, swap):
+    column = array(code)
+    column.frombytes(f.read(column.itemsize * count))
+    if len(column) != count:
+        raise ValueError("Снимок повреждён: файл обрезан")
+    if swap:
+        column.byteswap()
+    return column
+
+
+def load_snapshot(filepath):
+    """Прочитать снимок; возвращает список животных с общими таксонами."""
+    with open(filepath, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError("Не снимок фермы: файл слишком короткий")
+        magic, version, big, n_strings, n_taxa, n_animals, blob_size = \
+            _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Не снимок фермы: неверная сигнатура")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {version}")
+        swap = bool(big) != (sys.byteorder == "big")
+
+        strings = f.read(blob_size).decode("utf-8").split("\0")
+        if len(strings) != max(n_strings, 1):
+            raise ValueError("Снимок повреждён: таблица строк")
+        taxa = {name: _read_column(f, code, n_taxa, swap)
+                for name, code in _TAXON_COLUMNS}
+        cols = {name: _read_column(f, code, n_animals, swap)
+                for name, code in _ANIMAL_COLUMNS}
+
+    # Таксоны записаны так, что родитель всегда раньше потомка
+    nodes = []
+    for rank, name, description, parent, rank_id in zip(*taxa.values()):
+        cls, parent_attr = _RANKS[rank]
+        node = cls._new_unchecked(strings[name], strings[description], rank_id)
+        if parent_attr:
+            setattr(node, parent_attr, nodes[parent])
+        nodes.append(node)
+    allocator = TaxonomicRank.id_allocator()
+    allocator.resume_from(taxa["id"])
+
+    return Animal.bulk_create({
+        "name": [strings[i] for i in cols["name"]],
+        "species": [nodes[i] for i in cols["species"]],
+        "age": cols["age"].tolist(),
+        "weight": cols["weight"].tolist(),
+        "description": [strings[i] for i in cols["description"]],
+        "id": cols["id"].tolist(),
+    })
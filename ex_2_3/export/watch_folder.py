@@ -0,0 +1,246 @@
+"""
+Слежение за папкой: дописанные строки попадают в ферму сами
+
+Опрос (polling) вместо inotify - работает везде без сторонних служб.
+Для каждого файла строчного формата (CSV, TXT, JSONL) запоминается
+смещение конца последней целой строки - как у tail -f. При опросе
+читается только то, что дописали после него, и разбирается теми же
+классами ExportFormat. Незаконченная последняя строка ждёт, пока её
+допишут; целой она считается, только если файл не менялся дольше
+idle_after секунд (файлы часто сохраняют без перевода строки в конце).
+Строка длиннее max_bytes дочитывается до перевода строки за один опрос.
+Заголовок CSV запоминается при первом чтении файла.
+
+Файл читается заново с начала, если:
+- он стал короче запомненного смещения (усечение);
+- по его пути лежит другой файл (другой inode - ротация);
+- байт перед смещением больше не перевод строки (файл переписали).
+Переименованный файл (тот же inode под новым именем) продолжает
+читаться с прежнего смещения.
+
+Сжатые файлы и JSON-массивы не отслеживаются: дописывать их нельзя.
+"""
+
+import csv
+import os
+import time
+
+from data.taxonomy_registry import TaxonomyRegistry
+from .compression import detect_codec
+from .parallel import get_format_for
+
+
+DEFAULT_INTERVAL_MS = 1000
+MAX_BYTES_PER_POLL = 8 * 1024 * 1024  # на файл за один опрос
+IDLE_AFTER_S = 5 * DEFAULT_INTERVAL_MS / 1000  # тишина до приёма неполной строки
+
+
+class _FileState:
+    """Что уже прочитано из одного файла."""
+
+    __slots__ = ("identity", "offset", "header", "tail_size", "tail_since",
+                 "open_line")
+
+    def __init__(self, identity):
+        self.reset(identity)
+
+    def reset(self, identity):
+        self.identity = identity  # (st_dev, st_ino)
+        self.offset = 0  # конец последней прочитанной целой строки
+        self.header = None  # колонки CSV
+        self.tail_size = None  # размер файла, когда в конце ждала неполная строка
+        self.tail_since = None  # time.monotonic(), с которого tail_size не менялся
+        self.open_line = False  # последняя строка прочитана без перевода строки
+
+
+class FolderWatcher:
+    """Опрос папки и чтение только дописанных строк.
+
+    poll() -> список записей (словарей), появившихся с прошлого опроса.
+    ingest(farm) -> то же, но сразу слитое с фермой (MergeResult).
+    from_start=False - уже лежащие файлы пропускаются, читается
+    только дописанное после первого опроса.
+    idle_after - сколько секунд файл не должен меняться, чтобы
+    последняя строка без перевода строки считалась целой.
+    """
+
+    def __init__(self, folder, registry=None, from_start=True,
+                 max_bytes=MAX_BYTES_PER_POLL, idle_after=IDLE_AFTER_S):
+        self._folder = folder
+        self._registry = registry if registry is not None else TaxonomyRegistry()
+        self._from_start = from_start
+        self._max_bytes = max_bytes
+        self._idle_after = idle_after
+        self._files = {}  # путь -> _FileState
+        self._formats = {}  # путь -> ExportFormat
+        self._first_poll = True
+        self.skipped = 0  # отброшенные некорректные строки и записи
+
+    @property
+    def folder(self):
+        return self._folder
+
+    def _watchable(self, path):
+        fmt = get_format_for(path)
+        if fmt is None or not fmt.line_based or detect_codec(path):
+            return None
+        return fmt
+
+    def _scan(self):
+        """{путь: os.stat_result} отслеживаемых файлов папки."""
+        found = {}
+        try:
+            entries = list(os.scandir(self._folder))
+        except FileNotFoundError:
+            return found
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if entry.path not in self._formats:
+                fmt = self._watchable(entry.path)
+                if fmt is None:
+                    continue
+                self._formats[entry.path] = fmt
+            found[entry.path] = entry.stat()
+        return found
+
+    def _sync_files(self, found):
+        """Согласовать состояния с папкой: новые, пропавшие, переименованные."""
+        moved = {}  # identity -> состояние файла, ушедшего со своего пути
+        for path, state in list(self._files.items()):
+            st = found.get(path)
+            if st is None or (st.st_dev, st.st_ino) != state.identity:
+                moved[state.identity] = self._files.pop(path)
+                if st is None:
+                    self._formats.pop(path, None)
+
+        for path, st in found.items():
+            if path in self._files:
+                continue
+            identity = (st.st_dev, st.st_ino)
+            state = moved.pop(identity, None)
+            if state is None:
+                state = _FileState(identity)
+                if self._first_poll and not self._from_start:
+                    self._skip_existing(path, state, st.st_size)
+            self._files[path] = state
+
+    def _skip_existing(self, path, state, size):
+        """Начать с конца файла (заголовок CSV всё равно нужен)."""
+        with open(path, "rb") as f:
+            data = f.read(size)
+        state.offset = len(data)
+        state.open_line = bool(data) and not data.endswith(b"\n")
+        if data:
+            state.header = self._header_for(path, data.split(b"\n", 1)[0])
+
+    def _header_for(self, path, line):
+        fmt = self._formats[path]
+        if hasattr(fmt, "parse_header"):
+            return fmt.parse_header(line.decode("utf-8"))
+        return None
+
+    def _read_new(self, path, state, size):
+        """Дописанные целые строки файла после state.offset.
+
+        Смещение и прочее состояние файла меняются только после разбора
+        всей пачки: если чтение сорвалось, следующий опрос прочитает те
+        же байты. Некорректные строки пропускаются и считаются в skipped.
+        """
+        offset = state.offset
+        with open(path, "rb") as f:
+            if offset:
+                f.seek(offset - 1)
+                if f.read(1) != b"\n" and not state.open_line:
+                    state.reset(state.identity)  # файл переписан на месте
+                    offset = 0
+                    f.seek(0)
+            data = f.read(min(size - offset, self._max_bytes))
+            end = data.rfind(b"\n") + 1
+            # Строка длиннее max_bytes: дочитать до её конца, иначе не сдвинуться
+            while not end and len(data) < size - offset:
+                chunk = f.read(min(size - offset - len(data), self._max_bytes))
+                if not chunk:
+                    break
+                newline = chunk.find(b"\n")
+                if newline >= 0:
+                    end = len(data) + newline + 1
+                data += chunk
+        open_line = False
+        tail_size, tail_since = state.tail_size, state.tail_since
+        if end < len(data) and offset + len(data) >= size:
+            now = time.monotonic()
+            if tail_size != size:
+                tail_size, tail_since = size, now
+            elif now - tail_since >= self._idle_after:
+                end = len(data)  # файл давно не меняется - строка закончена
+                open_line = True
+        if not end:
+            state.tail_size, state.tail_since = tail_size, tail_since
+            return []
+
+        raw_lines = data[:end].splitlines(keepends=True)
+        header = state.header
+        if offset == 0:
+            header = self._header_for(path, raw_lines[0])
+            if header is not None:
+                raw_lines = raw_lines[1:]
+        errors = []
+        lines = []
+        for raw in raw_lines:
+            try:
+                lines.append(raw.decode("utf-8"))
+            except UnicodeDecodeError as e:
+                errors.append(str(e))
+        records = list(self._formats[path].parse_lines(lines, header, errors))
+
+        self.skipped += len(errors)
+        state.offset = offset + end
+        state.header = header
+        state.open_line = open_line
+        if open_line or end == len(data):
+            tail_size = tail_since = None
+        state.tail_size, state.tail_since = tail_size, tail_since
+        return records
+
+    def poll(self):
+        """Новые записи всех файлов папки с прошлого опроса.
+
+        Исключения чтения наружу не выходят (poll зовётся из таймера).
+        """
+        found = self._scan()
+        self._sync_files(found)
+        self._first_poll = False
+        records = []
+        for path in sorted(self._files):
+            state = self._files[path]
+            size = found[path].st_size
+            if size < state.offset:
+                state.reset(state.identity)  # усечение
+            if size == state.offset:
+                continue
+            try:
+                records.extend(self._read_new(path, state, size))
+            except (OSError, ValueError, csv.Error):
+                continue  # файл заняли или заголовок не разобрать - в другой раз
+        return records
+
+    def ingest(self, farm):
+        """Слить новые записи с фермой; MergeResult или None, если нечего."""
+        records = self.poll()
+        if not records:
+            return None
+        errors = {}
+        animals = self._registry.records_to_animals(records, errors)
+        self.skipped += len(errors)
+        return farm.merge(animals)
+
+    def offsets(self):
+        """{путь: прочитано байт} - для отладки и статуса."""
+        return {path: state.offset for path, state in self._files.items()}
+
+    def reset(self):
+        """Забыть смещения: следующий опрос прочитает всё заново."""
+        self._files.clear()
+        self._formats.clear()
+        self._first_poll = True
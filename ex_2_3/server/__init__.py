@@ -0,0 +1,9 @@
+"""Пакет локального сервера запросов к ферме (HTTP/JSON)."""
+
+from .query_server import FarmQueryServer, FarmQueryService, HttpError
+
+__all__ = [
+    'FarmQueryServer',
+    'FarmQueryService',
+    'HttpError',
+]
@@ -0,0 +1,5 @@
+"""python -m server [файлы или папки] [--port N] - запуск сервера запросов."""
+
+from server.query_server import main
+
+main()
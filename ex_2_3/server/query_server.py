@@ -0,0 +1,347 @@
+"""
+Локальный HTTP/JSON сервер запросов к ферме (asyncio, только stdlib)
+
+То, что окно показывает для выбранного животного (иерархия и
+характеристики), доступно другим программам по HTTP на 127.0.0.1:
+
+    GET /animals?name=Мурка          животные с такой кличкой
+    GET /animals/<id>                животное по id
+    GET /animals/<id>/hierarchy      линия от Типа до животного
+    GET /taxa/<тип>/<класс>/...      таксон: сводка и дочерние таксоны
+                                     (у вида - животные); /taxa - корень
+    GET /stats/<тип>/<класс>/...     только агрегаты таксона
+
+Соединения живут между запросами (HTTP/1.1 keep-alive), запросы можно
+слать пачкой не дожидаясь ответов (pipelining) - ответы идут в том же
+порядке. Готовые ответы кэшируются (LRU) вместе с версией фермы:
+после любого изменения фермы старые ответы не отдаются.
+
+Ферма читается в потоке цикла событий. Менять её из другого потока
+можно только через loop.call_soon_threadsafe.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit, parse_qs
+
+from data.events import Inserted, Removed, Updated, Cleared
+from data.taxonomy_tree import RANK_NAMES
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+CACHE_SIZE = 4096  # ответов в LRU
+KEEPALIVE_TIMEOUT = 15  # секунд простоя до закрытия соединения
+MAX_HEADER_BYTES = 16 * 1024
+MAX_LIST = 1000  # животных вида в одном ответе (дальше - ?offset=)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 431: "Request Header Fields Too Large"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _animal_info(animal):
+    return {"id": animal.id, "name": animal.name, "species": animal.species.name,
+            "age": animal.age, "weight": animal.weight,
+            "description": animal.description}
+
+
+def _hierarchy(animal):
+    """Линия животного: как дерево в окне, сверху вниз."""
+    ranks = []
+    rank = animal.species
+    while rank is not None:
+        ranks.append(rank)
+        rank = rank.get_parent()
+    ranks.reverse()
+    result = [{"rank": rank_name, "name": rank.name, "description": rank.description}
+              for rank_name, rank in zip(RANK_NAMES, ranks)]
+    result.append(dict(_animal_info(animal), rank="Животное"))
+    return result
+
+
+class FarmQueryService:
+    """Ответы на запросы к ферме (без сети) + кэш по версии фермы."""
+
+    def __init__(self, farm, cache_size=CACHE_SIZE):
+        self._farm = farm
+        self._cache_size = cache_size
+        self._cache = OrderedDict()  # цель запроса -> (версия, статус, тело)
+        self._names = None  # кличка -> {id: животное}, строится при первом поиске
+        self._name_of = {}  # id -> кличка, под которой животное в индексе
+        self._dumps = json.JSONEncoder(ensure_ascii=False,
+                                       separators=(",", ":")).encode
+        self.hits = 0
+        self.misses = 0
+        farm.subscribe(self._on_farm_event)
+
+    def handle(self, target):
+        """Цель запроса (путь?параметры) -> (статус, тело JSON в байтах)."""
+        version = self._farm.version
+        cached = self._cache.get(target)
+        if cached is not None and cached[0] == version:
+            self._cache.move_to_end(target)
+            self.hits += 1
+            return cached[1], cached[2]
+        self.misses += 1
+        try:
+            status, payload = 200, self._route(target)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        body = self._dumps(payload).encode("utf-8")
+        if self._cache_size:
+            self._cache[target] = (version, status, body)
+            self._cache.move_to_end(target)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return status, body
+
+    def _route(self, target):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        if not parts:
+            return {"farm": self._farm.name, "count": self._farm.count(),
+                    "version": self._farm.version}
+        head, rest = parts[0], parts[1:]
+        if head == "animals":
+            return self._animals(rest, query)
+        if head == "taxa":
+            return self._taxon(rest, query)
+        if head == "stats":
+            stats = self._farm.taxon_stats(tuple(rest))
+            if stats is None:
+                raise HttpError(404, "Таксон не найден")
+            return stats
+        raise HttpError(404, "Неизвестный путь")
+
+    def _animal(self, raw_id):
+        try:
+            animal = self._farm.get_by_id(int(raw_id))
+        except ValueError:
+            raise HttpError(400, "id должен быть числом") from None
+        if animal is None:
+            raise HttpError(404, "Животное не найдено")
+        return animal
+
+    def _animals(self, rest, query):
+        if not rest:
+            names = query.get("name")
+            if not names:
+                raise HttpError(400, "Нужен параметр name")
+            return [_animal_info(animal) for animal in self._by_name(names[0])]
+        animal = self._animal(rest[0])
+        if len(rest) == 1:
+            return _animal_info(animal)
+        if rest[1:] == ["hierarchy"]:
+            return _hierarchy(animal)
+        raise HttpError(404, "Неизвестный путь")
+
+    def _by_name(self, name):
+        """Поиск по кличке: индекс строится один раз, дальше его ведут
+        события фермы (_on_farm_event)."""
+        if self._names is None:
+            self._names = {}
+            for animal in self._farm:
+                self._index_name(animal)
+        return tuple(self._names.get(name, {}).values())
+
+    def _index_name(self, animal):
+        self._names.setdefault(animal.name, {})[animal.id] = animal
+        self._name_of[animal.id] = animal.name
+
+    def _unindex_name(self, animal_id):
+        name = self._name_of.pop(animal_id, None)
+        if name is None:
+            return
+        animals = self._names[name]
+        del animals[animal_id]
+        if not animals:
+            del self._names[name]
+
+    def _on_farm_event(self, event):
+        """Поправить индекс кличек за O(изменений), а не строить заново."""
+        if self._names is None:
+            return
+        if isinstance(event, Inserted):
+            for animal in event.items:
+                self._index_name(animal)
+        elif isinstance(event, Removed):
+            for animal_id in event.ids:
+                self._unindex_name(animal_id)
+        elif isinstance(event, Updated):
+            # Кличка могла смениться, а животное - замениться копией
+            for animal in event.items:
+                self._unindex_name(animal.id)
+                self._index_name(animal)
+        elif isinstance(event, Cleared):
+            self._names.clear()
+            self._name_of.clear()
+
+    def _taxon(self, lineage, query):
+        node = self._farm.taxonomy.find(tuple(lineage))
+        if node is None or (lineage and not node.count):
+            raise HttpError(404, "Таксон не найден")
+        result = node.stats()
+        if node.is_species:
+            try:
+                offset = int(query.get("offset", ["0"])[0])
+            except ValueError:
+                raise HttpError(400, "offset должен быть числом") from None
+            if offset < 0:
+                raise HttpError(400, "offset не может быть отрицательным")
+            result["animals"] = [_animal_info(animal) for animal
+                                 in node.animals[offset:offset + MAX_LIST]]
+        else:
+            result["children"] = [
+                {"rank": child.rank_name, "name": child.name, "count": child.count}
+                for child in node.child_nodes if child.count]
+        return result
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def close(self):
+        """Отписаться от фермы."""
+        self._farm.unsubscribe(self._on_farm_event)
+
+
+class FarmQueryServer:
+    """HTTP/1.1 поверх asyncio.start_server."""
+
+    def __init__(self, farm, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 cache_size=CACHE_SIZE):
+        self.service = FarmQueryService(farm, cache_size)
+        self._host = host
+        self._port = port
+        self._server = None
+
+    @property
+    def port(self):
+        """Порт (после start(), если просили 0 - выданный системой)."""
+        if self._server is not None:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._serve_connection, self._host, self._port,
+            limit=MAX_HEADER_BYTES)
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.service.close()
+
+    async def _serve_connection(self, reader, writer):
+        """Запросы одного соединения по очереди, пока клиент не закроет."""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    self._respond(writer, 431, b'{"error":"Headers too large"}',
+                                  False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                keep_alive = await self._handle(head, reader, writer)
+                # Ответы на пачку запросов копятся в буфере, ждём только
+                # если клиент не успевает их забирать
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, head, reader, writer):
+        """Разобрать один запрос и записать ответ; оставить ли соединение."""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            self._respond(writer, 400, b'{"error":"Bad request line"}', False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            self._respond(writer, 400, b'{"error":"Bad Content-Length"}', False)
+            return False
+        if length > 0:
+            try:
+                await reader.readexactly(length)  # тело не нужно, но его надо вычитать
+            except asyncio.IncompleteReadError:
+                return False  # клиент закрыл соединение посреди тела
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+
+        if method not in ("GET", "HEAD"):
+            self._respond(writer, 405, b'{"error":"Only GET"}', keep_alive)
+            return keep_alive
+        status, body = self.service.handle(target)
+        self._respond(writer, status, body, keep_alive, method == "HEAD")
+        return keep_alive
+
+    @staticmethod
+    def _respond(writer, status, body, keep_alive, head_only=False):
+        writer.write(
+            (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+             "Content-Type: application/json; charset=utf-8\r\n"
+             f"Content-Length: {len(body)}\r\n"
+             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+             "\r\n").encode("latin-1"))
+        if not head_only:
+            writer.write(body)
+
+
+def main(argv=None):
+    """python -m server [файлы или папки] [--port N]"""
+    import argparse
+    import os
+
+    from data import Farm
+    from export.parallel import ParallelImporter
+
+    default_storage = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage")
+    parser = argparse.ArgumentParser(description="HTTP/JSON запросы к ферме")
+    parser.add_argument("sources", nargs="*", default=[default_storage])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args(argv)
+
+    farm = Farm()
+    ParallelImporter().import_into(farm, args.sources)
+    server = FarmQueryServer(farm, DEFAULT_HOST, args.port, args.cache_size)
+    print(f"{farm.count()} животных, http://{DEFAULT_HOST}:{args.port}/")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
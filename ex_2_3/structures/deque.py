@@ -87,6 +87,29 @@ class Deque:
             return None
         return self.__tail.data
 
+    def remove_if(self, predicate):
+        """Удалить все элементы, для которых predicate(item) истинно.
+
+        Один проход со снятием узлов из списка; возвращает удалённые.
+        """
+        removed = []
+        current = self.__head
+        while current is not None:
+            following = current.next
+            if predicate(current.data):
+                removed.append(current.data)
+                if current.prev is None:
+                    self.__head = following
+                else:
+                    current.prev.next = following
+                if following is None:
+                    self.__tail = current.prev
+                else:
+                    following.prev = current.prev
+                self.__size -= 1
+            current = following
+        return removed
+
     def is_empty(self):
         """Пуст ли дек."""
         return self.__head is None
@@ -0,0 +1,38 @@
+"""
+Тесты DisplayMetadata: выбор иконки по правилам.
+
+Запуск из каталога ex_2_3:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from view.display import DisplayMetadata  # noqa: E402
+
+
+class DisplayMetadataTest(unittest.TestCase):
+
+    def test_first_rule_wins(self):
+        display = DisplayMetadata([("кош", "A"), ("домашняя", "B")], default="?")
+        self.assertEqual(display.icon_for_name("Домашняя кошка"), "A")
+
+    def test_overlapping_later_match_does_not_hide_earlier_rule(self):
+        """Правило B начинается раньше и перекрывает A - всё равно A."""
+        display = DisplayMetadata([("bc", "A"), ("xb", "B")], default="?")
+        self.assertEqual(display.icon_for_name("xbc"), "A")
+
+    def test_case_insensitive_and_default(self):
+        display = DisplayMetadata([("корова", "🐄")], default="?")
+        self.assertEqual(display.icon_for_name("Домашняя КОРОВА"), "🐄")
+        self.assertEqual(display.icon_for_name("Лошадь"), "?")
+
+    def test_no_rules(self):
+        self.assertEqual(DisplayMetadata([], default="?").icon_for_name("Кот"), "?")
+
+
+if __name__ == "__main__":
+    unittest.main()
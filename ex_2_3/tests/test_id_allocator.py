@@ -0,0 +1,128 @@
+"""
+Тесты IdAllocator: блоки потоков и учёт загруженных ID;
+ферма не держит двух животных с одним ID.
+
+Запуск из каталога ex_2_3:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data import Farm, TaxonomyRegistry  # noqa: E402
+from data.id_allocator import IdAllocator  # noqa: E402
+
+
+class IdAllocatorTest(unittest.TestCase):
+
+    def test_ids_are_sequential_within_block(self):
+        allocator = IdAllocator(block_size=8)
+        self.assertEqual([allocator.next_id() for _ in range(10)], list(range(10)))
+
+    def test_observe_old_id_keeps_block(self):
+        """ID вне розданных блоков не сжигает блок потока."""
+        allocator = IdAllocator(block_size=1024)
+        allocator.reserve(100)  # 0..99 ушли вызывающему коду
+        first = allocator.next_id()
+        for _ in range(1000):
+            allocator.observe(5)
+        self.assertEqual(allocator.next_id(), first + 1)
+        self.assertEqual(allocator.peek(), first + 1024)
+
+    def test_observe_inside_block_resets_it(self):
+        """ID внутри блока потока - блок сбрасывается, повтора нет."""
+        allocator = IdAllocator(block_size=16)
+        allocator.next_id()
+        allocator.observe(10)
+        issued = allocator.next_id()
+        self.assertGreaterEqual(issued, 16)
+        self.assertEqual(allocator.next_id(), issued + 1)
+
+    def test_observe_beyond_next_moves_counter(self):
+        allocator = IdAllocator(block_size=4)
+        allocator.observe(500)
+        self.assertEqual(allocator.next_id(), 501)
+
+    def test_other_thread_block_is_reset(self):
+        allocator = IdAllocator(block_size=32)
+        issued = []
+        ready, observed = threading.Event(), threading.Event()
+
+        def worker():
+            issued.append(allocator.next_id())
+            ready.set()
+            observed.wait()
+            issued.append(allocator.next_id())
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        ready.wait()
+        allocator.observe(issued[0] + 5)  # попал в блок потока
+        observed.set()
+        thread.join()
+        self.assertGreater(issued[1], issued[0] + 5)
+
+    def test_threads_get_unique_ids(self):
+        allocator = IdAllocator(block_size=16)
+        results = [[] for _ in range(8)]
+
+        def worker(out):
+            for i in range(2000):
+                out.append(allocator.next_id())
+                if i % 100 == 0:
+                    allocator.observe(i)
+
+        threads = [threading.Thread(target=worker, args=(out,)) for out in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        ids = [i for out in results for i in out]
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+class FarmIdCollisionTest(unittest.TestCase):
+    """Загруженный ID, совпавший с занятым, заменяется новым."""
+
+    def setUp(self):
+        self.registry = TaxonomyRegistry()
+        self.farm = Farm()
+        self.first = self.registry.records_to_animals(
+            [{"name": "a", "species": "Кот", "age": 1, "weight": 2}])[0]
+        self.farm.add_animal(self.first)
+
+    def loaded(self, *names):
+        records = [{"id": self.first.id, "name": name, "species": "Кот",
+                    "age": 1, "weight": 2} for name in names]
+        return self.registry.records_to_animals(records)
+
+    def assert_unique_ids(self):
+        ids = [animal.id for animal in self.farm]
+        self.assertEqual(len(ids), len(set(ids)))
+        for animal in self.farm:
+            self.assertIs(self.farm.get_by_id(animal.id), animal)
+
+    def test_add_animal(self):
+        other = self.loaded("b")[0]
+        self.farm.add_animal(other)
+        self.assertNotEqual(other.id, self.first.id)
+        self.assert_unique_ids()
+
+    def test_add_animals_batch(self):
+        self.farm.add_animals(self.loaded("b", "c"))
+        self.assertEqual(len(self.farm), 3)
+        self.assert_unique_ids()
+
+    def test_remove_by_reassigned_id(self):
+        other = self.loaded("b")[0]
+        self.farm.add_animal(other)
+        self.farm.remove_where(lambda animal: animal.id == other.id)
+        self.assertEqual([animal.name for animal in self.farm], ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
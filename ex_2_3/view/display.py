@@ -0,0 +1,82 @@
+"""
+Оформление животных в списках: иконки по виду
+
+Правила "подстрока в названии вида -> иконка" читаются из icons.json
+и собираются в одно регулярное выражение. Выигрывает первое по порядку
+подходящее правило, как и раньше при переборе словаря. Результат
+запоминается на объекте Species, так что строка списка стоит одного
+поиска в словаре, сколько бы животных ни было.
+"""
+
+import json
+import os
+import re
+import weakref
+
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "icons.json")
+DEFAULT_ICON = "🐾"
+
+
+class DisplayMetadata:
+    """Иконки видов по правилам из конфигурации."""
+
+    def __init__(self, rules, default=DEFAULT_ICON):
+        self._icons = [icon for _, icon in rules]
+        self._default = default
+        self._matcher = None
+        if rules:
+            # Опережающие проверки не поглощают текст: совпадения правил
+            # могут перекрываться, и ни одно не заслонит другое
+            pattern = "|".join(f"(?=({re.escape(match)}))" for match, _ in rules)
+            self._matcher = re.compile(pattern, re.IGNORECASE)
+        self._by_name = {}
+        self._by_species = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_CONFIG):
+        """Правила из JSON: {"default": ..., "rules": [{"match", "icon"}]}."""
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        rules = [(rule["match"], rule["icon"]) for rule in config.get("rules", [])]
+        return cls(rules, config.get("default", DEFAULT_ICON))
+
+    def icon_for_name(self, species_name):
+        """Иконка по названию вида (с кэшем по названию)."""
+        icon = self._by_name.get(species_name)
+        if icon is None:
+            icon = self._by_name[species_name] = self._match(species_name)
+        return icon
+
+    def _match(self, species_name):
+        if self._matcher is None:
+            return self._default
+        # Совпадения идут по каждой позиции слева направо, а приоритет -
+        # у правила, которое раньше в списке; номер группы = номер правила
+        best = None
+        for found in self._matcher.finditer(species_name):
+            rule = found.lastindex - 1
+            if best is None or rule < best:
+                best = rule
+                if best == 0:
+                    break
+        return self._icons[best] if best is not None else self._default
+
+    def icon(self, species):
+        """Иконка вида; одна проверка словаря после первого обращения."""
+        try:
+            return self._by_species[species]
+        except KeyError:
+            icon = self._by_species[species] = self.icon_for_name(species.name)
+            return icon
+        except TypeError:  # вид без weakref (или None)
+            return self.icon_for_name(species.name) if species else self._default
+
+    def label(self, animal, prefix=""):
+        """Подпись строки: иконка и кличка."""
+        return f"{prefix}{self.icon(animal.species)} {animal.name}"
+
+    def clear_cache(self):
+        self._by_name.clear()
+        self._by_species.clear()
@@ -0,0 +1,39 @@
+"""
+Фоновый экспорт фермы (QThread)
+
+Поток получает снимок фермы (Farm.snapshot()), поэтому интерфейс может
+менять ферму, пока идёт запись. Прогресс и итог приходят сигналами -
+Qt доставляет их в главный поток.
+"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from export.fanout import FanOutExporter
+
+
+class ExportWorker(QThread):
+    """Экспорт снимка во все форматы моста в отдельном потоке."""
+
+    progress = pyqtSignal(int, int, str)  # сделано, всего, этап
+    completed = pyqtSignal(dict)  # {формат: (путь, успех)}
+    failed = pyqtSignal(str)
+
+    def __init__(self, snapshot, base_path, formats=None, parent=None):
+        super().__init__(parent)
+        self._snapshot = snapshot
+        self._base_path = base_path
+        self._exporter = FanOutExporter(formats)
+
+    def run(self):
+        try:
+            results = self._exporter.export(
+                self._snapshot, self._base_path, self._report)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.completed.emit(results)
+        finally:
+            self._snapshot = None  # версия фермы больше не нужна
+
+    def _report(self, done, total, stage):
+        self.progress.emit(done, total if total is not None else 0, stage)
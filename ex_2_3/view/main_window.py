@@ -2,40 +2,47 @@
 ФЕРМА - главное окно приложения
 
 Демонстрирует все структуры данных:
-- Stack (LIFO) - история просмотров (кнопка "Назад")
+- Два ограниченных стека - история просмотров (кнопки "Назад" и "Вперёд")
 - Deque - обычное и приоритетное кормление (обычное в конец, срочное в начало)
 - Паттерн Мост - импорт данных в разных форматах
+- Наблюдатель - ферма и очередь присылают изменения, экран обновляется
+  одним пакетом за тик цикла событий
+- Экспорт снимка фермы сразу во все форматы в фоновом потоке
+- Слежение за папкой storage: дописанные строки подгружаются сами
 """
 
+import os
+
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QListWidget, QLabel, QComboBox,
     QGroupBox, QFileDialog, QTreeWidget, QTreeWidgetItem,
-    QSplitter, QListWidgetItem, QProgressBar
+    QSplitter, QListWidgetItem, QProgressBar, QTabWidget, QTreeView
 )
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont
 
-from structures import Stack, Deque
-from export.formats import JsonFormat, CsvFormat, TxtFormat
+from export.formats import JsonFormat, JsonlFormat, CsvFormat, TxtFormat
+from export.compression import file_patterns
+from export.parallel import ParallelImporter, FORMATS_BY_EXTENSION
+from export.watch_folder import FolderWatcher, DEFAULT_INTERVAL_MS
 from data import Phylum, ClassAnimal, Order, Family, Genus, Species, Animal, Farm
+from data.taxonomy_registry import TaxonomyRegistry
+from data.feeding_queue import FeedingQueue
+from data.events import ChangeBatcher
+from data.navigation import NavigationHistory
+from view.taxonomy_model import TaxonomyModel
+from view.export_worker import ExportWorker
+from view.display import DisplayMetadata
 
 
-ANIMAL_ICONS = {
-    'корова': '🐄',
-    'кошка': '🐱',
-    'собака': '🐕',
-    'курица': '🐔',
-}
+STORAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage")
 
 
-def get_animal_icon(species_name):
-    """Эмодзи по виду животного."""
-    species_lower = species_name.lower()
-    for key, icon in ANIMAL_ICONS.items():
-        if key in species_lower:
-            return icon
-    return '🐾'
+def _next_tick(callback):
+    """Отложить вызов до следующего тика цикла событий Qt."""
+    QTimer.singleShot(0, callback)
 
 
 def create_sample_animals():
@@ -80,12 +87,26 @@ class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.farm = Farm("Ново-Простоквашино")
+        self.taxonomy_registry = TaxonomyRegistry()
+
+        self.feeding_deque = FeedingQueue()
+        self.feeding_deque.track(self.farm)
+        self.view_history = NavigationHistory(max_size=100)
+        self.view_history.track(self.farm)
+        self.export_worker = None
+        self.display = DisplayMetadata.from_file()
 
-        self.feeding_deque = Deque()
-        self.view_history = Stack()
+        self.folder_watcher = FolderWatcher(STORAGE_DIR, self.taxonomy_registry)
+        self.watch_timer = QTimer(self)
+        self.watch_timer.timeout.connect(self._poll_storage)
 
         self._init_ui()
 
+        # Изменения копятся и применяются один раз за тик цикла событий
+        self.farm.subscribe(ChangeBatcher(self._apply_farm_changes, _next_tick))
+        self.feeding_deque.subscribe(
+            ChangeBatcher(self._apply_feed_changes, _next_tick))
+
     def _init_ui(self):
         """Создание интерфейса."""
         self.setWindowTitle(f"🐄 Ферма «{self.farm.name}»")
@@ -109,6 +130,12 @@ class MainWindow(QWidget):
         splitter.setStretchFactor(1, 1)
         main_layout.addWidget(splitter, stretch=1)
 
+        self.status_label = QLabel("Готово")
+        self.status_label.setFont(QFont('Arial', 11))
+        self.status_label.setStyleSheet(
+            "padding: 6px 15px; color: #666; border-top: 1px solid #ccc;")
+        main_layout.addWidget(self.status_label, stretch=0)
+
         left_panel = self._create_left_panel()
         splitter.addWidget(left_panel)
 
@@ -132,7 +159,8 @@ class MainWindow(QWidget):
 
         self.format_combo = QComboBox()
         self.format_combo.addItems(
-            ["Выберите формат", "Пример данных", "JSON", "CSV", "TXT"])
+            ["Выберите формат", "Пример данных", "JSON", "JSONL", "CSV", "TXT",
+             "Папка (параллельно)", "Файлы (параллельно)"])
         self.format_combo.setFont(QFont('Arial', 12))
         self.format_combo.setMinimumHeight(40)
         self.format_combo.currentTextChanged.connect(self._on_format_changed)
@@ -147,6 +175,15 @@ class MainWindow(QWidget):
         self.import_btn.clicked.connect(self._import_data)
         import_layout.addWidget(self.import_btn)
 
+        self.watch_btn = QPushButton("👁 Следить")
+        self.watch_btn.setFont(QFont('Arial', 12))
+        self.watch_btn.setMinimumHeight(40)
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.setToolTip(
+            "Подгружать новые строки из папки storage (CSV, TXT, JSONL)")
+        self.watch_btn.toggled.connect(self._toggle_watch)
+        import_layout.addWidget(self.watch_btn)
+
         layout.addWidget(import_group, stretch=0)
 
         animals_group = QGroupBox("🐾 Животные фермы")
@@ -194,6 +231,23 @@ class MainWindow(QWidget):
         self.clear_btn.setEnabled(False)
         btn_layout2.addWidget(self.clear_btn)
 
+        self.remove_btn = QPushButton("❌ Удалить")
+        self.remove_btn.clicked.connect(self._remove_selected_animal)
+        self.remove_btn.setFont(QFont('Arial', 12))
+        self.remove_btn.setMinimumHeight(40)
+        self.remove_btn.setToolTip("Удалить выбранное животное с фермы")
+        self.remove_btn.setEnabled(False)
+        btn_layout2.addWidget(self.remove_btn)
+
+        self.export_btn = QPushButton("💾 Экспорт")
+        self.export_btn.clicked.connect(self._export_all)
+        self.export_btn.setFont(QFont('Arial', 12))
+        self.export_btn.setMinimumHeight(40)
+        self.export_btn.setToolTip(
+            "Сохранить ферму сразу во всех форматах (в фоне)")
+        self.export_btn.setEnabled(False)
+        btn_layout2.addWidget(self.export_btn)
+
         animals_layout.addLayout(btn_layout2, stretch=0)
         layout.addWidget(animals_group, stretch=1)
 
@@ -207,7 +261,7 @@ class MainWindow(QWidget):
         layout.setContentsMargins(15, 15, 15, 15)
 
         tree_group = QGroupBox(
-            "🌳 Иерархия (Агрегация, Наследование) + История (Стек LIFO)")
+            "🌳 Иерархия (Агрегация, Наследование) + История (назад/вперёд)")
         tree_group.setFont(QFont('Arial', 13, QFont.Weight.Bold))
         tree_layout = QVBoxLayout()
         tree_layout.setSpacing(12)
@@ -222,10 +276,18 @@ class MainWindow(QWidget):
         self.back_btn.setMaximumWidth(100)
         self.back_btn.clicked.connect(self._go_back_in_history)
         self.back_btn.setEnabled(False)
-        self.back_btn.setToolTip(
-            "Вернуться к предыдущему животному (Стек LIFO)")
+        self.back_btn.setToolTip("Вернуться к предыдущему животному")
         history_layout.addWidget(self.back_btn)
 
+        self.forward_btn = QPushButton("Вперёд ➡")
+        self.forward_btn.setFont(QFont('Arial', 12))
+        self.forward_btn.setMinimumHeight(40)
+        self.forward_btn.setMaximumWidth(110)
+        self.forward_btn.clicked.connect(self._go_forward_in_history)
+        self.forward_btn.setEnabled(False)
+        self.forward_btn.setToolTip("Снова открыть животное, с которого ушли назад")
+        history_layout.addWidget(self.forward_btn)
+
         self.history_label = QLabel("История: пусто")
         self.history_label.setFont(QFont('Arial', 13))
         self.history_label.setStyleSheet("color: #666;")
@@ -239,7 +301,20 @@ class MainWindow(QWidget):
         self.tree_widget.setFont(QFont('Arial', 12))
         self.tree_widget.setAnimated(True)
         self.tree_widget.setIndentation(30)
-        tree_layout.addWidget(self.tree_widget, stretch=1)
+
+        # Вторая вкладка - вся ферма, строки подгружаются лениво
+        self.taxonomy_model = TaxonomyModel(self.farm, self.display.icon)
+        self.farm_tree_view = QTreeView()
+        self.farm_tree_view.setModel(self.taxonomy_model)
+        self.farm_tree_view.setFont(QFont('Arial', 12))
+        self.farm_tree_view.setUniformRowHeights(True)
+        self.farm_tree_view.setIndentation(20)
+        self.farm_tree_view.setColumnWidth(0, 320)
+
+        self.tree_tabs = QTabWidget()
+        self.tree_tabs.addTab(self.tree_widget, "Выбранное животное")
+        self.tree_tabs.addTab(self.farm_tree_view, "Вся ферма")
+        tree_layout.addWidget(self.tree_tabs, stretch=1)
 
         layout.addWidget(tree_group, stretch=1)
 
@@ -286,24 +361,17 @@ class MainWindow(QWidget):
 
     def _load_sample_data(self):
         """Загрузка примеров."""
-        animals = create_sample_animals()
-        for animal in animals:
-            self.farm.add_animal(animal)
-        self._update_list()
+        self.farm.merge(create_sample_animals())
+
+    def _remove_selected_animal(self):
+        """Удалить выбранное животное (очередь кормления следит сама)."""
+        animal = self._selected_animal()
+        if animal is not None:
+            self.farm.remove_animal(animal)
 
     def _clear_all_animals(self):
         """Очистка всех данных."""
         self.farm.clear()
-        self._update_list()
-        self.tree_widget.clear()
-
-        while not self.feeding_deque.is_empty():
-            self.feeding_deque.pop_front()
-        self._update_feed_list()
-
-        while not self.view_history.is_empty():
-            self.view_history.pop()
-        self._update_history_label()
 
     def _import_data(self):
         """Импорт данных - паттерн мост"""
@@ -313,8 +381,14 @@ class MainWindow(QWidget):
             self._load_sample_data()
             return
 
+        if format_name in ("Папка (параллельно)", "Файлы (параллельно)"):
+            self._import_parallel(format_name)
+            return
+
         if format_name == "JSON":
             fmt = JsonFormat()
+        elif format_name == "JSONL":
+            fmt = JsonlFormat()
         elif format_name == "CSV":
             fmt = CsvFormat()
         elif format_name == "TXT":
@@ -324,99 +398,172 @@ class MainWindow(QWidget):
 
         filepath, _ = QFileDialog.getOpenFileName(
             self, f"Открыть {format_name} файл", "",
-            f"Файлы (*{fmt.get_extension()})"
+            f"Файлы ({file_patterns(fmt.get_extension())})"
         )
 
         if filepath:
             data = fmt.import_data(filepath)
             if data:
-                for item in data:
-                    animal = self._dict_to_animal(item)
-                    if animal:
-                        self.farm.add_animal(animal)
-                self._update_list()
-
-    def _dict_to_animal(self, data):
-        """Конвертация словаря в объект Animal."""
-        try:
-            phylum = Phylum(data.get('phylum', 'Неизвестно'))
-            class_animal = ClassAnimal(data.get('class', 'Неизвестно'), phylum)
-            order = Order(data.get('order', 'Неизвестно'), class_animal)
-            family = Family(data.get('family', 'Неизвестно'), order)
-            genus = Genus(data.get('genus', 'Неизвестно'), family)
-            species = Species(data.get('species', 'Неизвестно'), genus)
-
-            age = data.get('age', 0)
-            if isinstance(age, str):
-                age = int(age) if age else 0
-
-            weight = data.get('weight', 0.0)
-            if isinstance(weight, str):
-                weight = float(weight) if weight else 0.0
-
-            animal = Animal(
-                data.get('name', 'Безымянный'),
-                species,
-                age,
-                weight,
-                data.get('description', '')
-            )
-            return animal
-        except Exception:
-            return None
-
-    def _update_list(self):
-        """Обновление списка животных."""
-        self.animals_list.clear()
-        for animal in self.farm:
-            icon = get_animal_icon(animal.species.name)
-            item = QListWidgetItem(f"{icon} {animal.name}")
-            self.animals_list.addItem(item)
+                # Повторный импорт того же файла не дублирует животных
+                self.farm.merge(self.taxonomy_registry.records_to_animals(
+                    data, errors={}))
+
+    def _import_parallel(self, format_name):
+        """Импорт папки или нескольких файлов в пуле процессов."""
+        if format_name == "Папка (параллельно)":
+            directory = QFileDialog.getExistingDirectory(self, "Открыть папку")
+            sources = [directory] if directory else []
+        else:
+            patterns = " ".join(file_patterns(ext) for ext in FORMATS_BY_EXTENSION)
+            sources, _ = QFileDialog.getOpenFileNames(
+                self, "Открыть файлы", "", f"Файлы ({patterns})")
+
+        if sources:
+            importer = ParallelImporter(self.taxonomy_registry)
+            importer.import_into(self.farm, sources)
+            if importer.skipped or importer.failed:
+                self.status_label.setText(
+                    f"Пропущено некорректных строк: {importer.skipped}, "
+                    f"непрочитанных файлов: {len(importer.failed)}")
+
+    def _toggle_watch(self, enabled):
+        """Включить/выключить опрос папки storage."""
+        if enabled:
+            self._poll_storage()
+            self.watch_timer.start(DEFAULT_INTERVAL_MS)
+        else:
+            self.watch_timer.stop()
+            self.status_label.setText("Слежение за папкой выключено")
+
+    def _poll_storage(self):
+        """Дописанные в storage строки - в ферму (только новые байты)."""
+        result = self.folder_watcher.ingest(self.farm)
+        if result is not None:
+            self.status_label.setText(
+                f"Из папки storage: добавлено {result.inserted}, "
+                f"обновлено {result.updated}")
+
+    def _export_all(self):
+        """Экспорт снимка фермы во все форматы в фоновом потоке."""
+        directory = QFileDialog.getExistingDirectory(self, "Папка для экспорта")
+        if not directory or self.export_worker is not None:
+            return
+
+        snapshot = self.farm.snapshot()
+        self.export_worker = ExportWorker(snapshot, f"{directory}/animals")
+        self.export_worker.progress.connect(self._on_export_progress)
+        self.export_worker.completed.connect(self._on_export_completed)
+        self.export_worker.failed.connect(self._on_export_failed)
+        self.export_worker.finished.connect(self._on_export_finished)
+        self.status_label.setText(
+            f"Экспорт версии {snapshot.version}: {len(snapshot)} животных...")
+        self.export_worker.start()
         self._update_buttons_state()
 
-    def _on_animal_selected(self, item):
-        """Клик по животному - показ иерархии + запись в Stack."""
-        idx = self.animals_list.row(item)
-        animals = list(self.farm)
-        if 0 <= idx < len(animals):
-            animal = animals[idx]
+    def _on_export_progress(self, done, total, stage):
+        if total:
+            self.status_label.setText(f"Экспорт: {stage} {done}/{total}")
+        else:
+            self.status_label.setText(f"Экспорт: {stage} {done}")
+
+    def _on_export_completed(self, results):
+        saved = [name for name, (_, ok) in sorted(results.items()) if ok]
+        failed = [name for name, (_, ok) in sorted(results.items()) if not ok]
+        text = f"Экспорт завершён: {', '.join(saved) or 'ничего'}"
+        if failed:
+            text += f"; ошибки: {', '.join(failed)}"
+        self.status_label.setText(text)
+
+    def _on_export_failed(self, message):
+        self.status_label.setText(f"Ошибка экспорта: {message}")
+
+    def _on_export_finished(self):
+        self.export_worker.deleteLater()
+        self.export_worker = None
+        self._update_buttons_state()
+
+    def _apply_farm_changes(self, batch):
+        """Пакет изменений фермы - точечное обновление списка."""
+        label = self.display.label
+        self.animals_list.setUpdatesEnabled(False)
+        if batch.cleared:
+            self.animals_list.clear()
+        for inserted in batch.inserted:
+            for animal in inserted.items:
+                item = QListWidgetItem(label(animal))
+                item.setData(Qt.ItemDataRole.UserRole, animal)
+                self.animals_list.addItem(item)
+        if batch.removed:
+            removed = set(batch.removed)
+            for row in range(self.animals_list.count() - 1, -1, -1):
+                animal = self.animals_list.item(row).data(Qt.ItemDataRole.UserRole)
+                if animal.id in removed:
+                    self.animals_list.takeItem(row)
+        if batch.updated:
+            # Кличка или вид могли смениться - обновляем подписи; под
+            # снимком ферма меняла копию - строка переходит на неё
+            for row in range(self.animals_list.count()):
+                item = self.animals_list.item(row)
+                animal = item.data(Qt.ItemDataRole.UserRole)
+                if animal.id in batch.updated:
+                    current = self.farm.get_by_id(animal.id)
+                    if current is not None and current is not animal:
+                        item.setData(Qt.ItemDataRole.UserRole, current)
+                        animal = current
+                    item.setText(label(animal))
+        self.animals_list.setUpdatesEnabled(True)
+        # Удаление или смена вида переставляют строки внутри видов
+        self.taxonomy_model.refresh(reset=bool(batch.removed or batch.moved))
+        if batch.removed or batch.cleared:
+            # История уже без удалённых - показываем, что в ней осталось
+            self._show_current()
+        self._update_buttons_state()
+
+    def _selected_animal(self):
+        """Животное выбранной строки списка (или None)."""
+        item = self.animals_list.currentItem()
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
 
-            self.view_history.push(animal.name)
+    def _on_animal_selected(self, item):
+        """Клик по животному - показ иерархии + запись в историю."""
+        animal = item.data(Qt.ItemDataRole.UserRole)
+        if animal is not None:
+            self.view_history.visit(animal.id)
             self._update_history_label()
 
             self._show_hierarchy_for(animal)
             self._update_buttons_state()
 
     def _go_back_in_history(self):
-        """Stack: вернуться к предыдущему животному."""
-        if self.view_history.is_empty():
-            return
-
-        self.view_history.pop()
-
-        if self.view_history.is_empty():
-            self.tree_widget.clear()
-            self._update_history_label()
-            return
-
-        prev_name = self.view_history.peek()
-        animal = self.farm.get_by_name(prev_name)
-        if animal:
+        """Шаг назад по истории."""
+        if self.view_history.back() is not None:
+            self._show_current()
+
+    def _go_forward_in_history(self):
+        """Шаг вперёд по истории."""
+        if self.view_history.forward() is not None:
+            self._show_current()
+
+    def _show_current(self):
+        """Иерархия текущего животного истории (id -> животное за O(1))."""
+        animal = self.farm.get_by_id(self.view_history.current)
+        if animal is not None:
             self._show_hierarchy_for(animal)
-
+        else:
+            self.tree_widget.clear()
         self._update_history_label()
 
     def _update_history_label(self):
         """Обновление отображения истории."""
-        if self.view_history.is_empty():
+        history = self.view_history
+        animal = self.farm.get_by_id(history.current)
+        if animal is None:
             self.history_label.setText("История: пусто")
-            self.back_btn.setEnabled(False)
         else:
-            count = self.view_history.size()
-            current = self.view_history.peek()
             self.history_label.setText(
-                f"История: {count} | Текущий: {current}")
-            self.back_btn.setEnabled(count > 1)
+                f"История: {len(history)} | Текущий: {animal.name}")
+        self.back_btn.setEnabled(history.can_go_back())
+        self.forward_btn.setEnabled(history.can_go_forward())
 
     def _update_buttons_state(self):
         """Управление состоянием кнопок в зависимости от данных."""
@@ -426,14 +573,16 @@ class MainWindow(QWidget):
 
         self.feed_btn.setEnabled(has_animals and animal_selected)
         self.urgent_btn.setEnabled(has_animals and animal_selected)
+        self.remove_btn.setEnabled(has_animals and animal_selected)
         self.clear_btn.setEnabled(has_animals)
+        self.export_btn.setEnabled(has_animals and self.export_worker is None)
         self.feed_next_btn.setEnabled(queue_has_items)
 
     def _show_hierarchy_for(self, animal):
         """Построение дерева иерархии."""
         self.tree_widget.clear()
 
-        icon = get_animal_icon(animal.species.name)
+        icon = self.display.icon(animal.species)
 
         species = animal.species
         genus = species.genus
@@ -471,40 +620,32 @@ class MainWindow(QWidget):
 
     def _add_to_feeding_normal(self):
         """deque - добавление в конец очереди (обычное кормление)."""
-        idx = self.animals_list.currentRow()
-        animals = list(self.farm)
-        if idx < 0 or idx >= len(animals):
+        animal = self._selected_animal()
+        if animal is None:
             return
 
-        animal = animals[idx]
-        icon = get_animal_icon(animal.species.name)
-        self.feeding_deque.push_back(f"{icon} {animal.name}")
-        self._update_feed_list()
-        self._update_buttons_state()
+        self.feeding_deque.push_back(animal.id, self.display.label(animal))
 
     def _add_to_feeding_urgent(self):
         """deque - добавление в начало очереди (срочное кормление)."""
-        idx = self.animals_list.currentRow()
-        animals = list(self.farm)
-        if idx < 0 or idx >= len(animals):
+        animal = self._selected_animal()
+        if animal is None:
             return
 
-        animal = animals[idx]
-        icon = get_animal_icon(animal.species.name)
-        self.feeding_deque.push_front(f"🚨 {icon} {animal.name}")
-        self._update_feed_list()
-        self._update_buttons_state()
+        self.feeding_deque.push_front(
+            animal.id, self.display.label(animal, prefix="🚨 "))
 
-    def _update_feed_list(self):
-        """Обновление отображения очереди."""
+    def _apply_feed_changes(self, batch):
+        """Пакет изменений очереди.
+
+        Очередь короткая, а порядок вставок и удалений внутри пакета
+        важен для позиций - поэтому список просто строится заново,
+        но не чаще одного раза за тик.
+        """
         self.feed_list.clear()
-        temp = []
-        while not self.feeding_deque.is_empty():
-            temp.append(self.feeding_deque.pop_front())
-        for i, item in enumerate(temp):
+        for i, (_, _, label) in enumerate(self.feeding_deque.to_list()):
             prefix = "➡️" if i == 0 else "⏳"
-            self.feed_list.addItem(f"{prefix} {item}")
-            self.feeding_deque.push_back(item)
+            self.feed_list.addItem(f"{prefix} {label}")
         self._update_buttons_state()
 
     def _feed_next(self):
@@ -512,9 +653,7 @@ class MainWindow(QWidget):
         if self.feeding_deque.is_empty():
             return
 
-        animal = self.feeding_deque.pop_front()
-        self._update_feed_list()
-        self._update_buttons_state()
+        _, _, animal = self.feeding_deque.pop_front()
 
         self.feed_progress.setFormat(f"Кормим {animal}...")
         self.feed_progress.setValue(0)
@@ -0,0 +1,173 @@
+"""
+Модель дерева всей фермы для QTreeView
+
+Строки подгружаются лениво через canFetchMore/fetchMore порциями,
+поэтому при тысячах видов и миллионах животных элементы для свёрнутых
+узлов не создаются вовсе. Счётчики берутся из TaxonNode "на лету".
+"""
+
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt6.QtGui import QFont
+
+from data.taxonomy_tree import TaxonNode
+
+
+FETCH_BATCH = 100
+
+RANK_ICONS = ("🔬", "🦴", "📂", "👪", "🧬", "🐾")
+
+HEADERS = ("Таксон", "Животных", "Вес, кг", "Ср. вес", "Ср. возраст")
+
+
+class TaxonomyModel(QAbstractItemModel):
+    """Ленивое дерево Тип → ... → Вид → животные."""
+
+    def __init__(self, farm, icon_func=None, parent=None):
+        super().__init__(parent)
+        self._farm = farm
+        self._icon_func = icon_func  # icon_func(species) -> иконка
+        self._root = farm.taxonomy.root
+        self._fetched = {}  # TaxonNode -> сколько строк уже показано
+
+    # --- структура ---
+
+    def _node(self, index):
+        if not index.isValid():
+            return self._root
+        return index.internalPointer()
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if not isinstance(node, TaxonNode):
+            return QModelIndex()
+        if row < 0 or row >= min(self._fetched.get(node, 0), node.child_count()):
+            return QModelIndex()
+        if node.is_species:
+            return self.createIndex(row, column, node.animals[row])
+        return self.createIndex(row, column, node.child_nodes[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        item = index.internalPointer()
+        if isinstance(item, TaxonNode):
+            parent_node = item.parent
+        else:
+            # Животное - родитель находится по его линии
+            parent_node = self._farm.taxonomy.find_species(item)
+        if parent_node is None or parent_node is self._root:
+            return QModelIndex()
+        return self.createIndex(parent_node.row, 0, parent_node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self._node(parent)
+        if not isinstance(node, TaxonNode):
+            return 0
+        return self._fetched.get(node, 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self._node(parent)
+        return isinstance(node, TaxonNode) and node.child_count() > 0
+
+    # --- ленивая загрузка ---
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        if not isinstance(node, TaxonNode):
+            return False
+        return self._fetched.get(node, 0) < node.child_count()
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if not isinstance(node, TaxonNode):
+            return
+        start = self._fetched.get(node, 0)
+        end = min(start + FETCH_BATCH, node.child_count())
+        if end <= start:
+            return
+        self.beginInsertRows(parent, start, end - 1)
+        self._fetched[node] = end
+        self.endInsertRows()
+
+    # --- данные ---
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = index.internalPointer()
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if isinstance(item, TaxonNode):
+                if column == 0:
+                    icon = RANK_ICONS[item.rank]
+                    return f"{icon} {item.rank_name}: {item.name}"
+                if column == 1:
+                    return str(item.count)
+                if column == 2:
+                    return f"{item.total_weight:.1f}"
+                # Средние берутся из кэша узла - без обхода животных
+                if column == 3:
+                    return f"{item.mean_weight:.1f}"
+                return f"{item.mean_age:.1f}"
+            if column == 0:
+                icon = self._icon_func(item.species) if self._icon_func else ""
+                return f"{icon} {item.name} — {item.age} лет"
+            if column == 2:
+                return f"{item.weight:.1f}"
+            return ""
+
+        if role == Qt.ItemDataRole.FontRole and column == 0:
+            if isinstance(item, TaxonNode) and item.rank == 0:
+                return QFont('Arial', 12, QFont.Weight.Bold)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (orientation == Qt.Orientation.Horizontal
+                and role == Qt.ItemDataRole.DisplayRole):
+            return HEADERS[section]
+        return None
+
+    # --- синхронизация с фермой ---
+
+    def refresh(self, reset=False):
+        """Подтянуть изменения фермы без перестройки дерева.
+
+        Обходит только уже раскрытые узлы: дописывает появившиеся строки
+        и обновляет колонки со счётчиками. reset=True - были удаления
+        или смена вида, строки животных внутри видов сдвинулись,
+        нужен полный сброс.
+        """
+        if reset or self._farm.taxonomy.root is not self._root:
+            # Ферма очищена или строки сдвинулись - старые индексы недействительны
+            self.beginResetModel()
+            self._root = self._farm.taxonomy.root
+            self._fetched.clear()
+            self.endResetModel()
+
+        for node, fetched in list(self._fetched.items()):
+            parent = self._index_of(node)
+            total = node.child_count()
+            if fetched and fetched < total and fetched % FETCH_BATCH:
+                # Порция была неполной - дописываем до её конца
+                end = min(fetched + FETCH_BATCH - fetched % FETCH_BATCH, total)
+                self.beginInsertRows(parent, fetched, end - 1)
+                self._fetched[node] = end
+                self.endInsertRows()
+            if fetched:
+                self.dataChanged.emit(
+                    self.index(0, 1, parent),
+                    self.index(self._fetched[node] - 1, len(HEADERS) - 1, parent))
+
+        if not self._fetched.get(self._root) and self._root.child_count():
+            self.fetchMore(QModelIndex())
+
+    def _index_of(self, node):
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)